@@ -0,0 +1,623 @@
+"""
+Benchmark offline do pipeline sobre o corpus de uploads/.
+
+Cada trip de uploads/ passa por read_pdf_text, extract_travel_data e
+GET /trips/{id} (TestClient do app), sem rede:
+
+- OpenAI local: responde com o que já foi gravado. Primeiro o cache do
+  LLM (cache/llm), depois a saída da própria trip em extracao/ (dados
+  extraídos e roteiro). Latência de --llm-ms mais --llm-ms-por-token por
+  token de saída; streams saem em pedaços com a mesma latência.
+- Supabase local: destination_images montada com as fotos já salvas nas
+  trips de extracao/, --supabase-ms por consulta.
+
+O cache de respostas do gateway fica desligado (toda chamada paga a
+latência do OpenAI local). uploads/ e extracao/ não são alterados: as
+extrações e os registros de tempo vão para um diretório temporário.
+
+O relatório traz vazão, p50/p95/p99 de cada etapa (as do pipeline, via
+metrics, mais as medidas aqui), tokens por ponto de chamada e pico de
+memória. Com uma baseline salva, cada etapa é comparada com ela e o
+processo sai com código 1 se alguma piorou além da tolerância.
+
+Uso:
+    python benchmark.py                          # roda e compara com a baseline
+    python benchmark.py --salvar-baseline        # roda e grava a baseline
+    python benchmark.py --trips 10 --concorrencia 4 --llm-ms 800
+"""
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import os
+
+# Antes de importar llm_cache: o gateway não pode responder do cache
+os.environ["LLM_CACHE_MODE"] = "off"
+
+import argparse
+import contextvars
+import json
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import llm_cache
+import llm_gateway
+import supabase_client
+from pdf_preprocess import contar_tokens
+from upload_store import salvar_json_atomico
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BASE_DIR = Path(__file__).resolve().parent
+UPLOADS_DIR = BASE_DIR / "uploads"
+EXTRACAO_DIR = BASE_DIR / "extracao"
+BASELINE_PATH = BASE_DIR / "benchmark_baseline.json"
+
+# Diferenças abaixo disto são ruído, qualquer que seja a porcentagem
+RUIDO_MS = 5.0
+
+CAMPOS_EXTRACAO = ("cliente", "periodo", "voos", "hoteis", "passeios", "pacote_base")
+
+# Trip sendo extraída na thread atual: o OpenAI local responde com a saída gravada dela
+_trip_atual: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "benchmark_trip", default=None
+)
+
+
+def _ler_json(caminho: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with caminho.open("r", encoding="utf-8") as f:
+            dados = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return dados if isinstance(dados, dict) else None
+
+
+class Corpus:
+    """Trips de uploads/ e as saídas gravadas delas em extracao/."""
+
+    def __init__(self, uploads_dir: Path = UPLOADS_DIR, extracao_dir: Path = EXTRACAO_DIR) -> None:
+        self.trips: List[Path] = sorted(
+            pasta
+            for pasta in uploads_dir.glob("trip_*")
+            if pasta.is_dir() and any(p.suffix.lower() == ".pdf" for p in pasta.iterdir())
+        )
+        self.gravadas: Dict[str, Dict[str, Any]] = {}
+        for arquivo in sorted(extracao_dir.glob("trip_*.json")):
+            # trip_x.timing.json e afins não são trips
+            if "." in arquivo.stem:
+                continue
+            dados = _ler_json(arquivo)
+            if dados is not None:
+                self.gravadas[arquivo.stem] = dados
+
+    def roteiro_padrao(self) -> List[Dict[str, Any]]:
+        """Roteiro de outra trip, para as que não têm um gravado."""
+        for dados in self.gravadas.values():
+            if dados.get("roteiro"):
+                return dados["roteiro"]
+        return []
+
+    def linhas_catalogo(self) -> List[Dict[str, Any]]:
+        """destination_images a partir das fotos já resolvidas nas trips."""
+        linhas: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+        def adicionar(city: str, landmark: str, url: Any) -> None:
+            if isinstance(url, str) and url.startswith("http"):
+                linhas.setdefault(
+                    (city, landmark),
+                    {
+                        "id": len(linhas) + 1,
+                        "city": city,
+                        "landmark": landmark,
+                        "image_url": url,
+                        "description": landmark,
+                        "quality": None,
+                    },
+                )
+
+        for dados in self.gravadas.values():
+            for city, urls in (dados.get("imagens_cidades") or {}).items():
+                for i, url in enumerate(urls or []):
+                    adicionar(city, f"{city} cityscape" if i == 0 else f"{city} {i + 1}", url)
+
+            hoteis = dados.get("hoteis") or []
+            cidade = (hoteis[0].get("cidade") if hoteis and isinstance(hoteis[0], dict) else None) or ""
+            for dia in dados.get("roteiro") or []:
+                if cidade and dia.get("landmark"):
+                    adicionar(cidade, dia["landmark"], dia.get("imagem_dia"))
+
+        return list(linhas.values())
+
+
+# ---------------------------------------------------------------------------
+# OpenAI local
+# ---------------------------------------------------------------------------
+
+
+class _Stream:
+    def __init__(self, pedacos: Iterator[Any]) -> None:
+        self._pedacos = pedacos
+
+    def __iter__(self) -> Iterator[Any]:
+        return self._pedacos
+
+    def close(self) -> None:
+        pass
+
+
+class OpenAILocal:
+    """
+    Mesma interface que o gateway usa do cliente OpenAI
+    (with_options(...).chat.completions.create), respondendo com as saídas
+    gravadas do corpus.
+    """
+
+    def __init__(self, corpus: Corpus, latencia_s: float = 0.2, latencia_por_token_s: float = 0.001) -> None:
+        self.corpus = corpus
+        self.latencia_s = latencia_s
+        self.latencia_por_token_s = latencia_por_token_s
+        self._roteiro_padrao = corpus.roteiro_padrao()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.respostas = {"cache_llm": 0, "corpus": 0, "padrao": 0}
+        self._lock = threading.Lock()
+
+    def with_options(self, **_: Any) -> "OpenAILocal":
+        return self
+
+    def _contar(self, origem: str) -> None:
+        with self._lock:
+            self.respostas[origem] += 1
+
+    def _gravada(self, trip_id: Optional[str]) -> Dict[str, Any]:
+        return self.corpus.gravadas.get(trip_id or "") or {}
+
+    def _responder(self, kwargs: Dict[str, Any]) -> str:
+        messages = kwargs.get("messages") or []
+        params = {
+            k: v for k, v in kwargs.items()
+            if k not in ("model", "messages", "stream", "stream_options")
+        }
+        entrada = llm_cache.buscar(llm_cache.chave(kwargs.get("model", ""), messages, params))
+        if entrada is not None:
+            self._contar("cache_llm")
+            return entrada["content"]
+
+        sistema = str(messages[0].get("content", "")) if len(messages) > 1 else ""
+        texto = str(messages[-1].get("content", "")) if messages else ""
+        gravada = self._gravada(_trip_atual.get())
+
+        if "Retorne APENAS o nome do landmark" in sistema:
+            self._contar("padrao")
+            return "NENHUM"
+        if '"matches"' in texto:
+            self._contar("padrao")
+            return json.dumps({"matches": {}})
+        if '"campos"' in texto:
+            self._contar("padrao")
+            return json.dumps({"campos": {}})
+        if "roteiro dia-a-dia" in texto:
+            roteiro = gravada.get("roteiro")
+            self._contar("corpus" if roteiro else "padrao")
+            dias = [
+                {k: v for k, v in dia.items() if k != "imagem_dia"}
+                for dia in (roteiro or self._roteiro_padrao)
+            ]
+            return json.dumps(dias, ensure_ascii=False)
+
+        if gravada:
+            self._contar("corpus")
+            return json.dumps({k: gravada[k] for k in CAMPOS_EXTRACAO if k in gravada}, ensure_ascii=False)
+        self._contar("padrao")
+        return json.dumps(
+            {
+                "cliente": "Cliente",
+                "periodo": {"inicio": "", "fim": ""},
+                "voos": [],
+                "hoteis": [],
+                "passeios": [],
+                "pacote_base": {"descricao": "Aéreo + Hotel", "valor": 0},
+            }
+        )
+
+    def _create(self, **kwargs: Any) -> Any:
+        conteudo = self._responder(kwargs)
+        prompt = sum(contar_tokens(str(m.get("content", ""))) for m in kwargs.get("messages") or [])
+        completion = contar_tokens(conteudo)
+        usage = SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion)
+
+        if not kwargs.get("stream"):
+            time.sleep(self.latencia_s + completion * self.latencia_por_token_s)
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=conteudo))],
+                usage=usage,
+            )
+
+        time.sleep(self.latencia_s)
+        return _Stream(self._pedacos(conteudo, usage))
+
+    def _pedacos(self, conteudo: str, usage: Any) -> Iterator[Any]:
+        # ~4 caracteres por token, 16 tokens por pedaço
+        for i in range(0, len(conteudo), 64):
+            pedaco = conteudo[i : i + 64]
+            time.sleep(contar_tokens(pedaco) * self.latencia_por_token_s)
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=pedaco))],
+                usage=None,
+            )
+        yield SimpleNamespace(choices=[], usage=usage)
+
+
+# ---------------------------------------------------------------------------
+# Supabase local
+# ---------------------------------------------------------------------------
+
+
+class _Consulta:
+    def __init__(self, supabase: "SupabaseLocal", tabela: str) -> None:
+        self._supabase = supabase
+        self._tabela = tabela
+        self._colunas: Optional[List[str]] = None
+        self._filtros: List[Any] = []
+        self._inicio = 0
+        self._fim: Optional[int] = None
+        self._ordem: Optional[str] = None
+
+    def select(self, colunas: str = "*") -> "_Consulta":
+        if colunas.strip() != "*":
+            self._colunas = [c.strip() for c in colunas.split(",")]
+        return self
+
+    def eq(self, coluna: str, valor: Any) -> "_Consulta":
+        self._filtros.append(lambda linha: linha.get(coluna) == valor)
+        return self
+
+    def ilike(self, coluna: str, padrao: str) -> "_Consulta":
+        regex = re.compile(
+            "^" + ".*".join(re.escape(p) for p in padrao.split("%")) + "$", re.IGNORECASE
+        )
+        self._filtros.append(lambda linha: bool(regex.match(str(linha.get(coluna) or ""))))
+        return self
+
+    def order(self, coluna: str) -> "_Consulta":
+        self._ordem = coluna
+        return self
+
+    def range(self, inicio: int, fim: int) -> "_Consulta":
+        self._inicio, self._fim = inicio, fim
+        return self
+
+    def limit(self, n: int) -> "_Consulta":
+        self._fim = self._inicio + n - 1
+        return self
+
+    def execute(self) -> Any:
+        time.sleep(self._supabase.latencia_s)
+        with self._supabase.lock:
+            self._supabase.consultas += 1
+        linhas = [
+            linha
+            for linha in self._supabase.tabelas.get(self._tabela, [])
+            if all(f(linha) for f in self._filtros)
+        ]
+        if self._ordem:
+            linhas.sort(key=lambda linha: str(linha.get(self._ordem) or ""))
+        fim = len(linhas) if self._fim is None else self._fim + 1
+        linhas = linhas[self._inicio : fim]
+        if self._colunas:
+            linhas = [{c: linha.get(c) for c in self._colunas} for linha in linhas]
+        return SimpleNamespace(data=linhas)
+
+
+class SupabaseLocal:
+    """Só leitura: table().select().eq/ilike/order/range/limit().execute()."""
+
+    def __init__(self, linhas: List[Dict[str, Any]], latencia_s: float = 0.03) -> None:
+        self.tabelas = {"destination_images": linhas}
+        self.latencia_s = latencia_s
+        self.consultas = 0
+        self.lock = threading.Lock()
+
+    def table(self, nome: str) -> _Consulta:
+        return _Consulta(self, nome)
+
+
+# ---------------------------------------------------------------------------
+# Medição
+# ---------------------------------------------------------------------------
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    posicao = (len(ordenados) - 1) * p / 100
+    i = int(posicao)
+    j = min(i + 1, len(ordenados) - 1)
+    return ordenados[i] + (ordenados[j] - ordenados[i]) * (posicao - i)
+
+
+def _resumo(amostras: List[float]) -> Dict[str, float]:
+    return {
+        "n": len(amostras),
+        "p50_ms": round(_percentil(amostras, 50) * 1000, 2),
+        "p95_ms": round(_percentil(amostras, 95) * 1000, 2),
+        "p99_ms": round(_percentil(amostras, 99) * 1000, 2),
+        "max_ms": round(max(amostras) * 1000, 2) if amostras else 0.0,
+    }
+
+
+def _pico_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Amostras:
+    def __init__(self) -> None:
+        self.etapas: Dict[str, List[float]] = {}
+        self.llm: Dict[str, Dict[str, float]] = {}
+        self.erros: List[str] = []
+        self._lock = threading.Lock()
+
+    def adicionar(self, etapa: str, segundos: float) -> None:
+        with self._lock:
+            self.etapas.setdefault(etapa, []).append(segundos)
+
+    def adicionar_registro(self, registro: Dict[str, Any]) -> None:
+        """Etapas e chamadas ao LLM de uma trip (metrics.RegistroTrip.para_dict)."""
+        with self._lock:
+            for nome, etapa in registro.get("etapas", {}).items():
+                self.etapas.setdefault(nome, []).append(etapa["total_s"])
+            for ponto, s in registro.get("llm", {}).items():
+                total = self.llm.setdefault(
+                    ponto, {"chamadas": 0, "prompt_tokens": 0, "completion_tokens": 0, "custo_usd": 0.0}
+                )
+                for campo in total:
+                    total[campo] += s.get(campo, 0)
+
+    def erro(self, mensagem: str) -> None:
+        with self._lock:
+            self.erros.append(mensagem)
+
+
+# ---------------------------------------------------------------------------
+# Execução
+# ---------------------------------------------------------------------------
+
+
+def executar(args: argparse.Namespace) -> Dict[str, Any]:
+    corpus = Corpus()
+    trips = corpus.trips[: args.trips] if args.trips else corpus.trips
+    if not trips:
+        raise SystemExit(f"❌ Nenhuma trip com PDF em {UPLOADS_DIR}")
+
+    openai_local = OpenAILocal(corpus, args.llm_ms / 1000, args.llm_ms_por_token / 1000)
+    supabase_local = SupabaseLocal(corpus.linhas_catalogo(), args.supabase_ms / 1000)
+    llm_gateway.usar_cliente(openai_local)
+    supabase_client.usar_cliente(supabase_local)
+
+    # Só depois dos clientes locais: image_search guarda o Supabase no import
+    from fastapi.testclient import TestClient
+
+    import main
+    import metrics
+    import pdf_text_cache
+    import trip_images
+    from catalog_snapshot import snapshot as catalog_snapshot
+    from extract_with_ai import extract_travel_data, read_pdf_text
+    from trip_cache import trip_cache
+
+    if args.snapshot:
+        catalog_snapshot.recarregar()
+
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    amostras = Amostras()
+    saida_dir = Path(tempfile.mkdtemp(prefix="dsc-benchmark-"))
+    print(
+        f"🏁 Benchmark: {len(trips)} trip(s), concorrência {args.concorrencia}, "
+        f"LLM {args.llm_ms:.0f}ms + {args.llm_ms_por_token:g}ms/token, "
+        f"Supabase {args.supabase_ms:.0f}ms → {saida_dir}"
+    )
+
+    def extrair(trip_folder: Path) -> None:
+        trip_id = trip_folder.name
+        _trip_atual.set(trip_id)
+        try:
+            for pdf_path in sorted(p for p in trip_folder.iterdir() if p.suffix.lower() == ".pdf"):
+                inicio = time.perf_counter()
+                read_pdf_text(pdf_path)
+                amostras.adicionar("read_pdf_text", time.perf_counter() - inicio)
+
+            with metrics.registro_da_trip(trip_id, saida_dir / f"{trip_id}.timing.json") as registro:
+                inicio = time.perf_counter()
+                dados = extract_travel_data(trip_folder, gerar_roteiro=not args.sem_roteiro)
+                amostras.adicionar("extract_travel_data", time.perf_counter() - inicio)
+
+                if not trip_images.enriquecimento_atual(dados):
+                    with metrics.cronometro("enriquecendo_imagens"):
+                        trip_images.enriquecer_imagens(dados)
+            amostras.adicionar_registro(registro.para_dict())
+
+            salvar_json_atomico(saida_dir / f"{trip_id}.json", dados)
+        except Exception as e:
+            print(f"❌ {trip_id}: {e}")
+            amostras.erro(f"{trip_id}: {e.__class__.__name__}: {e}")
+
+    inicio_extracao = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.concorrencia)) as executor:
+        for futuro in [
+            executor.submit(contextvars.copy_context().run, extrair, trip) for trip in trips
+        ]:
+            futuro.result()
+    tempo_extracao = time.perf_counter() - inicio_extracao
+
+    # Leitura: a primeira GET de cada trip vem do disco, as demais do trip_cache
+    main.EXTRACAO_DIR = saida_dir
+    client = TestClient(main.app)
+    extraidas = [t.name for t in trips if (saida_dir / f"{t.name}.json").exists()]
+    requisicoes = 0
+
+    inicio_leitura = time.perf_counter()
+    for trip_id in extraidas:
+        etag = None
+        for i in range(max(1, args.leituras)):
+            inicio = time.perf_counter()
+            resposta = client.get(f"/trips/{trip_id}")
+            amostras.adicionar("get_trip_frio" if i == 0 else "get_trip", time.perf_counter() - inicio)
+            requisicoes += 1
+            if resposta.status_code != 200:
+                amostras.erro(f"GET /trips/{trip_id}: {resposta.status_code}")
+                break
+            etag = resposta.headers.get("etag")
+
+        if etag:
+            inicio = time.perf_counter()
+            resposta = client.get(f"/trips/{trip_id}", headers={"If-None-Match": etag})
+            amostras.adicionar("get_trip_304", time.perf_counter() - inicio)
+            requisicoes += 1
+            if resposta.status_code != 304:
+                amostras.erro(f"GET /trips/{trip_id} com ETag: {resposta.status_code}")
+    tempo_leitura = time.perf_counter() - inicio_leitura
+
+    memoria: Dict[str, Optional[float]] = {"pico_rss_mb": _pico_rss_mb()}
+    if args.tracemalloc:
+        memoria["pico_python_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+        tracemalloc.stop()
+
+    return {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "trips": len(trips),
+            "concorrencia": args.concorrencia,
+            "leituras": args.leituras,
+            "llm_ms": args.llm_ms,
+            "llm_ms_por_token": args.llm_ms_por_token,
+            "supabase_ms": args.supabase_ms,
+            "snapshot": args.snapshot,
+            "roteiro": not args.sem_roteiro,
+        },
+        "vazao": {
+            "extracao_trips_s": round(len(trips) / tempo_extracao, 3) if tempo_extracao else 0.0,
+            "leitura_req_s": round(requisicoes / tempo_leitura, 1) if tempo_leitura else 0.0,
+        },
+        "etapas": {nome: _resumo(v) for nome, v in sorted(amostras.etapas.items())},
+        "llm": {
+            ponto: {k: round(v, 6) if isinstance(v, float) else v for k, v in s.items()}
+            for ponto, s in sorted(amostras.llm.items())
+        },
+        "memoria": memoria,
+        "respostas_llm": dict(openai_local.respostas),
+        "consultas_supabase": supabase_local.consultas,
+        "caches": {"pdf_text": pdf_text_cache.stats(), "trip": trip_cache.stats()},
+        "erros": amostras.erros,
+        "saida": str(saida_dir),
+    }
+
+
+def comparar(atual: Dict[str, Any], baseline: Dict[str, Any], tolerancia: float) -> List[str]:
+    """Etapas e vazões que pioraram mais que `tolerancia` (0.2 = 20%) em relação à baseline."""
+    regressoes: List[str] = []
+
+    for nome, base in baseline.get("etapas", {}).items():
+        etapa = atual["etapas"].get(nome)
+        if not etapa:
+            continue
+        for campo in ("p50_ms", "p95_ms"):
+            antes, depois = base[campo], etapa[campo]
+            if depois > antes * (1 + tolerancia) and depois - antes > RUIDO_MS:
+                regressoes.append(f"{nome} {campo}: {antes:.1f} → {depois:.1f}")
+
+    for nome, antes in baseline.get("vazao", {}).items():
+        depois = atual["vazao"].get(nome, 0.0)
+        if antes and depois < antes * (1 - tolerancia):
+            regressoes.append(f"vazão {nome}: {antes:g} → {depois:g}")
+
+    if baseline.get("config") != atual["config"]:
+        print("⚠️ Configuração diferente da baseline; a comparação vale pouco")
+    return regressoes
+
+
+def imprimir(relatorio: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    base_etapas = (baseline or {}).get("etapas", {})
+    print(f"\n{'etapa':<28}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'base p95':>10}")
+    for nome, e in relatorio["etapas"].items():
+        base = base_etapas.get(nome, {}).get("p95_ms")
+        print(
+            f"{nome:<28}{e['n']:>6}{e['p50_ms']:>10.1f}{e['p95_ms']:>10.1f}{e['p99_ms']:>10.1f}"
+            f"{(f'{base:.1f}' if base is not None else '-'):>10}"
+        )
+
+    vazao = relatorio["vazao"]
+    print(
+        f"\n🚀 Vazão: {vazao['extracao_trips_s']} trip(s)/s na extração, "
+        f"{vazao['leitura_req_s']} req/s em GET /trips/{{id}}"
+    )
+    for ponto, s in relatorio["llm"].items():
+        print(
+            f"🤖 {ponto}: {s['chamadas']} chamada(s), {s['prompt_tokens']} + "
+            f"{s['completion_tokens']} tokens, ~US$ {s['custo_usd']:.4f}"
+        )
+    memoria = relatorio["memoria"]
+    print(
+        "🧠 Pico de memória: "
+        + ", ".join(f"{k} {v}" for k, v in memoria.items() if v is not None)
+    )
+    if relatorio["erros"]:
+        print(f"⚠️ {len(relatorio['erros'])} erro(s): " + "; ".join(relatorio["erros"][:5]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark offline sobre uploads/")
+    parser.add_argument("--trips", type=int, default=0, help="Limita o número de trips (0 = todas)")
+    parser.add_argument("--concorrencia", type=int, default=1, help="Extrações simultâneas")
+    parser.add_argument("--leituras", type=int, default=5, help="GET /trips/{id} por trip")
+    parser.add_argument("--llm-ms", type=float, default=200, help="Latência de cada chamada ao OpenAI local")
+    parser.add_argument("--llm-ms-por-token", type=float, default=1, help="Latência por token de saída")
+    parser.add_argument("--supabase-ms", type=float, default=30, help="Latência de cada consulta ao Supabase local")
+    parser.add_argument("--sem-roteiro", action="store_true", help="Extrai sem gerar o roteiro")
+    parser.add_argument("--snapshot", action="store_true", help="Carrega o snapshot do catálogo antes, como o servidor")
+    parser.add_argument("--tracemalloc", action="store_true", help="Mede também o pico de alocação Python (mais lento)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Arquivo da baseline")
+    parser.add_argument("--salvar-baseline", action="store_true", help="Grava este resultado como baseline")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Piora aceita em relação à baseline (0.2 = 20%%)")
+    parser.add_argument("--saida", type=Path, help="Grava o relatório completo em JSON")
+    args = parser.parse_args()
+
+    relatorio = executar(args)
+    baseline = None if args.salvar_baseline else _ler_json(args.baseline)
+    imprimir(relatorio, baseline)
+
+    if args.saida:
+        salvar_json_atomico(args.saida, relatorio)
+    if args.salvar_baseline:
+        salvar_json_atomico(args.baseline, relatorio)
+        print(f"💾 Baseline salva em {args.baseline}")
+        sys.exit(0)
+    if baseline is None:
+        print(f"ℹ️ Sem baseline em {args.baseline}; rode com --salvar-baseline")
+        sys.exit(0)
+
+    regressoes = comparar(relatorio, baseline, args.tolerancia)
+    if regressoes:
+        print(f"\n❌ {len(regressoes)} regressão(ões) acima de {args.tolerancia:.0%}:")
+        for linha in regressoes:
+            print(f"  - {linha}")
+        sys.exit(1)
+    print(f"\n✅ Sem regressões acima de {args.tolerancia:.0%} em relação à baseline")
@@ -0,0 +1,197 @@
+"""
+Snapshot em memória do catálogo destination_images.
+
+A tabela muda pouco (só quando alguém roda curar_fotos.py), então o
+processo carrega tudo na inicialização e recarrega em segundo plano a
+cada CATALOG_REFRESH_S. As buscas exatas por (cidade, landmark) e as
+listas por cidade saem da memória, sem rede.
+
+Stale-while-revalidate: se uma recarga falhar, o snapshot anterior continua
+servindo (e a falha fica registrada em `ultimo_erro`); um soluço do
+Supabase nunca chega à página da viagem.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import metrics
+from texto import normalizar
+
+CATALOG_REFRESH_S = float(os.getenv("CATALOG_REFRESH_S", "300"))
+CATALOG_PAGE_SIZE = 1000
+
+COLUNAS = "city, landmark, image_url, description, quality"
+
+
+@dataclass(frozen=True)
+class _Estado:
+    linhas: Tuple[dict, ...] = ()
+    por_chave: Dict[Tuple[str, str], dict] = field(default_factory=dict)
+    por_cidade: Dict[str, List[dict]] = field(default_factory=dict)
+    versoes_cidade: Dict[str, str] = field(default_factory=dict)
+    versao: Optional[str] = None
+    carregado_em: Optional[float] = None
+
+
+def _versao(linhas: List[dict]) -> str:
+    bruto = json.dumps(
+        sorted(
+            linhas,
+            key=lambda x: (str(x.get("city")), str(x.get("landmark")), str(x.get("image_url"))),
+        ),
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()[:16]
+
+
+def _montar_estado(linhas: List[dict]) -> _Estado:
+    por_chave: Dict[Tuple[str, str], dict] = {}
+    por_cidade: Dict[str, List[dict]] = {}
+
+    for linha in linhas:
+        city = linha.get("city")
+        landmark = linha.get("landmark")
+        if not isinstance(city, str) or not isinstance(landmark, str):
+            continue
+        # Mantém a primeira linha de cada par, como o .limit(1) das consultas
+        por_chave.setdefault((city, landmark), linha)
+        por_cidade.setdefault(normalizar(city), []).append(linha)
+
+    return _Estado(
+        linhas=tuple(linhas),
+        por_chave=por_chave,
+        por_cidade=por_cidade,
+        versoes_cidade={c: _versao(ls) for c, ls in por_cidade.items()},
+        versao=_versao(linhas),
+        carregado_em=time.time(),
+    )
+
+
+class CatalogSnapshot:
+    def __init__(self, refresh_s: float = CATALOG_REFRESH_S) -> None:
+        self.refresh_s = refresh_s
+        self._estado = _Estado()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._parar = threading.Event()
+        self.ultimo_erro: Optional[str] = None
+        self.recargas = 0
+
+    @property
+    def pronto(self) -> bool:
+        return self._estado.carregado_em is not None
+
+    @property
+    def versao(self) -> Optional[str]:
+        return self._estado.versao
+
+    def _buscar_linhas(self) -> Optional[List[dict]]:
+        try:
+            from supabase_client import get_supabase
+        except ImportError:
+            return None
+
+        supabase = get_supabase()
+        if not supabase:
+            return None
+
+        linhas: List[dict] = []
+        inicio = 0
+        while True:
+            result = (
+                supabase.table("destination_images")
+                .select(COLUNAS)
+                .range(inicio, inicio + CATALOG_PAGE_SIZE - 1)
+                .execute()
+            )
+            pagina = result.data or []
+            linhas.extend(pagina)
+            if len(pagina) < CATALOG_PAGE_SIZE:
+                return linhas
+            inicio += CATALOG_PAGE_SIZE
+
+    def carregar_linhas(self, linhas: List[dict]) -> None:
+        """Substitui o snapshot de uma vez (leitores nunca veem estado parcial)."""
+        estado = _montar_estado(linhas)
+        with self._lock:
+            mudou = estado.versao != self._estado.versao
+            self._estado = estado
+            self.recargas += 1
+        if mudou:
+            print(
+                f"🗂️ Catálogo de imagens carregado: {len(estado.linhas)} foto(s), "
+                f"versão {estado.versao}"
+            )
+
+    @metrics.cronometrado("catalogo_snapshot")
+    def recarregar(self) -> bool:
+        """Recarrega do Supabase; em caso de falha mantém o snapshot atual."""
+        try:
+            linhas = self._buscar_linhas()
+        except Exception as e:
+            self.ultimo_erro = str(e)
+            print(f"⚠️ Erro ao recarregar catálogo (servindo snapshot anterior): {e}")
+            return False
+
+        if linhas is None:
+            return False
+
+        self.ultimo_erro = None
+        self.carregar_linhas(linhas)
+        return True
+
+    def _loop(self) -> None:
+        self.recarregar()
+        while not self._parar.wait(self.refresh_s):
+            self.recarregar()
+
+    def iniciar(self) -> None:
+        """Carrega e passa a recarregar em segundo plano (idempotente)."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._parar.clear()
+            self._thread = threading.Thread(
+                target=self._loop, name="catalogo-imagens", daemon=True
+            )
+            self._thread.start()
+
+    def parar(self) -> None:
+        self._parar.set()
+
+    def imagem(self, city: str, landmark: str) -> Optional[dict]:
+        return self._estado.por_chave.get((city, landmark))
+
+    def cidade(self, city: str) -> Optional[List[dict]]:
+        """Linhas da cidade (None se o snapshot ainda não carregou)."""
+        estado = self._estado
+        if estado.carregado_em is None:
+            return None
+        return estado.por_cidade.get(normalizar(city), [])
+
+    def versao_cidade(self, city: str) -> Optional[str]:
+        estado = self._estado
+        if estado.carregado_em is None:
+            return None
+        return estado.versoes_cidade.get(normalizar(city), "vazio")
+
+    def stats(self) -> Dict[str, object]:
+        estado = self._estado
+        return {
+            "pronto": estado.carregado_em is not None,
+            "versao": estado.versao,
+            "fotos": len(estado.linhas),
+            "cidades": len(estado.por_cidade),
+            "carregado_em": estado.carregado_em,
+            "recargas": self.recargas,
+            "ultimo_erro": self.ultimo_erro,
+        }
+
+
+snapshot = CatalogSnapshot()
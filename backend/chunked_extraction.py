@@ -0,0 +1,360 @@
+"""
+Extração em partes (map-reduce) para pacotes de PDFs grandes demais.
+
+Trips com vários vouchers passam fácil do tamanho em que o gpt-4o ainda
+extrai bem, e a latência cresce com o prompt. Aqui o texto já preparado
+(pdf_preprocess) é dividido em partes de até EXTRACAO_PARTE_TOKENS:
+
+- arquivos pequenos vão juntos na mesma parte, sem quebrar nenhum
+- um arquivo maior que o limite é dividido entre páginas, de preferência
+  onde muda a seção (voos → hotéis)
+
+Cada parte é extraída em paralelo, então a latência acompanha a maior
+parte, não o total. As extrações parciais são juntas de forma
+determinística: voos e hotéis repetidos entre partes entram uma vez só.
+"""
+
+import contextvars
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pdf_preprocess import PaginaPreparada, contar_tokens
+from texto import normalizar
+
+EXTRACAO_PARTE_TOKENS = int(os.getenv("EXTRACAO_PARTE_TOKENS", "6000"))
+EXTRACAO_MAX_PARTES = int(os.getenv("EXTRACAO_MAX_PARTES", "8"))
+
+
+@dataclass
+class Parte:
+    paginas: List[PaginaPreparada] = field(default_factory=list)
+    tokens: int = 0
+
+    @property
+    def arquivos(self) -> List[str]:
+        return list(dict.fromkeys(p.arquivo for p in self.paginas))
+
+    @property
+    def texto(self) -> str:
+        blocos: List[str] = []
+        for nome in self.arquivos:
+            paginas = "\n".join(p.texto for p in self.paginas if p.arquivo == nome)
+            blocos.append(f"=== Arquivo: {nome} ===\n{paginas}")
+        return "\n\n".join(blocos)
+
+
+def _por_arquivo(paginas: List[PaginaPreparada]) -> List[List[PaginaPreparada]]:
+    grupos: List[List[PaginaPreparada]] = []
+    for pagina in paginas:
+        if grupos and grupos[-1][0].arquivo == pagina.arquivo:
+            grupos[-1].append(pagina)
+        else:
+            grupos.append([pagina])
+    return grupos
+
+
+def _dividir_arquivo(paginas: List[PaginaPreparada], tokens: List[int], limite: int) -> List[Parte]:
+    # Índices das páginas de cada parte; "corte" guarda a última troca de
+    # seção dentro da parte atual
+    grupos: List[List[int]] = []
+    atual: List[int] = []
+    usado = 0
+    corte = 0
+
+    for i, n in enumerate(tokens):
+        if atual and usado + n > limite:
+            if 0 < corte < len(atual):
+                # Fecha na troca de seção e leva o resto para a próxima parte
+                grupos.append(atual[:corte])
+                atual = atual[corte:]
+            else:
+                grupos.append(atual)
+                atual = []
+            usado = sum(tokens[j] for j in atual)
+            corte = 0
+
+        if atual and paginas[i].secoes != paginas[atual[-1]].secoes:
+            corte = len(atual)
+        atual.append(i)
+        usado += n
+
+    if atual:
+        grupos.append(atual)
+    return [
+        Parte([paginas[j] for j in grupo], sum(tokens[j] for j in grupo))
+        for grupo in grupos
+    ]
+
+
+def dividir_em_partes(
+    paginas: List[PaginaPreparada],
+    limite_tokens: Optional[int] = None,
+) -> List[Parte]:
+    """
+    Agrupa as páginas em partes de até limite_tokens (padrão
+    EXTRACAO_PARTE_TOKENS). Uma página sozinha acima do limite vira uma
+    parte própria.
+    """
+    limite = limite_tokens or EXTRACAO_PARTE_TOKENS
+    partes: List[Parte] = []
+    atual = Parte()
+
+    for grupo in _por_arquivo(paginas):
+        tokens = [contar_tokens(p.texto) for p in grupo]
+        total = sum(tokens)
+
+        if total > limite:
+            if atual.paginas:
+                partes.append(atual)
+                atual = Parte()
+            partes.extend(_dividir_arquivo(grupo, tokens, limite))
+            continue
+
+        if atual.paginas and atual.tokens + total > limite:
+            partes.append(atual)
+            atual = Parte()
+        atual.paginas.extend(grupo)
+        atual.tokens += total
+
+    if atual.paginas:
+        partes.append(atual)
+    return partes
+
+
+# ---------------------------------------------------------------------------
+# Junção das extrações parciais
+# ---------------------------------------------------------------------------
+
+
+def _data(texto: Any) -> Optional[date]:
+    """ "30/01/2026" → date; sem ano (ou inválida) → None"""
+    m = re.fullmatch(r"\s*(\d{1,2})/(\d{1,2})/(\d{4})\s*", str(texto or ""))
+    if not m:
+        return None
+    try:
+        return date(int(m.group(3)), int(m.group(2)), int(m.group(1)))
+    except ValueError:
+        return None
+
+
+def _dia_mes(texto: Any) -> str:
+    """ "30/01/2026" e "30/01" viram a mesma chave"""
+    m = re.match(r"\s*(\d{1,2})/(\d{1,2})", str(texto or ""))
+    return f"{int(m.group(1)):02d}/{int(m.group(2)):02d}" if m else normalizar(str(texto or ""))
+
+
+def _local(texto: Any) -> str:
+    """ "São Paulo (GRU)" → "gru"; sem código, a cidade normalizada"""
+    m = re.search(r"\(([A-Za-z]{3})\)", str(texto or ""))
+    return m.group(1).lower() if m else normalizar(str(texto or ""))
+
+
+def _chave_voo(voo: Dict[str, Any]) -> Tuple[str, ...]:
+    return (
+        _local(voo.get("origem")),
+        _local(voo.get("destino")),
+        _dia_mes(voo.get("data")),
+        str(voo.get("horario_saida") or "").strip().zfill(5),
+    )
+
+
+def _chave_hotel(hotel: Dict[str, Any]) -> Tuple[str, ...]:
+    return (normalizar(str(hotel.get("nome") or "")), _dia_mes(hotel.get("checkin")))
+
+
+def _chave_passeio(passeio: Dict[str, Any]) -> Tuple[str, ...]:
+    return (normalizar(str(passeio.get("nome") or "")),)
+
+
+def _completar(base: Dict[str, Any], outro: Dict[str, Any]) -> None:
+    """Campos vazios de base recebem os de outro; datas com ano ganham das sem."""
+    for chave, valor in outro.items():
+        atual = base.get(chave)
+        if atual in (None, "", 0) and valor not in (None, "", 0):
+            base[chave] = valor
+        elif _data(valor) and not _data(atual) and _dia_mes(valor) == _dia_mes(atual):
+            base[chave] = valor
+
+
+def _sem_repetidos(
+    listas: List[List[Dict[str, Any]]],
+    chave: Callable[[Dict[str, Any]], Tuple[str, ...]],
+) -> List[Dict[str, Any]]:
+    vistos: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+    for lista in listas:
+        for item in lista:
+            if not isinstance(item, dict):
+                continue
+            k = chave(item)
+            if k in vistos:
+                _completar(vistos[k], item)
+            else:
+                vistos[k] = dict(item)
+    return list(vistos.values())
+
+
+def _ordenar_por_data(itens: List[Dict[str, Any]], campo: str, hora: Optional[str] = None) -> List[Dict[str, Any]]:
+    # Só reordena se todas as datas têm ano; senão fica a ordem dos arquivos
+    if not itens or not all(_data(i.get(campo)) for i in itens):
+        return itens
+    return sorted(
+        itens,
+        key=lambda i: (_data(i.get(campo)), str(i.get(hora) or "").zfill(5) if hora else ""),
+    )
+
+
+def _numero(valor: Any) -> float:
+    """
+    "R$ 7.910,50", "7910,50", "7,910.50" e "7910.50" → 7910.5.
+    Com um separador só, ele é decimal se não vier seguido de exatamente
+    três dígitos ("7.910" é milhar, "7910.5" é decimal).
+    """
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    texto = re.sub(r"[^\d,.]", "", str(valor or ""))
+    if "," in texto and "." in texto:
+        # O que vem por último é o decimal
+        milhar, decimal = (".", ",") if texto.rfind(",") > texto.rfind(".") else (",", ".")
+        texto = texto.replace(milhar, "").replace(decimal, ".")
+    else:
+        for sep in (",", "."):
+            if sep in texto:
+                decimais = texto.rsplit(sep, 1)[1]
+                if texto.count(sep) == 1 and len(decimais) != 3:
+                    texto = texto.replace(sep, ".")
+                else:
+                    texto = texto.replace(sep, "")
+    try:
+        return float(texto)
+    except ValueError:
+        return 0.0
+
+
+def _mesmo_valor(a: float, b: float) -> bool:
+    """Mesmo total lido com arredondamento diferente (até 0,5% ou 1 unidade)."""
+    return abs(a - b) <= max(1.0, 0.005 * max(a, b))
+
+
+def juntar_valores(valores: List[float]) -> Tuple[float, bool]:
+    """
+    Um valor para o pacote a partir dos valores das partes.
+
+    Returns:
+        (valor, incerto): um valor só (ou repetido) é certo; se o maior é a
+        soma dos demais, é o total da cotação; se não, as partes discordam e
+        fica o maior, marcado como incerto, em vez de somar e inflar o preço
+    """
+    distintos: List[float] = []
+    for valor in sorted(valores, reverse=True):
+        if not any(_mesmo_valor(valor, d) for d in distintos):
+            distintos.append(valor)
+    if not distintos:
+        return 0, False
+    maior, resto = distintos[0], distintos[1:]
+    if not resto or _mesmo_valor(maior, sum(resto)):
+        return maior, False
+    return maior, True
+
+
+def juntar_extracoes(parciais: List[Dict[str, Any]], cliente_nome: str = "") -> Dict[str, Any]:
+    """
+    Junta as extrações das partes, na ordem das partes.
+
+    - voos: mesma origem, destino, dia e horário de saída são o mesmo voo
+    - hotéis: mesmo nome e dia de check-in são a mesma estadia
+    - passeios: mesmo nome
+    - pacote_base: valores iguais (até o arredondamento) contam uma vez; um
+      total que é a soma dos demais vale sozinho; partes que discordam
+      ficam com o maior valor e "valor_incerto": True
+    - periodo: da data mais cedo à mais tarde entre período, voos e hotéis
+    """
+    voos = _ordenar_por_data(
+        _sem_repetidos([p.get("voos") or [] for p in parciais], _chave_voo),
+        "data",
+        "horario_saida",
+    )
+    hoteis = _ordenar_por_data(
+        _sem_repetidos([p.get("hoteis") or [] for p in parciais], _chave_hotel),
+        "checkin",
+    )
+    passeios = _sem_repetidos([p.get("passeios") or [] for p in parciais], _chave_passeio)
+
+    pacotes = [
+        (_numero(pacote.get("valor")), str(pacote.get("descricao") or ""))
+        for pacote in (p.get("pacote_base") or {} for p in parciais)
+    ]
+    total, incerto = juntar_valores([valor for valor, _ in pacotes if valor])
+    # A descrição vem da parte que tem o valor escolhido
+    descricao = next((d for v, d in pacotes if d and v == total), "") or next(
+        (d for v, d in pacotes if d and v), ""
+    )
+
+    datas = [
+        d
+        for p in parciais
+        for d in (_data((p.get("periodo") or {}).get("inicio")), _data((p.get("periodo") or {}).get("fim")))
+        if d
+    ]
+    datas += [d for v in voos for d in [_data(v.get("data"))] if d]
+    datas += [d for h in hoteis for campo in ("checkin", "checkout") for d in [_data(h.get(campo))] if d]
+    if datas:
+        periodo = {"inicio": min(datas).strftime("%d/%m/%Y"), "fim": max(datas).strftime("%d/%m/%Y")}
+    else:
+        # Sem anos não dá para comparar; vale o início da primeira parte e o fim da última
+        periodos = [p.get("periodo") or {} for p in parciais]
+        periodo = {
+            "inicio": next((p["inicio"] for p in periodos if p.get("inicio")), ""),
+            "fim": next((p["fim"] for p in reversed(periodos) if p.get("fim")), ""),
+        }
+
+    cliente = cliente_nome or next(
+        (p["cliente"] for p in parciais if p.get("cliente") and p["cliente"] != "Cliente"),
+        "Cliente",
+    )
+    return {
+        "cliente": cliente,
+        "periodo": periodo,
+        "voos": voos,
+        "hoteis": hoteis,
+        "passeios": passeios,
+        "pacote_base": {
+            "descricao": descricao or "Aéreo + Hotel",
+            "valor": int(total) if float(total).is_integer() else total,
+            **({"valor_incerto": True} if incerto else {}),
+        },
+    }
+
+
+def extrair_em_partes(
+    partes: List[Parte],
+    extrair_parte: Callable[[Parte, int, int], Dict[str, Any]],
+    cliente_nome: str = "",
+) -> Dict[str, Any]:
+    """
+    Extrai todas as partes em paralelo e junta o resultado.
+
+    Args:
+        partes: Saída de dividir_em_partes
+        extrair_parte: Recebe (parte, índice a partir de 1, total) e devolve
+            o JSON extraído daquela parte
+        cliente_nome: Nome do cliente (opcional)
+
+    Raises:
+        Exception: o erro da primeira parte que falhar; sem uma parte o
+            resultado perderia voos ou hotéis em silêncio
+    """
+    total = len(partes)
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(total, EXTRACAO_MAX_PARTES)),
+        thread_name_prefix="extracao-parte",
+    ) as executor:
+        futuros = [
+            executor.submit(contextvars.copy_context().run, extrair_parte, parte, i, total)
+            for i, parte in enumerate(partes, 1)
+        ]
+        parciais = [f.result() for f in futuros]
+    return juntar_extracoes(parciais, cliente_nome)
@@ -6,12 +6,9 @@ Você só cola a URL, a IA preenche city, landmark e descrição.
 from dotenv import load_dotenv
 load_dotenv()
 
-import os
-from openai import OpenAI
+import llm_gateway
 from supabase_images import salvar_imagem
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
 
 def analisar_foto_com_ia(image_url: str) -> dict:
     """
@@ -48,8 +45,8 @@ Retorne APENAS JSON válido:
 }}"""
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        response = llm_gateway.chat(
+            "curadoria",
             messages=[
                 {
                     "role": "system",
@@ -65,7 +62,7 @@ Retorne APENAS JSON válido:
         )
         
         import json
-        result_text = response.choices[0].message.content.strip()
+        result_text = response.content.strip()
         
         # Limpar markdown se houver
         if result_text.startswith("```"):
@@ -1,46 +1,122 @@
+import asyncio
+import contextvars
+import copy
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
 from pathlib import Path
-from openai import OpenAI
-import PyPDF2
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import llm_gateway
+import metrics
+import trip_images
+from chunked_extraction import (
+    EXTRACAO_MAX_PARTES,
+    EXTRACAO_PARTE_TOKENS,
+    dividir_em_partes,
+    extrair_em_partes,
+)
+from pdf_preprocess import PDF_PROMPT_TOKEN_BUDGET, preparar_texto
+from pdf_text import juntar_paginas, read_pdf_pages, read_pdfs_pages
+from stage_graph import Etapa
+from stage_graph import executar as executar_etapas
+from template_extractor import completar_lacunas, extrair_por_template
+
+DAY_PHOTO_TIMEOUT_S = float(os.getenv("DAY_PHOTO_TIMEOUT_S", "15"))
+
+FALLBACK_DAY_IMAGE = (
+    "https://images.unsplash.com/"
+    "photo-1488646953014-85cb44e25828?w=1200"
+)
 
-# Tentativa de importar funções de imagem
-try:
-    from image_search import get_images_for_all_cities, get_hero_image_for_trip
-except ImportError as e:
-    print(f"⚠️ Erro ao importar image_search em extract_with_ai: {e}")
+def read_pdf_text(pdf_path: Path) -> str:
+    """Extrai texto de um arquivo PDF (páginas lidas em paralelo)."""
+    return juntar_paginas(read_pdf_pages(pdf_path))
+
+
+def _pedidos_dos_dias(
+    roteiro: list[dict], cidade: str
+) -> tuple[list[tuple[int, str, str]], dict[str, list[str]]]:
+    """(índice, cidade, landmark) de cada dia com landmark, e os landmarks por cidade."""
+    pendentes = [
+        (i, dia.get("cidade") or cidade, dia.get("landmark"))
+        for i, dia in enumerate(roteiro)
+        if dia.get("landmark") and (dia.get("cidade") or cidade)
+    ]
+    pedidos: dict[str, list[str]] = {}
+    for _, cidade_dia, landmark in pendentes:
+        pedidos.setdefault(cidade_dia, []).append(landmark)
+    return pendentes, pedidos
+
+
+def _aplicar_fotos_dos_dias(
+    roteiro: list[dict],
+    pendentes: list[tuple[int, str, str]],
+    fotos: dict[str, dict[str, str]],
+) -> None:
+    for i, cidade_dia, landmark in pendentes:
+        dia = roteiro[i]
+        foto = fotos.get(cidade_dia, {}).get(landmark)
+        if foto:
+            dia["imagem_dia"] = foto
+            print(f"  Dia {dia.get('dia')}: {landmark} 💎 Foto curada encontrada")
+        else:
+            print(f"  Dia {dia.get('dia')}: {landmark} ⚠️ Sem foto curada, usando fallback")
+            dia["imagem_dia"] = FALLBACK_DAY_IMAGE
 
-    def get_images_for_all_cities(destinations: list[str]) -> dict:
-        return {}
 
-    def get_hero_image_for_trip(destinations: list[str]) -> str | None:
-        return None
+def resolver_fotos_dos_dias(roteiro: list[dict], cidade: str) -> None:
+    """
+    Preenche `imagem_dia` de cada dia com as fotos curadas da trip.
+
+    Todos os landmarks do roteiro são agrupados por cidade (a do próprio
+    dia, ou a cidade principal) e resolvidos de uma vez: um catálogo por
+    cidade e no máximo uma chamada ao LLM para a trip inteira. A busca tem
+    prazo de DAY_PHOTO_TIMEOUT_S segundos; se estourar (ou falhar), os dias
+    ficam com a foto de fallback. Cada resultado volta para o dia de origem
+    pelo índice, então a ordem nunca se embaralha.
+    """
+    from image_search import resolver_imagens_da_trip
 
+    pendentes, pedidos = _pedidos_dos_dias(roteiro, cidade)
+    if not pendentes:
+        return
 
-def read_pdf_text(pdf_path: Path) -> str:
-    """Extrai texto de um arquivo PDF."""
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fotos-dia")
     try:
-        with open(pdf_path, "rb") as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+        fotos = executor.submit(
+            contextvars.copy_context().run, resolver_imagens_da_trip, pedidos
+        ).result(
+            timeout=DAY_PHOTO_TIMEOUT_S
+        )
+    except FuturesTimeout:
+        print("  ⏱️ Tempo esgotado buscando fotos do roteiro")
+        fotos = {}
     except Exception as e:
-        print(f"Erro ao ler PDF {pdf_path}: {e}")
-        return ""
+        print(f"  ⚠️ Erro buscando fotos do roteiro: {e}")
+        fotos = {}
+    finally:
+        # Uma busca atrasada termina sozinha; não segura a extração
+        executor.shutdown(wait=False, cancel_futures=True)
 
+    _aplicar_fotos_dos_dias(roteiro, pendentes, fotos)
 
-def extract_destinations_from_data(data: dict) -> list[str]:
-    """Extrai lista de destinos dos HOTÉIS apenas."""
-    destinations: list[str] = []
 
-    if "hoteis" in data and isinstance(data["hoteis"], list):
-        for hotel in data["hoteis"]:
-            if "cidade" in hotel:
-                city = hotel["cidade"].strip()
-                if city and city not in destinations:
-                    destinations.append(city)
+async def _buscar_fotos_async(busca: Awaitable[Any], vazio: Any) -> Any:
+    """Busca de fotos com o prazo de DAY_PHOTO_TIMEOUT_S; se estourar ou falhar, devolve vazio."""
+    try:
+        return await asyncio.wait_for(busca, timeout=DAY_PHOTO_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        print("  ⏱️ Tempo esgotado buscando fotos do roteiro")
+    except Exception as e:
+        print(f"  ⚠️ Erro buscando fotos do roteiro: {e}")
+    return vazio
+
+
+def extract_destinations_from_data(data: dict) -> list[str]:
+    """Extrai lista de destinos dos HOTÉIS (trip_images.extract_cities_from_trip)."""
+    destinations = trip_images.extract_cities_from_trip({"hoteis": data.get("hoteis") or []})
 
     print(
         f"🗺️ Destinos identificados: "
@@ -49,46 +125,123 @@ def extract_destinations_from_data(data: dict) -> list[str]:
     return destinations
 
 
-def extract_travel_data(trip_folder: Path, cliente_nome: str = "") -> dict:
-    """
-    Extrai dados de viagem dos arquivos usando OpenAI.
+def adicionar_imagens_destinos(extracted_data: dict) -> None:
+    """Hero e imagens por cidade a partir dos hotéis (via trip_images)."""
+    destinations = extract_destinations_from_data(extracted_data)
+    if not destinations:
+        print("⚠️ Nenhum destino identificado, imagem não adicionada")
 
-    Args:
-        trip_folder: Pasta com os arquivos enviados
-        cliente_nome: Nome do cliente (opcional)
+    trip_images.enriquecer_imagens(extracted_data)
+    if destinations:
+        print(f"✅ Imagens adicionadas para {len(destinations)} cidade(s)")
 
-    Returns:
-        Dados estruturados da viagem (com imagem do destino e roteiro)
-    """
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY não configurada no arquivo .env")
+def adicionar_roteiro(extracted_data: dict) -> None:
+    from generate_itinerary import generate_itinerary
 
-    client = OpenAI(api_key=api_key)
+    print("📅 Gerando roteiro...")
+    roteiro = generate_itinerary(extracted_data)
+    extracted_data["roteiro"] = roteiro
+    print(f"✅ Roteiro gerado: {len(roteiro)} dias")
 
-    files_content: list[str] = []
-    for file_path in trip_folder.glob("*"):
-        if file_path.suffix.lower() == ".pdf":
-            text = read_pdf_text(file_path)
-            if text.strip():
-                files_content.append(
-                    f"=== Arquivo: {file_path.name} ===\n{text}"
-                )
 
-    if not files_content:
-        print("⚠️ Nenhum PDF encontrado, usando dados simulados")
-        return get_mock_data(cliente_nome)
+def adicionar_fotos_dos_dias(extracted_data: dict) -> None:
+    roteiro = extracted_data.get("roteiro") or []
+    if not roteiro:
+        return
 
-    all_text = "\n\n".join(files_content)
+    print("📸 Buscando fotos específicas para cada dia do roteiro...")
+    resolver_fotos_dos_dias(roteiro, cidade_principal(extracted_data))
+    print(f"✅ Fotos processadas para {len(roteiro)} dias")
 
-    prompt = f"""Analise o seguinte conteúdo de orçamento de viagem e extraia as informações em formato JSON.
+
+def cidade_principal(extracted_data: dict) -> str:
+    return (extracted_data.get("hoteis") or [{}])[0].get("cidade", "")
+
+
+async def stream_roteiro_com_fotos_async(
+    extracted_data: dict, regenerar: bool = False
+) -> AsyncIterator[tuple[str, dict]]:
+    """
+    Gera o roteiro em stream, com os eventos ("dia", dia) e ("foto", ...).
+
+    Cada dia sai assim que fecha no stream, com a foto que as camadas sem
+    LLM (catálogo, matcher local, cache de matches) encontram, ou a de
+    fallback; o primeiro dia chega ao vendedor sem esperar o roteiro
+    inteiro. Os landmarks que só o LLM resolve, de todos os dias, vão numa
+    chamada só depois do último dia (como em resolver_fotos_dos_dias), e
+    cada foto encontrada sai como ("foto", {"indice", "dia", "imagem_dia"}),
+    já aplicada ao dia. Roda no event loop, sem prender uma thread por
+    stream aberto.
+    """
+    from generate_itinerary import generate_itinerary_stream_async
+    from image_search import resolver_imagens_da_trip_async, resolver_imagens_sem_llm_async
+
+    cidade = cidade_principal(extracted_data)
+    roteiro: list[dict] = []
+    # (índice, cidade, landmark) dos dias que esperam o LLM
+    para_o_llm: list[tuple[int, str, str]] = []
+
+    async for dia in generate_itinerary_stream_async(extracted_data, regenerar):
+        indice = len(roteiro)
+        roteiro.append(dia)
+        pendentes, pedidos = _pedidos_dos_dias([dia], cidade)
+        if pendentes:
+            fotos, sem_match = await _buscar_fotos_async(
+                resolver_imagens_sem_llm_async(pedidos), ({}, {})
+            )
+            _, cidade_dia, landmark = pendentes[0]
+            if landmark in sem_match.get(cidade_dia, []):
+                para_o_llm.append((indice, cidade_dia, landmark))
+            elif fotos.get(cidade_dia, {}).get(landmark):
+                dia["imagem_dia"] = fotos[cidade_dia][landmark]
+        if not dia.get("imagem_dia"):
+            dia["imagem_dia"] = FALLBACK_DAY_IMAGE
+        yield "dia", dia
+
+    if not para_o_llm:
+        return
+
+    pedidos: dict[str, list[str]] = {}
+    for _, cidade_dia, landmark in para_o_llm:
+        pedidos.setdefault(cidade_dia, []).append(landmark)
+    fotos = await _buscar_fotos_async(resolver_imagens_da_trip_async(pedidos), {})
+    for indice, cidade_dia, landmark in para_o_llm:
+        foto = fotos.get(cidade_dia, {}).get(landmark)
+        if foto:
+            roteiro[indice]["imagem_dia"] = foto
+            print(f"  Dia {roteiro[indice].get('dia')}: {landmark} 💎 Foto curada encontrada")
+            yield "foto", {"indice": indice, "dia": roteiro[indice].get("dia"), "imagem_dia": foto}
+
+
+def montar_prompt_extracao(
+    texto: str,
+    cliente_nome: str = "",
+    parte: Optional[tuple[int, int]] = None,
+) -> str:
+    """
+    Prompt de extração do orçamento.
+
+    Args:
+        texto: Conteúdo dos arquivos ("=== Arquivo: ... ===" + texto)
+        cliente_nome: Nome do cliente (opcional)
+        parte: (índice, total) quando o texto é só uma parte do orçamento
+            (chunked_extraction); sem isso o prompt é o de sempre
+    """
+    instrucao_parte = (
+        f"\n- Este é o trecho {parte[0]} de {parte[1]} do orçamento: extraia só o "
+        "que aparece nele, sem completar com valores estimados (listas vazias e "
+        "valor 0 para o que não estiver aqui)"
+        if parte
+        else ""
+    )
+    return f"""Analise o seguinte conteúdo de orçamento de viagem e extraia as informações em formato JSON.
 
 CONTEÚDO DOS ARQUIVOS:
-{all_text}
+{texto}
 
 INSTRUÇÕES:
-- Extraia TODAS as informações disponíveis
+- Extraia TODAS as informações disponíveis{instrucao_parte}
 - Use o formato JSON exato especificado abaixo
 - Se algum campo não estiver disponível, use valores razoáveis ou deixe vazio
 - Datas no formato DD/MM ou DD/MM/AAAA
@@ -134,87 +287,208 @@ FORMATO JSON (retorne APENAS JSON, sem texto adicional):
   }}
 }}"""
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "Você é um assistente especializado em extrair dados "
-                        "de orçamentos de viagem. Retorne SEMPRE em formato "
-                        "JSON válido."
-                    ),
-                },
-                {
-                    "role": "user",
-                    "content": prompt,
-                },
-            ],
-            temperature=0.1,
-            response_format={"type": "json_object"},
-        )
 
-        result_text = response.choices[0].message.content
-        extracted_data = json.loads(result_text)
+def extrair_com_llm(prompt: str) -> dict:
+    response = llm_gateway.chat(
+        "extracao",
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    "Você é um assistente especializado em extrair dados "
+                    "de orçamentos de viagem. Retorne SEMPRE em formato "
+                    "JSON válido."
+                ),
+            },
+            {
+                "role": "user",
+                "content": prompt,
+            },
+        ],
+        temperature=0.1,
+        response_format={"type": "json_object"},
+    )
+    return json.loads(response.content)
 
-        if cliente_nome:
-            extracted_data["cliente"] = cliente_nome
 
-        print(f"✅ Extração bem-sucedida de {len(files_content)} arquivo(s)")
+def extract_travel_data(
+    trip_folder: Path,
+    cliente_nome: str = "",
+    on_stage: Optional[Callable[[str], None]] = None,
+    gerar_roteiro: bool = True,
+    on_report: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Extrai dados de viagem dos arquivos usando OpenAI.
 
-        destinations = extract_destinations_from_data(extracted_data)
-        if destinations:
-            print(f"🖼️ Buscando imagens para destinos: {destinations}")
+    Layouts conhecidos (template_extractor) saem direto das regras; o LLM só
+    completa os campos de baixa confiança. Os demais vão inteiros ao LLM,
+    num prompt só até PDF_PROMPT_TOKEN_BUDGET tokens e em partes paralelas
+    acima disso (chunked_extraction).
 
-            hero_image = get_hero_image_for_trip(destinations)
-            extracted_data["imagem_hero"] = hero_image
+    Args:
+        trip_folder: Pasta com os arquivos enviados
+        cliente_nome: Nome do cliente (opcional)
+        on_stage: Callback chamado no início de cada etapa (status do job)
+        gerar_roteiro: False deixa o roteiro para o stream
+            (GET /trips/{trip_id}/roteiro/stream)
+        on_report: Recebe o relatório do pré-processamento do texto (pdf_preprocess),
+            com o template reconhecido e a confiança de cada campo em "template"
 
-            all_images = get_images_for_all_cities(destinations)
-            extracted_data["imagens_cidades"] = all_images
+    Returns:
+        Dados estruturados da viagem (com imagem do destino e roteiro)
+    """
 
-            print(f"✅ Imagens adicionadas para {len(destinations)} cidade(s)")
-        else:
-            print("⚠️ Nenhum destino identificado, imagem não adicionada")
+    def stage(nome: str) -> None:
+        if on_stage:
+            on_stage(nome)
+
+    stage("lendo_pdfs")
+    pdf_paths = sorted(
+        file_path
+        for file_path in trip_folder.glob("*")
+        if file_path.suffix.lower() == ".pdf"
+    )
+    with metrics.cronometro("leitura_pdf"):
+        paginas_por_arquivo = read_pdfs_pages(pdf_paths)
+
+    stage("preparando_texto")
+    with metrics.cronometro("preparando_texto"):
+        preparado = preparar_texto(
+            [(file_path.name, paginas_por_arquivo[file_path]) for file_path in pdf_paths],
+            orcamento_tokens=max(
+                PDF_PROMPT_TOKEN_BUDGET, EXTRACAO_PARTE_TOKENS * EXTRACAO_MAX_PARTES
+            ),
+        )
+    relatorio = preparado.relatorio
+    print(
+        f"✂️ Texto dos PDFs: {relatorio['tokens_originais']} → "
+        f"{relatorio['tokens_finais']} tokens (-{relatorio['reducao_pct']}%), "
+        f"{relatorio['paginas_duplicadas']} página(s) duplicada(s), "
+        f"{relatorio['linhas_boilerplate']} linha(s) de texto padrão"
+    )
 
-        from generate_itinerary import generate_itinerary
+    stage("aplicando_template")
+    # O template lê as páginas já deduplicadas: um PDF enviado duas vezes
+    # entra uma vez só e não dobra o valor do pacote
+    paginas_limpas: Dict[str, List[str]] = {}
+    for pagina in preparado.paginas:
+        paginas_limpas.setdefault(pagina.arquivo, []).append(pagina.texto)
+    with metrics.cronometro("template"):
+        por_template = extrair_por_template(list(paginas_limpas.items()), cliente_nome)
+    if por_template:
+        relatorio["template"] = por_template.relatorio()
+        incertos = por_template.incertos()
+        print(
+            f"🧩 Template {por_template.template} em {por_template.tempo_ms:.1f}ms; "
+            f"campos incertos: {', '.join(incertos) if incertos else 'nenhum'}"
+        )
+    # Até PDF_PROMPT_TOKEN_BUDGET vai num prompt só; acima disso, em partes
+    partes = (
+        dividir_em_partes(preparado.paginas)
+        if relatorio["tokens_finais"] > PDF_PROMPT_TOKEN_BUDGET
+        else []
+    )
+    relatorio["partes"] = len(partes) or 1
+    if on_report:
+        on_report(relatorio)
 
-        print("📅 Gerando roteiro...")
-        roteiro = generate_itinerary(extracted_data)
-        extracted_data["roteiro"] = roteiro
-        print(f"✅ Roteiro gerado: {len(roteiro)} dias")
+    files_content: list[str] = [
+        f"=== Arquivo: {nome} ===\n{text}"
+        for nome, text in preparado.arquivos
+        if text.strip()
+    ]
 
-        if roteiro:
+    if not files_content:
+        print("⚠️ Nenhum PDF encontrado, usando dados simulados")
+        return get_mock_data(cliente_nome)
+
+    all_text = "\n\n".join(files_content)
+
+    # Só o template completo dispensa o LLM; sem template não há o que fazer
+    if not por_template and not llm_gateway.disponivel():
+        raise ValueError("OPENAI_API_KEY não configurada no arquivo .env")
+
+    try:
+        if por_template and por_template.completa:
+            extracted_data = copy.deepcopy(por_template.dados)
+            print("⚡ Extração pelo template, sem LLM")
+        elif por_template and not llm_gateway.disponivel():
+            print("⚠️ OPENAI_API_KEY não configurada; campos incertos ficam com o template")
+            extracted_data = copy.deepcopy(por_template.dados)
+        elif por_template:
+            stage("completando_lacunas")
+            try:
+                with metrics.cronometro("extracao_llm"):
+                    extracted_data = completar_lacunas(
+                        por_template,
+                        all_text,
+                        lambda messages: llm_gateway.chat(
+                            "lacunas",
+                            messages=messages,
+                            temperature=0.1,
+                            response_format={"type": "json_object"},
+                        ).content,
+                    )
+                print(
+                    f"🧩 LLM completou: "
+                    f"{', '.join(por_template.completados_llm) or 'nenhum campo'}"
+                )
+            except Exception as e:
+                # Os valores do template continuam sendo o melhor palpite
+                print(f"⚠️ LLM não completou os campos incertos: {e}")
+                extracted_data = copy.deepcopy(por_template.dados)
+        elif len(partes) > 1:
+            stage("extraindo_dados")
             print(
-                "📸 Buscando fotos específicas para cada dia do roteiro..."
+                f"🧱 Texto grande ({relatorio['tokens_finais']} tokens): extraindo em "
+                f"{len(partes)} partes (maior {max(p.tokens for p in partes)} tokens)"
             )
-            from supabase_images import buscar_imagem
-
-            for dia in roteiro:
-                landmark = dia.get("landmark")
-                cidade = (
-                    extracted_data.get("hoteis", [{}])[0]
-                    .get("cidade", "")
+            with metrics.cronometro("extracao_llm"):
+                extracted_data = extrair_em_partes(
+                    partes,
+                    lambda parte, i, total: extrair_com_llm(
+                        montar_prompt_extracao(parte.texto, cliente_nome, (i, total))
+                    ),
+                    cliente_nome,
+                )
+        else:
+            stage("extraindo_dados")
+            with metrics.cronometro("extracao_llm"):
+                extracted_data = extrair_com_llm(
+                    montar_prompt_extracao(all_text, cliente_nome)
                 )
 
-                if landmark and cidade:
-                    print(f"  Dia {dia.get('dia')}: {landmark}")
-
-                    foto = buscar_imagem(cidade, landmark)
+            if cliente_nome:
+                extracted_data["cliente"] = cliente_nome
 
-                    if foto:
-                        dia["imagem_dia"] = foto
-                        print("    💎 Foto curada encontrada")
-                    else:
-                        print(
-                            "    ⚠️ Sem foto curada, usando fallback"
-                        )
-                        dia["imagem_dia"] = (
-                            "https://images.unsplash.com/"
-                            "photo-1488646953014-85cb44e25828?w=1200"
-                        )
+        print(f"✅ Extração bem-sucedida de {len(files_content)} arquivo(s)")
 
-            print(f"✅ Fotos processadas para {len(roteiro)} dias")
+        # Imagens das cidades e roteiro não dependem um do outro; as fotos
+        # dos dias só esperam o roteiro.
+        etapas = [
+            Etapa("buscando_imagens", lambda: adicionar_imagens_destinos(extracted_data)),
+        ]
+        if gerar_roteiro:
+            etapas += [
+                Etapa("gerando_roteiro", lambda: adicionar_roteiro(extracted_data)),
+                Etapa(
+                    "buscando_fotos",
+                    lambda: adicionar_fotos_dos_dias(extracted_data),
+                    depende_de=("gerando_roteiro",),
+                ),
+            ]
+        grafo = executar_etapas(
+            etapas,
+            on_stage=on_stage,
+        )
+        for nome, (ini, fim) in grafo.tempos.items():
+            metrics.observar_etapa(nome, fim - ini)
+        print(
+            "⏱️ Etapas pós-extração: "
+            + ", ".join(f"{nome} {fim - ini:.1f}s" for nome, (ini, fim) in grafo.tempos.items())
+            + f" | total {grafo.total_s:.1f}s"
+        )
 
         return extracted_data
 
@@ -262,10 +536,9 @@ def get_mock_data(cliente_nome: str = "") -> dict:
             "descricao": "Aéreo + Hotel (casal)",
             "valor": 6656,
         },
+        # Marca dados simulados para que não entrem no cache de extrações
+        "simulado": True,
     }
 
-    destinations = extract_destinations_from_data(mock_data)
-    if destinations:
-        mock_data["imagem_hero"] = get_hero_image_for_trip(destinations)
-
+    trip_images.enriquecer_imagens(mock_data)
     return mock_data
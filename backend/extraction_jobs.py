@@ -0,0 +1,139 @@
+"""
+Fila de extrações em segundo plano.
+
+POST /extract/{trip_id} apenas enfileira o trabalho e devolve um job_id;
+um pool limitado de threads executa as extrações, e o andamento
+(queued, running, done, failed + etapa atual) é consultado por
+GET /extract/{trip_id}/status. Assim o event loop do uvicorn nunca
+fica preso esperando PyPDF2, OpenAI ou Supabase.
+
+Jobs terminados ficam em memória por EXTRACTION_JOB_TTL_S e no máximo
+EXTRACTION_JOBS_MAX deles; depois o status de uma trip concluída vem do
+arquivo em disco (main.get_extraction_status).
+"""
+
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+EXTRACTION_JOB_TTL_S = float(os.getenv("EXTRACTION_JOB_TTL_S", "3600"))
+EXTRACTION_JOBS_MAX = int(os.getenv("EXTRACTION_JOBS_MAX", "1000"))
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# Função de trabalho: recebe o callback de etapa e devolve metadados do resultado
+JobFunc = Callable[[Callable[[str], None]], Optional[Dict[str, Any]]]
+
+
+@dataclass
+class ExtractionJob:
+    job_id: str
+    trip_id: str
+    status: str = STATUS_QUEUED
+    stage: Optional[str] = None
+    error: Optional[str] = None
+    result: Dict[str, Any] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def ativo(self) -> bool:
+        return self.status in (STATUS_QUEUED, STATUS_RUNNING)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ExtractionQueue:
+    """Pool limitado de workers com o último job de cada trip em memória."""
+
+    def __init__(
+        self,
+        max_workers: int = EXTRACTION_WORKERS,
+        ttl_s: float = EXTRACTION_JOB_TTL_S,
+        max_jobs: int = EXTRACTION_JOBS_MAX,
+    ) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="extracao"
+        )
+        self._jobs: Dict[str, ExtractionJob] = {}
+        self._lock = threading.Lock()
+        self.ttl_s = ttl_s
+        self.max_jobs = max_jobs
+
+    def _evictar(self) -> None:
+        """Remove jobs terminados vencidos e, acima do máximo, os mais antigos (com o lock)."""
+        agora = time.time()
+        terminados = sorted(
+            (job.finished_at or job.created_at, trip_id)
+            for trip_id, job in self._jobs.items()
+            if not job.ativo
+        )
+        excesso = len(self._jobs) - self.max_jobs
+        for fim, trip_id in terminados:
+            if agora - fim > self.ttl_s or excesso > 0:
+                del self._jobs[trip_id]
+                excesso -= 1
+
+    def submeter(self, trip_id: str, func: JobFunc) -> ExtractionJob:
+        """
+        Enfileira a extração da trip.
+
+        Se já existe um job ativo para a mesma trip, ele é reaproveitado
+        em vez de disparar uma segunda extração concorrente.
+        """
+        with self._lock:
+            atual = self._jobs.get(trip_id)
+            if atual and atual.ativo:
+                return atual
+
+            job = ExtractionJob(job_id=uuid.uuid4().hex, trip_id=trip_id)
+            self._jobs[trip_id] = job
+            self._evictar()
+
+        self._executor.submit(self._executar, job, func)
+        return job
+
+    def status(self, trip_id: str) -> Optional[ExtractionJob]:
+        with self._lock:
+            self._evictar()
+            return self._jobs.get(trip_id)
+
+    def _set_stage(self, job: ExtractionJob, stage: str) -> None:
+        with self._lock:
+            job.stage = stage
+
+    def _executar(self, job: ExtractionJob, func: JobFunc) -> None:
+        with self._lock:
+            job.status = STATUS_RUNNING
+            job.started_at = time.time()
+
+        try:
+            result = func(lambda stage: self._set_stage(job, stage))
+            with self._lock:
+                job.result = result or {}
+                job.status = STATUS_DONE
+        except Exception as e:
+            traceback.print_exc()
+            with self._lock:
+                job.error = str(e)
+                job.status = STATUS_FAILED
+        finally:
+            with self._lock:
+                job.finished_at = time.time()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+extraction_queue = ExtractionQueue()
@@ -2,33 +2,27 @@
 Gera roteiro dia-a-dia usando OpenAI GPT-4.
 """
 
-import os
-from openai import OpenAI
 from datetime import datetime, timedelta
+from typing import AsyncIterator
 import json
 from dotenv import load_dotenv
 
+import llm_gateway
+from json_stream import ArrayJsonIncremental
+
 load_dotenv()
 
+ROTEIRO_TEMPERATURE = 0.7
+ROTEIRO_MAX_TOKENS = 3000
 
-def generate_itinerary(trip_data: dict) -> list[dict]:
+
+def montar_mensagens(trip_data: dict) -> tuple[str, list[dict]]:
     """
-    Gera roteiro inteligente baseado nos dados da viagem.
-    
-    Args:
-        trip_data: Dados extraídos da viagem (voos, hotéis, passeios, etc)
-    
+    Monta o prompt do roteiro.
+
     Returns:
-        Lista de dias do roteiro com título, descrição, landmark (para busca de foto), etc.
+        (cidade principal, mensagens para o LLM)
     """
-    
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        print("⚠️ OPENAI_API_KEY não configurada")
-        return []
-    
-    client = OpenAI(api_key=api_key)
-    
     # Extrair informações essenciais
     periodo = trip_data.get("periodo", {})
     voos = trip_data.get("voos", [])
@@ -139,26 +133,55 @@ FORMATO JSON (retorne APENAS JSON array limpo, sem ```json):
 
 IMPORTANTE: CADA DIA DEVE TER UM LANDMARK DIFERENTE para garantir variedade visual nas fotos!"""
 
+    messages = [
+        {
+            "role": "system",
+            "content": "Você é um especialista em roteiros de viagem. Crie roteiros detalhados, práticos e inspiradores. SEMPRE inclua o campo 'landmark' em cada dia. Retorne APENAS JSON array limpo, sem markdown."
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+    return cidade_principal, messages
+
+
+def completar_dia(dia: dict, cidade_principal: str) -> dict:
+    """Garante o landmark do dia (a foto do dia depende dele)."""
+    if "landmark" not in dia:
+        print(f"⚠️ Dia {dia.get('dia')} sem landmark, adicionando genérico")
+        dia["landmark"] = f"{cidade_principal} cityscape"
+    return dia
+
+
+def generate_itinerary(trip_data: dict) -> list[dict]:
+    """
+    Gera roteiro inteligente baseado nos dados da viagem.
+    
+    Args:
+        trip_data: Dados extraídos da viagem (voos, hotéis, passeios, etc)
+    
+    Returns:
+        Lista de dias do roteiro com título, descrição, landmark (para busca de foto), etc.
+    """
+    
+    if not llm_gateway.disponivel():
+        print("⚠️ OPENAI_API_KEY não configurada")
+        return []
+    
+    cidade_principal, messages = montar_mensagens(trip_data)
+
     try:
         print("🤖 Chamando OpenAI...")
         
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Você é um especialista em roteiros de viagem. Crie roteiros detalhados, práticos e inspiradores. SEMPRE inclua o campo 'landmark' em cada dia. Retorne APENAS JSON array limpo, sem markdown."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.7,
-            max_tokens=3000
+        response = llm_gateway.chat(
+            "roteiro",
+            messages=messages,
+            temperature=ROTEIRO_TEMPERATURE,
+            max_tokens=ROTEIRO_MAX_TOKENS,
         )
         
-        result_text = response.choices[0].message.content.strip()
+        result_text = response.content.strip()
         
         print("✅ Resposta recebida")
         print(f"📏 Tamanho: {len(result_text)} caracteres")
@@ -179,9 +202,7 @@ IMPORTANTE: CADA DIA DEVE TER UM LANDMARK DIFERENTE para garantir variedade visu
         
         # Validar que todos os dias têm landmark
         for dia in dias:
-            if "landmark" not in dia:
-                print(f"⚠️ Dia {dia.get('dia')} sem landmark, adicionando genérico")
-                dia["landmark"] = f"{cidade_principal} cityscape"
+            completar_dia(dia, cidade_principal)
         
         return dias
         
@@ -196,6 +217,37 @@ IMPORTANTE: CADA DIA DEVE TER UM LANDMARK DIFERENTE para garantir variedade visu
         return []
 
 
+async def generate_itinerary_stream_async(
+    trip_data: dict, regenerar: bool = False
+) -> AsyncIterator[dict]:
+    """
+    Gera o roteiro em stream, com o cliente assíncrono: cada dia sai assim
+    que o LLM termina de escrevê-lo, sem esperar a resposta inteira. Com
+    regenerar o roteiro em cache é ignorado e o LLM escreve um novo.
+
+    Raises:
+        ValueError: OPENAI_API_KEY não configurada
+        json.JSONDecodeError: o LLM devolveu um dia que não é JSON válido
+    """
+    if not llm_gateway.disponivel():
+        raise ValueError("OPENAI_API_KEY não configurada")
+
+    cidade_principal, messages = montar_mensagens(trip_data)
+    parser = ArrayJsonIncremental()
+
+    print("🤖 Chamando OpenAI (stream)...")
+    async for pedaco in llm_gateway.chat_stream_async(
+        "roteiro",
+        messages=messages,
+        temperature=ROTEIRO_TEMPERATURE,
+        max_tokens=ROTEIRO_MAX_TOKENS,
+        ler_cache=not regenerar,
+    ):
+        # Consome até o fim (mesmo depois do "]") para a resposta ir ao cache
+        for dia in parser.alimentar(pedaco):
+            yield completar_dia(dia, cidade_principal)
+
+
 if __name__ == "__main__":
     test_data = {
         "periodo": {"inicio": "30/01", "fim": "06/02"},
@@ -6,33 +6,192 @@ com suporte a matching semântico de landmarks via IA.
 from dotenv import load_dotenv
 load_dotenv()
 
+import asyncio
+import json
 import os
-from typing import Optional, List
+import threading
+import time
+import weakref
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from supabase import create_client, Client
-from openai import OpenAI
+import landmark_match_cache
+import llm_gateway
+import landmark_matcher
+import metrics
+import supabase_client
+from catalog_snapshot import snapshot
+from supabase_client import get_supabase
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = (
-    os.getenv("SUPABASE_ANON_KEY")
-    or os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-    or os.getenv("SUPABASE_KEY")
-)
+supabase = get_supabase()
 
-supabase: Optional[Client] = None
+# Catálogo de cada cidade (todas as linhas de destination_images) fica em
+# memória por CITY_CATALOG_TTL_S: um roteiro inteiro resolve seus landmarks
+# com uma única consulta por cidade.
+CITY_CATALOG_TTL_S = float(os.getenv("CITY_CATALOG_TTL_S", "300"))
+
+_catalogo_cidades: Dict[str, Tuple[float, List[dict]]] = {}
+_catalogo_locks: Dict[str, threading.Lock] = {}
+_catalogo_lock = threading.Lock()
+# Mesmo papel dos locks acima, para as buscas do event loop. Um asyncio.Lock
+# só vale no loop em que foi usado, então há um conjunto por loop (o do
+# servidor, ou os de cada TestClient/benchmark), que some junto com ele
+# loop → {cidade: asyncio.Lock}
+_catalogo_locks_async: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+COLUNAS_CATALOGO_CIDADE = "image_url, description, landmark, quality"
+
+
+def _lock_da_cidade(city: str) -> threading.Lock:
+    with _catalogo_lock:
+        return _catalogo_locks.setdefault(city, threading.Lock())
+
+
+def _lock_async_da_cidade(city: str) -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    with _catalogo_lock:
+        return _catalogo_locks_async.setdefault(loop, {}).setdefault(city, asyncio.Lock())
+
+
+def _catalogo_em_cache(city: str) -> Tuple[Optional[Tuple[float, List[dict]]], bool]:
+    """(entrada do cache por TTL, se ainda vale)"""
+    em_cache = _catalogo_cidades.get(city)
+    return em_cache, bool(em_cache and time.monotonic() - em_cache[0] < CITY_CATALOG_TTL_S)
+
+
+def _guardar_catalogo(city: str, linhas: List[dict]) -> List[dict]:
+    validas = [x for x in linhas if isinstance(x.get("landmark"), str)]
+    _catalogo_cidades[city] = (time.monotonic(), validas)
+    return validas
+
+
+def _catalogo_apos_erro(
+    city: str, em_cache: Optional[Tuple[float, List[dict]]], erro: Exception
+) -> List[dict]:
+    print(f"⚠️ Erro ao carregar catálogo de {city}: {erro}")
+    # Mantém o catálogo anterior (mesmo vencido) se houver
+    return em_cache[1] if em_cache else []
+
+
+@metrics.cronometrado("catalogo")
+def carregar_catalogo_cidade(city: str, forcar: bool = False) -> List[dict]:
+    """
+    Todas as imagens cadastradas para a cidade (image_url, description, landmark).
+
+    Com o snapshot do catálogo carregado, sai direto da memória. Sem ele,
+    uma consulta ao Supabase por cidade a cada CITY_CATALOG_TTL_S; buscas
+    simultâneas da mesma cidade esperam a primeira em vez de repetir a consulta.
+    """
+    linhas_snapshot = snapshot.cidade(city)
+    if linhas_snapshot is not None and not forcar:
+        return linhas_snapshot
+
+    if not supabase:
+        return []
+
+    with _lock_da_cidade(city):
+        em_cache, valido = _catalogo_em_cache(city)
+        if valido and not forcar:
+            return em_cache[1]
+
+        try:
+            result = (
+                supabase.table("destination_images")
+                .select(COLUNAS_CATALOGO_CIDADE)
+                .eq("city", city)
+                .execute()
+            )
+        except Exception as e:
+            return _catalogo_apos_erro(city, em_cache, e)
+
+        return _guardar_catalogo(city, result.data or [])
+
+
+async def carregar_catalogo_cidade_async(city: str, forcar: bool = False) -> List[dict]:
+    """
+    Como carregar_catalogo_cidade, sem prender uma thread: a consulta vai
+    pelo cliente PostgREST assíncrono (supabase_client.selecionar). Divide
+    o cache por TTL com a versão síncrona.
+    """
+    linhas_snapshot = snapshot.cidade(city)
+    if linhas_snapshot is not None and not forcar:
+        return linhas_snapshot
+
+    if not supabase_client.configurado():
+        return []
+
+    with metrics.cronometro("catalogo"):
+        async with _lock_async_da_cidade(city):
+            em_cache, valido = _catalogo_em_cache(city)
+            if valido and not forcar:
+                return em_cache[1]
+
+            try:
+                result = await supabase_client.selecionar(
+                    "destination_images", COLUNAS_CATALOGO_CIDADE, {"city": city}
+                )
+            except Exception as e:
+                return _catalogo_apos_erro(city, em_cache, e)
+
+            return _guardar_catalogo(city, result)
 
-if SUPABASE_URL and SUPABASE_KEY:
-    try:
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-        print("✅ Conexão com Supabase inicializada em supabase_images")
-    except Exception as e:
-        print(f"⚠️ Erro ao conectar no Supabase em supabase_images: {e}")
-        supabase = None
-else:
-    print("ℹ️ Variáveis SUPABASE_URL ou SUPABASE_KEY não configuradas")
 
+async def carregar_catalogos_async(cidades: Iterable[str]) -> Dict[str, List[dict]]:
+    """Catálogos de várias cidades, buscados ao mesmo tempo."""
+    cidades = list(dict.fromkeys(cidades))
+    linhas = await asyncio.gather(*(carregar_catalogo_cidade_async(c) for c in cidades))
+    return dict(zip(cidades, linhas))
 
-def encontrar_landmark_semantico(city: str, landmark_buscado: str) -> Optional[str]:
+
+def _imagem_do_landmark(catalogo: Iterable[dict], landmark: str) -> Optional[dict]:
+    for img in catalogo:
+        if img.get("landmark") == landmark:
+            return img
+    return None
+
+
+def _resolver_sem_llm(
+    city: str, landmark_buscado: str, landmarks_disponiveis: List[str]
+) -> Tuple[bool, Optional[str]]:
+    """
+    Camadas baratas do matching: exato, matcher local e cache de matches.
+
+    Returns:
+        (resolvido, landmark do catálogo ou None); resolvido=False significa
+        que só o LLM pode responder
+    """
+    if landmark_buscado in landmarks_disponiveis:
+        landmark_matcher.registrar("exato")
+        return True, landmark_buscado
+
+    # Camada local: acento/caixa, apelidos e similaridade, sem LLM
+    local = landmark_matcher.casar_localmente(landmark_buscado, landmarks_disponiveis)
+    if local.landmark:
+        landmark_matcher.registrar(local.tier)
+        print(
+            f"🔎 [MATCH LOCAL:{local.tier}] '{landmark_buscado}' → "
+            f"'{local.landmark}' ({local.score:.2f})"
+        )
+        return True, local.landmark
+
+    versao = landmark_match_cache.versao_landmarks(landmarks_disponiveis)
+    em_cache, resultado_cache = landmark_match_cache.buscar(city, landmark_buscado, versao)
+    if em_cache:
+        landmark_matcher.registrar("cache")
+        print(
+            f"🧠 [MATCH EM CACHE] '{landmark_buscado}' → "
+            f"'{resultado_cache or 'NENHUM'}'"
+        )
+        return True, resultado_cache
+
+    return False, None
+
+
+@metrics.cronometrado("match_semantico")
+def encontrar_landmark_semantico(
+    city: str,
+    landmark_buscado: str,
+    landmarks_disponiveis: Optional[List[str]] = None,
+) -> Optional[str]:
     """
     Usa IA para encontrar o landmark correto no banco
     através de matching semântico.
@@ -41,40 +200,36 @@ def encontrar_landmark_semantico(city: str, landmark_buscado: str) -> Optional[s
     "Ponte da Mulher" → "Puerto Madero"
     "La Boca" → "Caminito"
     "Cemitério" → "Cemitério da Recoleta"
+
+    Se `landmarks_disponiveis` não for passado, usa o catálogo da cidade.
+    Antes do LLM tenta o matcher local (landmark_matcher) e o cache de
+    matches já resolvidos (landmark_match_cache).
     """
     if not supabase:
         return None
 
     try:
-        result = (
-            supabase.table("destination_images")
-            .select("landmark")
-            .eq("city", city)
-            .execute()
-        )
-
-        if not result.data or len(result.data) == 0:
-            return None
-
-        landmarks_disponiveis: List[str] = [
-            x.get("landmark")
-            for x in result.data
-            if isinstance(x.get("landmark"), str)
-        ]
+        if landmarks_disponiveis is None:
+            landmarks_disponiveis = [
+                x["landmark"] for x in carregar_catalogo_cidade(city)
+            ]
 
         if not landmarks_disponiveis:
             return None
 
-        if landmark_buscado in landmarks_disponiveis:
-            return landmark_buscado
+        resolvido, match = _resolver_sem_llm(
+            city, landmark_buscado, landmarks_disponiveis
+        )
+        if resolvido:
+            return match
 
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
+        versao = landmark_match_cache.versao_landmarks(landmarks_disponiveis)
+
+        if not llm_gateway.disponivel():
             print("ℹ️ OPENAI_API_KEY não configurada para matching semântico")
+            landmark_matcher.registrar("nenhum")
             return None
 
-        client = OpenAI(api_key=api_key)
-
         lista_formatada = "\n".join([f"- {l}" for l in landmarks_disponiveis])
 
         prompt = f"""Você é um especialista em pontos turísticos.
@@ -99,8 +254,8 @@ REGRAS:
 Retorne APENAS o nome exato do landmark da lista, ou "NENHUM".
 Não adicione explicações."""
 
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        response = llm_gateway.chat(
+            "landmarks",
             messages=[
                 {
                     "role": "system",
@@ -118,29 +273,271 @@ Não adicione explicações."""
             max_tokens=50,
         )
 
-        resultado = (response.choices[0].message.content or "").strip()
+        resultado = response.content.strip()
 
-        if resultado in landmarks_disponiveis:
-            print(f"🤖 [IA MATCH] '{landmark_buscado}' → '{resultado}'")
-            return resultado
+        # Qualquer resposta fora da lista conta como NENHUM (cache negativo)
+        match = resultado if resultado in landmarks_disponiveis else None
+        landmark_match_cache.salvar(city, landmark_buscado, versao, match)
 
-        if resultado.upper() == "NENHUM":
-            return None
+        if match:
+            landmark_matcher.registrar("llm")
+            print(f"🤖 [IA MATCH] '{landmark_buscado}' → '{match}'")
+        else:
+            landmark_matcher.registrar("nenhum")
 
-        return None
+        return match
 
     except Exception as e:
         print(f"⚠️ Erro no matching semântico: {e}")
+        landmark_matcher.registrar("nenhum")
         return None
 
 
-def buscar_imagem(city: str, landmark: str) -> Optional[str]:
+def _separar_lote(
+    pedidos: Dict[str, Iterable[str]],
+    catalogos: Dict[str, List[str]],
+) -> Tuple[Dict[str, Dict[str, Optional[str]]], Dict[str, List[str]]]:
+    """
+    Passa cada landmark pelas camadas baratas.
+
+    Returns:
+        (resultado parcial, {cidade: landmarks que só o LLM resolve})
+    """
+    resultado: Dict[str, Dict[str, Optional[str]]] = {}
+    pendentes: Dict[str, List[str]] = {}
+
+    for city, landmarks in pedidos.items():
+        disponiveis = catalogos[city]
+        resultado[city] = {}
+
+        for landmark in dict.fromkeys(landmarks):
+            if not disponiveis:
+                resultado[city][landmark] = None
+                continue
+            resolvido, match = _resolver_sem_llm(city, landmark, disponiveis)
+            if resolvido:
+                resultado[city][landmark] = match
+            else:
+                resultado[city][landmark] = None
+                pendentes.setdefault(city, []).append(landmark)
+
+    return resultado, pendentes
+
+
+def _mensagens_lote(
+    pendentes: Dict[str, List[str]], catalogos: Dict[str, List[str]]
+) -> Tuple[List[dict], Dict[str, object]]:
+    """Mensagens e parâmetros da chamada em lote (iguais no sync e no async)."""
+    total = sum(len(v) for v in pendentes.values())
+
+    secoes = []
+    for city, landmarks in pendentes.items():
+        disponiveis = "\n".join(f"- {l}" for l in catalogos[city])
+        procurados = "\n".join(f"- {l}" for l in landmarks)
+        secoes.append(
+            f"CIDADE: {city}\n\nLANDMARKS DISPONÍVEIS NO BANCO:\n{disponiveis}"
+            f"\n\nLANDMARKS PROCURADOS:\n{procurados}"
+        )
+
+    prompt = f"""Você é um especialista em pontos turísticos.
+
+{chr(10).join(chr(10) + "---" + chr(10) + secao for secao in secoes)}
+
+TAREFA:
+Para cada landmark procurado, identifique qual landmark disponível no banco
+da MESMA cidade corresponde a ele.
+
+REGRAS:
+- "Ponte da Mulher" = "Puerto Madero" (a ponte fica lá)
+- "La Boca" = "Caminito" (Caminito é em La Boca)
+- "Cemitério" = "Cemitério da Recoleta"
+- "Palermo" pode ser "Palermo" ou similar
+- Use SOMENTE nomes exatos da lista de disponíveis
+- Se não houver correspondência clara, use "NENHUM"
+
+FORMATO JSON (retorne APENAS JSON):
+{{"matches": {{"Cidade": {{"landmark procurado": "landmark disponível ou NENHUM"}}}}}}"""
+
+    messages = [
+        {
+            "role": "system",
+            "content": (
+                "Você é especialista em associar landmarks. "
+                "Retorne APENAS JSON válido."
+            ),
+        },
+        {
+            "role": "user",
+            "content": prompt,
+        },
+    ]
+    params = {
+        "temperature": 0.1,
+        "max_tokens": 50 + 40 * total,
+        "response_format": {"type": "json_object"},
+    }
+    return messages, params
+
+
+def _aplicar_lote(
+    resultado: Dict[str, Dict[str, Optional[str]]],
+    pendentes: Dict[str, List[str]],
+    catalogos: Dict[str, List[str]],
+    matches: Dict[str, object],
+) -> Dict[str, Dict[str, Optional[str]]]:
+    """Confere as respostas do LLM contra o catálogo e grava no cache de matches."""
+    total = sum(len(v) for v in pendentes.values())
+
+    for city, landmarks in pendentes.items():
+        disponiveis = catalogos[city]
+        versao = landmark_match_cache.versao_landmarks(disponiveis)
+        respostas = matches.get(city) if isinstance(matches.get(city), dict) else {}
+
+        for landmark in landmarks:
+            resposta = str(respostas.get(landmark) or "").strip()
+            # Qualquer resposta fora da lista conta como NENHUM (cache negativo)
+            match = resposta if resposta in disponiveis else None
+            landmark_match_cache.salvar(city, landmark, versao, match)
+            resultado[city][landmark] = match
+
+            if match:
+                landmark_matcher.registrar("llm")
+                print(f"🤖 [IA MATCH LOTE] '{landmark}' → '{match}'")
+            else:
+                landmark_matcher.registrar("nenhum")
+
+    print(f"🤖 Matching em lote: {total} landmark(s) em 1 chamada")
+    return resultado
+
+
+def _sem_llm_para_lote(pendentes: Dict[str, List[str]], motivo: Optional[str] = None) -> None:
+    if motivo:
+        print(motivo)
+    for _ in range(sum(len(v) for v in pendentes.values())):
+        landmark_matcher.registrar("nenhum")
+
+
+def _preparar_lote(
+    pedidos: Dict[str, Iterable[str]], catalogos: Dict[str, List[str]]
+) -> Tuple[
+    Dict[str, Dict[str, Optional[str]]],
+    Dict[str, List[str]],
+    Optional[Tuple[List[dict], Dict[str, object]]],
+]:
+    """
+    Camadas baratas do lote (mesmas no sync e no async).
+
+    Returns:
+        (resultado parcial, pendentes, (messages, params) da chamada ao LLM
+        ou None se não há o que perguntar)
+    """
+    resultado, pendentes = _separar_lote(pedidos, catalogos)
+    if not pendentes:
+        return resultado, pendentes, None
+
+    if not llm_gateway.disponivel():
+        _sem_llm_para_lote(pendentes, "ℹ️ OPENAI_API_KEY não configurada para matching semântico")
+        return resultado, pendentes, None
+
+    return resultado, pendentes, _mensagens_lote(pendentes, catalogos)
+
+
+def _concluir_lote(
+    resultado: Dict[str, Dict[str, Optional[str]]],
+    pendentes: Dict[str, List[str]],
+    catalogos: Dict[str, List[str]],
+    resposta: Optional[str] = None,
+    erro: Optional[Exception] = None,
+) -> Dict[str, Dict[str, Optional[str]]]:
+    """Aplica a resposta do LLM (ou o erro da chamada) ao resultado do lote."""
+    if erro is None:
+        try:
+            matches = json.loads(resposta or "{}").get("matches") or {}
+        except Exception as e:
+            erro = e
+    if erro is not None:
+        _sem_llm_para_lote(pendentes, f"⚠️ Erro no matching semântico em lote: {erro}")
+        return resultado
+
+    return _aplicar_lote(resultado, pendentes, catalogos, matches)
+
+
+@metrics.cronometrado("match_semantico_lote")
+def encontrar_landmarks_semanticos_lote(
+    pedidos: Dict[str, Iterable[str]],
+    catalogos: Optional[Dict[str, List[str]]] = None,
+) -> Dict[str, Dict[str, Optional[str]]]:
+    """
+    Matching semântico em lote: todos os landmarks de uma trip, agrupados
+    por cidade, resolvidos com no máximo UMA chamada ao LLM.
+
+    Cada landmark passa antes pelas camadas baratas (exato, matcher local,
+    cache); só os que sobram vão para o prompt, que pede um JSON
+    {"matches": {cidade: {procurado: landmark do catálogo ou "NENHUM"}}}.
+
+    Args:
+        pedidos: {cidade: [landmarks procurados]}
+        catalogos: {cidade: [landmarks disponíveis]} (opcional; padrão é o catálogo da cidade)
+
+    Returns:
+        {cidade: {procurado: landmark do catálogo ou None}}
+    """
+    fornecidos = catalogos or {}
+    catalogos = {
+        city: fornecidos[city]
+        if city in fornecidos
+        else [x["landmark"] for x in carregar_catalogo_cidade(city)]
+        for city in pedidos
+    }
+    resultado, pendentes, chamada = _preparar_lote(pedidos, catalogos)
+    if chamada is None:
+        return resultado
+
+    messages, params = chamada
+    try:
+        response = llm_gateway.chat("landmarks", messages=messages, **params)
+    except Exception as e:
+        return _concluir_lote(resultado, pendentes, catalogos, erro=e)
+    return _concluir_lote(resultado, pendentes, catalogos, response.content)
+
+
+async def encontrar_landmarks_semanticos_lote_async(
+    pedidos: Dict[str, Iterable[str]],
+    catalogos: Dict[str, List[str]],
+) -> Dict[str, Dict[str, Optional[str]]]:
+    """
+    Como encontrar_landmarks_semanticos_lote, com a chamada ao LLM pelo
+    cliente assíncrono. Os catálogos já vêm carregados; o cache de matches
+    (disco) é lido e gravado numa thread.
+    """
+    with metrics.cronometro("match_semantico_lote"):
+        resultado, pendentes, chamada = await asyncio.to_thread(_preparar_lote, pedidos, catalogos)
+        if chamada is None:
+            return resultado
+
+        messages, params = chamada
+        try:
+            response = await llm_gateway.chat_async("landmarks", messages=messages, **params)
+        except Exception as e:
+            return _concluir_lote(resultado, pendentes, catalogos, erro=e)
+        return await asyncio.to_thread(
+            _concluir_lote, resultado, pendentes, catalogos, response.content
+        )
+
+
+def buscar_imagem(
+    city: str, landmark: str, catalogo: Optional[List[dict]] = None
+) -> Optional[str]:
     """
     Busca imagem curada no Supabase com matching semântico via IA.
 
+    O landmark é resolvido em memória contra o catálogo da cidade
+    (carregado uma vez por TTL), sem consultas extras por landmark.
+
     Args:
         city: Nome da cidade, por exemplo "Buenos Aires"
         landmark: Nome do ponto, por exemplo "Ponte da Mulher"
+        catalogo: Linhas da cidade já carregadas (opcional)
 
     Returns:
         URL da imagem ou None se não encontrar
@@ -149,37 +546,28 @@ def buscar_imagem(city: str, landmark: str) -> Optional[str]:
         return None
 
     try:
-        result = (
-            supabase.table("destination_images")
-            .select("image_url, description, landmark")
-            .eq("city", city)
-            .eq("landmark", landmark)
-            .limit(1)
-            .execute()
-        )
+        if catalogo is None:
+            catalogo = carregar_catalogo_cidade(city)
 
-        if result.data and len(result.data) > 0:
-            img = result.data[0]
+        if not catalogo:
+            return None
+
+        img = _imagem_do_landmark(catalogo, landmark)
+        if img:
+            landmark_matcher.registrar("exato")
             print(f"💎 [SUPABASE EXATO] {city} - {landmark}")
             desc = img.get("description")
             if desc:
                 print(f"   Desc: {desc[:50]}")
             return img.get("image_url")
 
-        landmark_correto = encontrar_landmark_semantico(city, landmark)
+        landmark_correto = encontrar_landmark_semantico(
+            city, landmark, [x["landmark"] for x in catalogo]
+        )
 
         if landmark_correto:
-            result = (
-                supabase.table("destination_images")
-                .select("image_url, description, landmark")
-                .eq("city", city)
-                .eq("landmark", landmark_correto)
-                .limit(1)
-                .execute()
-            )
-
-            if result.data and len(result.data) > 0:
-                img = result.data[0]
+            img = _imagem_do_landmark(catalogo, landmark_correto)
+            if img:
                 print(
                     f"💎 [SUPABASE IA] {city} - {landmark_correto} "
                     f"(buscou: {landmark})"
@@ -196,6 +584,125 @@ def buscar_imagem(city: str, landmark: str) -> Optional[str]:
         return None
 
 
+def _por_qualidade(catalogo: List[dict]) -> List[dict]:
+    return sorted(catalogo, key=lambda x: -(x.get("quality") or 0))
+
+
+def _urls_por_qualidade(catalogo: List[dict]) -> List[str]:
+    return [x["image_url"] for x in _por_qualidade(catalogo) if x.get("image_url")]
+
+
+def _imagens_por_cidade(
+    destinations: List[str], catalogos: Dict[str, List[dict]]
+) -> Dict[str, List[str]]:
+    imagens: Dict[str, List[str]] = {}
+    for city in destinations:
+        urls = _urls_por_qualidade(catalogos[city])
+        if urls:
+            imagens[city] = urls
+    return imagens
+
+
+def get_images_for_all_cities(destinations: List[str]) -> Dict[str, List[str]]:
+    """Imagens curadas de cada cidade, das de maior qualidade para as de menor."""
+    return _imagens_por_cidade(
+        destinations, {city: carregar_catalogo_cidade(city) for city in destinations}
+    )
+
+
+def get_hero_image_for_trip(destinations: List[str]) -> Optional[str]:
+    """Imagem de capa: a melhor foto curada do primeiro destino que tiver alguma."""
+    for city in destinations:
+        urls = _urls_por_qualidade(carregar_catalogo_cidade(city))
+        if urls:
+            return urls[0]
+    return None
+
+
+async def imagens_da_trip_async(destinations: List[str]) -> Tuple[Optional[str], Dict[str, List[str]]]:
+    """
+    (get_hero_image_for_trip, get_images_for_all_cities) de uma vez, com os
+    catálogos das cidades buscados em paralelo.
+    """
+    imagens = _imagens_por_cidade(destinations, await carregar_catalogos_async(destinations))
+    hero = next((imagens[c][0] for c in destinations if c in imagens), None)
+    return hero, imagens
+
+
+def resolver_imagens_da_trip(
+    pedidos: Dict[str, Iterable[str]]
+) -> Dict[str, Dict[str, Optional[str]]]:
+    """
+    Imagens de todos os landmarks de uma trip: um catálogo por cidade e
+    no máximo uma chamada ao LLM para os que não casarem localmente.
+
+    Returns:
+        {cidade: {landmark: URL da imagem ou None}}
+    """
+    if not supabase and not snapshot.pronto:
+        return _sem_imagens(pedidos)
+
+    catalogos = {city: carregar_catalogo_cidade(city) for city in pedidos}
+    matches = encontrar_landmarks_semanticos_lote(pedidos, _landmarks_dos_catalogos(catalogos))
+    return _imagens_dos_matches(matches, catalogos)
+
+
+def _sem_imagens(pedidos: Dict[str, Iterable[str]]) -> Dict[str, Dict[str, Optional[str]]]:
+    return {city: {l: None for l in landmarks} for city, landmarks in pedidos.items()}
+
+
+def _landmarks_dos_catalogos(catalogos: Dict[str, List[dict]]) -> Dict[str, List[str]]:
+    return {city: [x["landmark"] for x in linhas] for city, linhas in catalogos.items()}
+
+
+def _imagens_dos_matches(
+    matches: Dict[str, Dict[str, Optional[str]]], catalogos: Dict[str, List[dict]]
+) -> Dict[str, Dict[str, Optional[str]]]:
+    imagens: Dict[str, Dict[str, Optional[str]]] = {}
+    for city, por_landmark in matches.items():
+        imagens[city] = {}
+        for landmark, landmark_correto in por_landmark.items():
+            img = (
+                _imagem_do_landmark(catalogos[city], landmark_correto)
+                if landmark_correto
+                else None
+            )
+            imagens[city][landmark] = img.get("image_url") if img else None
+    return imagens
+
+
+async def resolver_imagens_sem_llm_async(
+    pedidos: Dict[str, Iterable[str]]
+) -> Tuple[Dict[str, Dict[str, Optional[str]]], Dict[str, List[str]]]:
+    """
+    Só as camadas baratas de resolver_imagens_da_trip_async (catálogo,
+    matcher local e cache de matches), para quem junta o resto num lote depois.
+
+    Returns:
+        (imagens dos landmarks resolvidos, {cidade: landmarks que só o LLM resolve})
+    """
+    if not supabase_client.configurado() and not snapshot.pronto:
+        return _sem_imagens(pedidos), {}
+
+    catalogos = await carregar_catalogos_async(pedidos)
+    resultado, pendentes = _separar_lote(pedidos, _landmarks_dos_catalogos(catalogos))
+    return _imagens_dos_matches(resultado, catalogos), pendentes
+
+
+async def resolver_imagens_da_trip_async(
+    pedidos: Dict[str, Iterable[str]]
+) -> Dict[str, Dict[str, Optional[str]]]:
+    """resolver_imagens_da_trip sem prender thread na rede (Supabase e LLM)."""
+    if not supabase_client.configurado() and not snapshot.pronto:
+        return _sem_imagens(pedidos)
+
+    catalogos = await carregar_catalogos_async(pedidos)
+    matches = await encontrar_landmarks_semanticos_lote_async(
+        pedidos, _landmarks_dos_catalogos(catalogos)
+    )
+    return _imagens_dos_matches(matches, catalogos)
+
+
 if __name__ == "__main__":
     print("🧪 Teste rápido do módulo supabase_images")
 
@@ -0,0 +1,80 @@
+"""
+Parser incremental de um array JSON de objetos.
+
+Recebe o texto em pedaços (como chega do stream do LLM) e devolve cada
+objeto do array assim que ele fecha, sem esperar o resto da resposta.
+Tolera cercas de markdown (```json) e texto antes do "[" inicial.
+"""
+
+import json
+from typing import Any, Dict, List
+
+
+class ArrayJsonIncremental:
+    def __init__(self) -> None:
+        self._buffer: List[str] = []
+        self._dentro_do_array = False
+        self._terminou = False
+        self._profundidade = 0
+        self._em_string = False
+        self._escape = False
+
+    @property
+    def terminou(self) -> bool:
+        """True depois do "]" que fecha o array."""
+        return self._terminou
+
+    def alimentar(self, texto: str) -> List[Dict[str, Any]]:
+        """
+        Consome mais um pedaço do texto.
+
+        Returns:
+            Objetos do array que terminaram neste pedaço, em ordem
+
+        Raises:
+            json.JSONDecodeError: um objeto completo não é JSON válido
+        """
+        completos: List[Dict[str, Any]] = []
+
+        for c in texto:
+            if self._terminou:
+                break
+
+            if not self._dentro_do_array:
+                if c == "[":
+                    self._dentro_do_array = True
+                continue
+
+            if self._profundidade == 0:
+                # Entre objetos: só interessam o início do próximo e o fim do array
+                if c == "{":
+                    self._profundidade = 1
+                    self._buffer = [c]
+                elif c == "]":
+                    self._terminou = True
+                continue
+
+            self._buffer.append(c)
+
+            if self._em_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._em_string = False
+                continue
+
+            if c == '"':
+                self._em_string = True
+            elif c in "{[":
+                self._profundidade += 1
+            elif c in "}]":
+                self._profundidade -= 1
+                if self._profundidade == 0:
+                    objeto = json.loads("".join(self._buffer))
+                    self._buffer = []
+                    if isinstance(objeto, dict):
+                        completos.append(objeto)
+
+        return completos
@@ -0,0 +1,135 @@
+"""
+Memória persistente dos matches semânticos de landmarks.
+
+Guarda (cidade, landmark procurado, versão do catálogo da cidade) →
+landmark do catálogo, ou NENHUM (cache negativo). A versão é o hash da
+lista de landmarks da cidade, então um par repetido nunca volta ao LLM
+até alguém curar fotos novas para aquela cidade.
+
+Entradas de versões antigas da cidade são apagadas quando chega uma
+versão nova; além disso o total é limitado a LANDMARK_MATCH_CACHE_MAX,
+saindo primeiro as usadas há mais tempo.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from texto import normalizar
+
+BASE_DIR = Path(__file__).resolve().parent
+MATCH_CACHE_PATH = BASE_DIR / "cache" / "landmark_matches.sqlite3"
+
+LANDMARK_MATCH_CACHE_MAX = int(os.getenv("LANDMARK_MATCH_CACHE_MAX", "20000"))
+# NENHUM pode ser um erro pontual do modelo: expira antes dos acertos
+LANDMARK_MATCH_NEGATIVE_TTL_S = float(
+    os.getenv("LANDMARK_MATCH_NEGATIVE_TTL_S", str(7 * 24 * 3600))
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    cidade TEXT NOT NULL,
+    landmark TEXT NOT NULL,
+    versao TEXT NOT NULL,
+    resultado TEXT,
+    criado_em REAL NOT NULL,
+    usado_em REAL NOT NULL,
+    PRIMARY KEY (cidade, landmark, versao)
+);
+CREATE INDEX IF NOT EXISTS matches_usado_em ON matches (usado_em);
+"""
+
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+_stats: Dict[str, int] = {"hits": 0, "negative_hits": 0, "misses": 0, "writes": 0}
+
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        MATCH_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _conn = sqlite3.connect(str(MATCH_CACHE_PATH), check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.executescript(_SCHEMA)
+    return _conn
+
+
+def versao_landmarks(landmarks: Iterable[str]) -> str:
+    """Versão do catálogo da cidade: hash da lista de landmarks disponíveis."""
+    bruto = "\n".join(sorted(set(landmarks)))
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()[:16]
+
+
+def buscar(
+    city: str, landmark: str, versao: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Returns:
+        (encontrado, resultado); resultado None com encontrado=True é um NENHUM em cache
+    """
+    chave = (normalizar(city), normalizar(landmark), versao)
+    agora = time.time()
+
+    with _lock:
+        conn = _get_conn()
+        row = conn.execute(
+            "SELECT resultado, criado_em FROM matches WHERE cidade = ? AND landmark = ? AND versao = ?",
+            chave,
+        ).fetchone()
+
+        if row is None or (
+            row[0] is None and agora - row[1] > LANDMARK_MATCH_NEGATIVE_TTL_S
+        ):
+            _stats["misses"] += 1
+            return False, None
+
+        with conn:
+            conn.execute(
+                "UPDATE matches SET usado_em = ? WHERE cidade = ? AND landmark = ? AND versao = ?",
+                (agora, *chave),
+            )
+        _stats["negative_hits" if row[0] is None else "hits"] += 1
+        return True, row[0]
+
+
+def salvar(city: str, landmark: str, versao: str, resultado: Optional[str]) -> None:
+    cidade = normalizar(city)
+    agora = time.time()
+
+    with _lock:
+        conn = _get_conn()
+        with conn:
+            # Versões antigas do catálogo desta cidade não serão mais consultadas
+            conn.execute(
+                "DELETE FROM matches WHERE cidade = ? AND versao != ?", (cidade, versao)
+            )
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO matches (cidade, landmark, versao, resultado, criado_em, usado_em)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (cidade, normalizar(landmark), versao, resultado, agora, agora),
+            )
+            excesso = (
+                conn.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+                - LANDMARK_MATCH_CACHE_MAX
+            )
+            if excesso > 0:
+                conn.execute(
+                    """
+                    DELETE FROM matches WHERE rowid IN (
+                        SELECT rowid FROM matches ORDER BY usado_em ASC LIMIT ?
+                    )
+                    """,
+                    (excesso,),
+                )
+        _stats["writes"] += 1
+
+
+def stats() -> Dict[str, int]:
+    with _lock:
+        return dict(_stats)
@@ -0,0 +1,154 @@
+"""
+Matching local (léxico/fuzzy) de landmarks, antes do fallback com LLM.
+
+A maioria dos misses de busca exata são variações de grafia, acento ou
+caixa ("Cemiterio da Recoleta", "teatro colon") ou apelidos conhecidos
+("La Boca" → "Caminito"). Este módulo resolve esses casos em memória:
+
+1. normalizado: igual depois de tirar acentos, caixa e pontuação
+2. alias: tabela pequena de apelidos → landmark do catálogo
+3. fuzzy: similaridade de tokens, de trigramas e de sequência de caracteres
+
+Só quando a confiança fica abaixo de LANDMARK_LOCAL_THRESHOLD (ou dois
+candidatos empatam) o chamador segue para o LLM. Os contadores por
+camada mostram quanto cada uma está respondendo.
+"""
+
+import difflib
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+from texto import normalizar
+
+LANDMARK_LOCAL_THRESHOLD = float(os.getenv("LANDMARK_LOCAL_THRESHOLD", "0.8"))
+# Diferença mínima entre o 1º e o 2º candidato para não ser empate
+LANDMARK_LOCAL_MARGIN = 0.05
+
+# Apelido normalizado → nomes (normalizados) que ele pode ter no catálogo
+ALIASES: Dict[str, List[str]] = {
+    "la boca": ["caminito"],
+    "boca": ["caminito"],
+    "ponte da mulher": ["puerto madero"],
+    "puente de la mujer": ["puerto madero"],
+    "cemiterio": ["cemiterio da recoleta", "cementerio de la recoleta"],
+    "cemiterio da recoleta": ["cementerio de la recoleta", "recoleta"],
+    "cementerio de la recoleta": ["cemiterio da recoleta", "recoleta"],
+    "plaza de mayo": ["casa rosada"],
+    "praca de maio": ["casa rosada", "plaza de mayo"],
+    "casa rosada": ["plaza de mayo"],
+    "avenida 9 de julio": ["obelisco"],
+    "av 9 de julio": ["obelisco"],
+    "feira de san telmo": ["san telmo"],
+    "feria de san telmo": ["san telmo"],
+}
+
+STOPWORDS: Set[str] = {"de", "da", "do", "das", "dos", "del", "la", "el", "los", "las", "e", "y", "the"}
+
+TIERS = ("exato", "normalizado", "alias", "fuzzy", "cache", "llm", "nenhum")
+
+_stats: Dict[str, int] = {tier: 0 for tier in TIERS}
+_stats_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class MatchLocal:
+    landmark: Optional[str]
+    score: float
+    tier: Optional[str]
+
+
+def registrar(tier: str) -> None:
+    """Conta qual camada respondeu (exato, normalizado, alias, fuzzy, cache, llm, nenhum)."""
+    with _stats_lock:
+        _stats[tier] = _stats.get(tier, 0) + 1
+
+
+def stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _chave(texto: str) -> str:
+    """Normaliza e troca pontuação por espaço ("Teatro Colón." → "teatro colon")."""
+    return " ".join(re.sub(r"[^\w\s]", " ", normalizar(texto)).split())
+
+
+def _tokens(chave: str) -> Set[str]:
+    tokens = set(chave.split())
+    sem_stopwords = tokens - STOPWORDS
+    return sem_stopwords or tokens
+
+
+def _trigramas(chave: str) -> Set[str]:
+    texto = f"  {chave} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def similaridade(a: str, b: str) -> float:
+    """Similaridade entre 0 e 1 de dois nomes já normalizados com _chave."""
+    if a == b:
+        return 1.0
+
+    tokens_a, tokens_b = _tokens(a), _tokens(b)
+    menor, maior = sorted((tokens_a, tokens_b), key=len)
+
+    # Um nome contido no outro: "cemiterio" ⊂ "cemiterio da recoleta"
+    if menor and menor <= maior:
+        contido = 0.8 + 0.2 * len(menor) / len(maior)
+    else:
+        contido = 0.0
+
+    trigramas = _jaccard(_trigramas(a), _trigramas(b))
+    return max(
+        contido,
+        0.5 * _jaccard(tokens_a, tokens_b) + 0.5 * trigramas,
+        trigramas,
+        # Erros de digitação: "obelisko" x "obelisco"
+        difflib.SequenceMatcher(None, a, b).ratio(),
+    )
+
+
+def casar_localmente(landmark: str, disponiveis: List[str]) -> MatchLocal:
+    """
+    Procura o landmark na lista do catálogo sem chamar o LLM.
+
+    Returns:
+        MatchLocal com o landmark do catálogo (ou None se a confiança for baixa)
+    """
+    if not disponiveis:
+        return MatchLocal(None, 0.0, None)
+
+    por_chave: Dict[str, str] = {}
+    for nome in disponiveis:
+        por_chave.setdefault(_chave(nome), nome)
+
+    chave = _chave(landmark)
+
+    if chave in por_chave:
+        return MatchLocal(por_chave[chave], 1.0, "normalizado")
+
+    for alvo in ALIASES.get(chave, []):
+        if alvo in por_chave:
+            return MatchLocal(por_chave[alvo], 1.0, "alias")
+
+    pontuados = sorted(
+        ((similaridade(chave, c), c) for c in por_chave),
+        reverse=True,
+    )
+    melhor_score, melhor = pontuados[0]
+    segundo_score = pontuados[1][0] if len(pontuados) > 1 else 0.0
+
+    empate = melhor_score - segundo_score < LANDMARK_LOCAL_MARGIN and melhor_score < 0.95
+    if melhor_score >= LANDMARK_LOCAL_THRESHOLD and not empate:
+        return MatchLocal(por_chave[melhor], melhor_score, "fuzzy")
+
+    return MatchLocal(None, melhor_score, None)
@@ -0,0 +1,220 @@
+"""
+Cache em disco das respostas do LLM, endereçado pelo conteúdo da chamada.
+
+Os prompts de extração e de roteiro são funções determinísticas da
+entrada, então a chave é o SHA-256 de (modelo, mensagens, parâmetros):
+reprocessar o mesmo orçamento devolve a resposta salva na hora, sem rede.
+
+Modos (LLM_CACHE_MODE):
+- on: lê do cache e grava o que vier do LLM (padrão)
+- off: não lê nem grava
+- record: sempre chama o LLM e regrava o cache (para gravar fixtures)
+- replay: só lê do cache; uma chamada que não está gravada falha com
+  LLMCacheMiss. Permite rodar o pipeline inteiro numa máquina sem rede.
+
+Pontos de chamada listados em LLM_CACHE_IGNORAR (separados por vírgula)
+nunca usam o cache. O tamanho em disco é limitado a LLM_CACHE_MAX_MB;
+ao passar do limite saem primeiro as entradas usadas há mais tempo.
+
+Uso na linha de comando:
+    python llm_cache.py stats
+    python llm_cache.py limpar
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from upload_store import salvar_json_atomico
+
+BASE_DIR = Path(__file__).resolve().parent
+LLM_CACHE_DIR = BASE_DIR / "cache" / "llm"
+
+MODOS = ("on", "off", "record", "replay")
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "on").strip().lower()
+if LLM_CACHE_MODE not in MODOS:
+    print(f"⚠️ LLM_CACHE_MODE inválido ({LLM_CACHE_MODE}), usando 'on'")
+    LLM_CACHE_MODE = "on"
+
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "200"))
+LLM_CACHE_IGNORAR = {
+    p.strip() for p in os.getenv("LLM_CACHE_IGNORAR", "").split(",") if p.strip()
+}
+
+# Ao evictar, desce até esta fração do limite para não evictar a cada escrita
+_ALVO_EVICCAO = 0.9
+
+_stats: Dict[str, int] = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+_lock = threading.Lock()
+_tamanho_total: Optional[int] = None
+
+
+class LLMCacheMiss(RuntimeError):
+    """Modo replay e a chamada não está gravada."""
+
+
+def _contar(chave: str, n: int = 1) -> None:
+    with _lock:
+        _stats[chave] += n
+
+
+def stats() -> Dict[str, int]:
+    """Contadores do processo atual (hits, misses, writes, evictions, errors)."""
+    with _lock:
+        return dict(_stats)
+
+
+def ativo(ponto: str) -> bool:
+    return LLM_CACHE_MODE != "off" and ponto not in LLM_CACHE_IGNORAR
+
+
+def le_do_cache(ponto: str) -> bool:
+    return ativo(ponto) and LLM_CACHE_MODE in ("on", "replay")
+
+
+def replay() -> bool:
+    return LLM_CACHE_MODE == "replay"
+
+
+def chave(model: str, messages: List[Dict[str, Any]], params: Dict[str, Any]) -> str:
+    bruto = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+
+def _caminho(chave_cache: str) -> Path:
+    return LLM_CACHE_DIR / chave_cache[:2] / f"{chave_cache}.json"
+
+
+def buscar(chave_cache: str) -> Optional[Dict[str, Any]]:
+    """Resposta gravada para a chave, ou None."""
+    cache_file = _caminho(chave_cache)
+    try:
+        with cache_file.open("r", encoding="utf-8") as f:
+            entrada = json.load(f)
+        if not isinstance(entrada["content"], str):
+            raise TypeError("content não é texto")
+    except FileNotFoundError:
+        _contar("misses")
+        return None
+    except (OSError, KeyError, TypeError, json.JSONDecodeError) as e:
+        print(f"⚠️ Cache do LLM corrompido ({cache_file.name}): {e}")
+        _contar("errors")
+        _contar("misses")
+        return None
+
+    # mtime marca o último uso (LRU da evicção)
+    try:
+        os.utime(cache_file)
+    except OSError:
+        pass
+    _contar("hits")
+    return entrada
+
+
+def salvar(chave_cache: str, entrada: Dict[str, Any]) -> None:
+    global _tamanho_total
+    cache_file = _caminho(chave_cache)
+    try:
+        anterior = cache_file.stat().st_size if cache_file.exists() else 0
+        salvar_json_atomico(cache_file, {**entrada, "criado_em": time.time()})
+        novo = cache_file.stat().st_size
+    except OSError as e:
+        print(f"⚠️ Não foi possível salvar cache do LLM {chave_cache[:12]}: {e}")
+        _contar("errors")
+        return
+
+    _contar("writes")
+    with _lock:
+        if _tamanho_total is not None:
+            _tamanho_total += novo - anterior
+    _evictar_se_preciso()
+
+
+def _entradas() -> List[Path]:
+    return list(LLM_CACHE_DIR.glob("??/*.json"))
+
+
+def _evictar_se_preciso() -> None:
+    global _tamanho_total
+    limite = LLM_CACHE_MAX_MB * 1024 * 1024
+
+    with _lock:
+        if _tamanho_total is None:
+            _tamanho_total = sum(p.stat().st_size for p in _entradas() if p.exists())
+        if _tamanho_total <= limite:
+            return
+
+        por_uso = []
+        for p in _entradas():
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            por_uso.append((st.st_mtime, st.st_size, p))
+        por_uso.sort()
+
+        total = sum(tamanho for _, tamanho, _ in por_uso)
+        removidos = 0
+        for _, tamanho, p in por_uso:
+            if total <= limite * _ALVO_EVICCAO:
+                break
+            p.unlink(missing_ok=True)
+            total -= tamanho
+            removidos += 1
+
+        _tamanho_total = total
+        _stats["evictions"] += removidos
+
+
+def limpar() -> int:
+    """Apaga o cache inteiro e devolve quantas entradas foram removidas."""
+    global _tamanho_total
+    removidos = 0
+    for cache_file in _entradas():
+        cache_file.unlink(missing_ok=True)
+        removidos += 1
+    with _lock:
+        _tamanho_total = 0
+    return removidos
+
+
+def resumo_em_disco() -> Dict[str, Any]:
+    """Entradas e bytes em disco, por ponto de chamada."""
+    por_ponto: Dict[str, int] = {}
+    total_bytes = 0
+    for cache_file in _entradas():
+        try:
+            total_bytes += cache_file.stat().st_size
+            with cache_file.open("r", encoding="utf-8") as f:
+                ponto = json.load(f).get("ponto") or "?"
+        except (OSError, json.JSONDecodeError):
+            ponto = "?"
+        por_ponto[ponto] = por_ponto.get(ponto, 0) + 1
+    return {"bytes": total_bytes, "por_ponto": por_ponto}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cache de respostas do LLM")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("stats", help="Entradas em disco por ponto de chamada")
+    sub.add_parser("limpar", help="Apaga o cache inteiro")
+    args = parser.parse_args()
+
+    if args.comando == "stats":
+        resumo = resumo_em_disco()
+        print(f"🧠 Modo: {LLM_CACHE_MODE} | {resumo['bytes'] / 1024 / 1024:.1f} MB em disco")
+        for ponto, total in sorted(resumo["por_ponto"].items()):
+            print(f"  {ponto}: {total} resposta(s)")
+    else:
+        print(f"🗑️ {limpar()} entrada(s) removida(s)")
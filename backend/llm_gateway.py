@@ -0,0 +1,682 @@
+"""
+Gateway único para as chamadas ao LLM (OpenAI).
+
+Antes cada módulo criava seu próprio `OpenAI(api_key=...)` a cada chamada,
+sem timeout nem retry: uma resposta lenta da OpenAI prendia a requisição
+indefinidamente. Aqui o processo inteiro compartilha um cliente (e o pool
+de conexões HTTP dele), e cada ponto de chamada tem o seu prazo:
+
+- extracao: leitura dos PDFs (prompt grande)
+- lacunas: campos incertos do extrator por template
+- roteiro: geração do roteiro dia-a-dia
+- landmarks: matching semântico de landmarks
+- curadoria: script curar_fotos.py
+
+Com LLM_MAX_RPM (ou definir_limite_rpm) as chamadas do processo ficam
+espaçadas para não passar de N por minuto, somando todos os pontos; o
+reextrair.py usa isso para não estourar o rate limit da conta. A espera
+pela vaga conta no prazo: uma vaga que só viria depois dele é um erro na
+hora, sem dormir até lá.
+
+chat_async e chat_stream_async fazem o mesmo com um AsyncOpenAI
+compartilhado, para o caminho de leitura no event loop: a espera pela
+OpenAI não prende thread.
+
+Erros 429/5xx, timeouts e falhas de conexão são repetidos com backoff
+exponencial com jitter, sempre dentro do prazo do ponto de chamada. Latência,
+tentativas e tokens ficam contados por ponto de chamada em `stats()` e nas
+métricas do /metrics (metrics.registrar_llm); respostas do cache contam só
+em cache_hits, não em chamadas nem na latência.
+
+As respostas passam pelo cache em disco de llm_cache (com modo replay
+para rodar sem rede); `cache=False` desliga o cache numa chamada e, nos
+streams, `ler_cache=False` pede uma resposta nova que ainda é gravada
+(roteiro regenerado).
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    AsyncOpenAI,
+    OpenAI,
+)
+
+import llm_cache
+import metrics
+
+LLM_MAX_TENTATIVAS = int(os.getenv("LLM_MAX_TENTATIVAS", "4"))
+LLM_BACKOFF_BASE_S = float(os.getenv("LLM_BACKOFF_BASE_S", "0.5"))
+LLM_BACKOFF_MAX_S = float(os.getenv("LLM_BACKOFF_MAX_S", "8"))
+LLM_MAX_CONEXOES = int(os.getenv("LLM_MAX_CONEXOES", "20"))
+# Chamadas por minuto no processo inteiro (0 = sem limite)
+LLM_MAX_RPM = float(os.getenv("LLM_MAX_RPM", "0"))
+
+# Prazo total (todas as tentativas) por ponto de chamada, em segundos.
+# Cada um pode ser sobrescrito por LLM_PRAZO_<PONTO>, ex.: LLM_PRAZO_ROTEIRO=90
+PRAZOS_PADRAO_S: Dict[str, float] = {
+    "extracao": 120.0,
+    "lacunas": 30.0,
+    "roteiro": 90.0,
+    "landmarks": 20.0,
+    "curadoria": 45.0,
+}
+PRAZO_DESCONHECIDO_S = 60.0
+
+# Não vale começar uma tentativa com menos tempo que isso
+_PRAZO_MINIMO_TENTATIVA_S = 1.0
+
+
+class LLMIndisponivel(RuntimeError):
+    """OPENAI_API_KEY não configurada."""
+
+
+@dataclass(frozen=True)
+class LLMResposta:
+    content: str
+    prompt_tokens: int
+    completion_tokens: int
+    latencia_s: float
+    tentativas: int
+    cache: bool = False
+
+
+_client: Optional[OpenAI] = None
+_client_lock = threading.Lock()
+# Um AsyncOpenAI por event loop: o pool do httpx só serve ao loop em que abriu
+_clients_async: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+# usar_cliente trocou o cliente: as chamadas assíncronas passam por ele
+_trocado = False
+
+_stats: Dict[str, Dict[str, float]] = {}
+_stats_lock = threading.Lock()
+
+
+class _LimiteDeTaxa:
+    """Espaça o início das chamadas em 60/rpm segundos (0 = sem limite)."""
+
+    def __init__(self, rpm: float) -> None:
+        self._lock = threading.Lock()
+        self._proxima = 0.0
+        self.definir(rpm)
+
+    def definir(self, rpm: float) -> None:
+        with self._lock:
+            self.intervalo_s = 60.0 / rpm if rpm > 0 else 0.0
+
+    def reservar(self, deadline: float) -> Optional[float]:
+        """
+        Reserva a próxima vaga; devolve quanto falta até ela, ou None (sem
+        reservar) se ela não deixa nem _PRAZO_MINIMO_TENTATIVA_S antes do deadline.
+        """
+        with self._lock:
+            if not self.intervalo_s:
+                return 0.0
+            agora = time.monotonic()
+            vez = max(agora, self._proxima)
+            if vez + _PRAZO_MINIMO_TENTATIVA_S > deadline:
+                return None
+            self._proxima = vez + self.intervalo_s
+        return vez - agora
+
+
+_limite = _LimiteDeTaxa(LLM_MAX_RPM)
+
+
+def get_client() -> Optional[OpenAI]:
+    """Cliente OpenAI compartilhado (None se OPENAI_API_KEY não estiver configurada)."""
+    global _client
+    if _client is not None:
+        return _client
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+
+    with _client_lock:
+        if _client is None:
+            _client = OpenAI(
+                api_key=api_key,
+                # Retry e timeout são do gateway, por ponto de chamada
+                max_retries=0,
+                http_client=httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=LLM_MAX_CONEXOES,
+                        max_keepalive_connections=LLM_MAX_CONEXOES,
+                    ),
+                ),
+            )
+    return _client
+
+
+def get_async_client() -> Optional[AsyncOpenAI]:
+    """
+    Cliente AsyncOpenAI compartilhado pelo event loop atual, para quem roda
+    nele (mesmo pool máximo e sem retry próprio, como o síncrono).
+    """
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+
+    loop = asyncio.get_running_loop()
+    client = _clients_async.get(loop)
+    if client is not None:
+        return client
+
+    # Sem await entre o teste e a atribuição: o event loop não intercala aqui
+    client = _clients_async[loop] = AsyncOpenAI(
+        api_key=api_key,
+        max_retries=0,
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONEXOES,
+                max_keepalive_connections=LLM_MAX_CONEXOES,
+            ),
+        ),
+    )
+    return client
+
+
+async def fechar_async() -> None:
+    """Fecha o pool do cliente assíncrono deste loop (shutdown do servidor)."""
+    client = _clients_async.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
+def usar_cliente(client: Any) -> None:
+    """
+    Troca o cliente do processo por outro com a mesma interface
+    (chat.completions.create e with_options), como o OpenAI local do benchmark.
+    chat_async e chat_stream_async passam a usá-lo numa thread.
+    """
+    global _client, _trocado
+    with _client_lock:
+        _client = client
+        _trocado = True
+
+
+def definir_limite_rpm(rpm: float) -> None:
+    """Muda o limite de chamadas por minuto do processo (0 = sem limite)."""
+    _limite.definir(rpm)
+
+
+def disponivel() -> bool:
+    """Há como responder chamadas: chave configurada ou cache em modo replay."""
+    return llm_cache.replay() or get_client() is not None
+
+
+def prazo(ponto: str) -> float:
+    env = os.getenv(f"LLM_PRAZO_{ponto.upper()}")
+    if env:
+        return float(env)
+    return PRAZOS_PADRAO_S.get(ponto, PRAZO_DESCONHECIDO_S)
+
+
+def _repetivel(erro: Exception) -> bool:
+    if isinstance(erro, (APITimeoutError, APIConnectionError)):
+        return True
+    if isinstance(erro, APIStatusError):
+        return erro.status_code == 429 or erro.status_code >= 500
+    return False
+
+
+def _espera(tentativa: int, erro: Exception) -> float:
+    """Backoff exponencial com jitter (respeita Retry-After quando vier)."""
+    teto = min(LLM_BACKOFF_MAX_S, LLM_BACKOFF_BASE_S * (2 ** tentativa))
+    espera = random.uniform(teto / 2, teto)
+
+    if isinstance(erro, APIStatusError):
+        try:
+            retry_after = float(erro.response.headers.get("retry-after", ""))
+        except (TypeError, ValueError):
+            retry_after = 0.0
+        espera = max(espera, min(retry_after, LLM_BACKOFF_MAX_S))
+
+    return espera
+
+
+def _registrar(
+    ponto: str,
+    latencia_s: float,
+    tentativas: int,
+    resposta: Optional[Any] = None,
+    erro: bool = False,
+    cache_hit: bool = False,
+    model: str = "",
+) -> None:
+    """tentativas=0 com erro: o prazo acabou antes de qualquer envio (limite de taxa)."""
+    usage = getattr(resposta, "usage", None)
+    sem_envio = erro and tentativas == 0
+    metrics.registrar_llm(
+        ponto,
+        model,
+        latencia_s,
+        getattr(usage, "prompt_tokens", 0) or 0,
+        getattr(usage, "completion_tokens", 0) or 0,
+        resultado="cache" if cache_hit else "limite" if sem_envio else "erro" if erro else "ok",
+    )
+    with _stats_lock:
+        s = _stats.setdefault(
+            ponto,
+            {
+                "chamadas": 0,
+                "cache_hits": 0,
+                "erros": 0,
+                "retries": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "latencia_total_s": 0.0,
+                "latencia_max_s": 0.0,
+            },
+        )
+        # Só o que chegou à rede entra em chamadas e na latência
+        if cache_hit:
+            s["cache_hits"] += 1
+            return
+        if sem_envio:
+            s["erros"] += 1
+            return
+        s["chamadas"] += 1
+        s["retries"] += tentativas - 1
+        s["latencia_total_s"] += latencia_s
+        s["latencia_max_s"] = max(s["latencia_max_s"], latencia_s)
+        if erro:
+            s["erros"] += 1
+        if usage is not None:
+            s["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+            s["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+
+
+def _chave_cache(
+    ponto: str, model: str, messages: List[Dict[str, Any]], params: Dict[str, Any], cache: bool
+) -> Optional[str]:
+    return llm_cache.chave(model, messages, params) if cache and llm_cache.ativo(ponto) else None
+
+
+def _prazos(ponto: str, prazo_s: Optional[float]) -> Tuple[float, float]:
+    """(início, deadline) da chamada; o prazo padrão é o do ponto de chamada."""
+    inicio = time.monotonic()
+    return inicio, inicio + (prazo_s if prazo_s is not None else prazo(ponto))
+
+
+def _resposta_gravada(
+    ponto: str, chave_cache: Optional[str], ler: bool = True
+) -> Optional[LLMResposta]:
+    """
+    Resposta do cache de llm_cache, se houver (em replay, falta é erro).
+    Com ler=False só o modo replay lê: sem rede não há resposta nova.
+    """
+    if not chave_cache or not llm_cache.le_do_cache(ponto):
+        return None
+    if not ler and not llm_cache.replay():
+        return None
+
+    gravada = llm_cache.buscar(chave_cache)
+    if gravada is not None:
+        _registrar(ponto, 0.0, 0, cache_hit=True)
+        return LLMResposta(
+            content=gravada["content"],
+            prompt_tokens=gravada.get("prompt_tokens", 0),
+            completion_tokens=gravada.get("completion_tokens", 0),
+            latencia_s=0.0,
+            tentativas=0,
+            cache=True,
+        )
+    if llm_cache.replay():
+        raise llm_cache.LLMCacheMiss(
+            f"Resposta de '{ponto}' não gravada ({chave_cache[:12]})"
+        )
+    return None
+
+
+def _gravar(ponto: str, model: str, chave_cache: Optional[str], resultado: LLMResposta) -> None:
+    if not chave_cache:
+        return
+    llm_cache.salvar(
+        chave_cache,
+        {
+            "ponto": ponto,
+            "model": model,
+            "content": resultado.content,
+            "prompt_tokens": resultado.prompt_tokens,
+            "completion_tokens": resultado.completion_tokens,
+        },
+    )
+
+
+def _timeout_tentativa(deadline: float) -> float:
+    return max(deadline - time.monotonic(), _PRAZO_MINIMO_TENTATIVA_S)
+
+
+def _espera_apos_falha(
+    ponto: str, inicio: float, deadline: float, tentativa: int, erro: Exception, model: str
+) -> Optional[float]:
+    """
+    Quanto esperar até a próxima tentativa; None se não há próxima (erro não
+    repetível, tentativas ou prazo esgotados), já com o erro registrado.
+    """
+    espera = _espera(tentativa - 1, erro)
+    sem_tempo = time.monotonic() + espera + _PRAZO_MINIMO_TENTATIVA_S > deadline
+    if not _repetivel(erro) or tentativa >= LLM_MAX_TENTATIVAS or sem_tempo:
+        _registrar(ponto, time.monotonic() - inicio, tentativa, erro=True, model=model)
+        return None
+
+    print(
+        f"🔁 LLM [{ponto}] tentativa {tentativa} falhou ({erro.__class__.__name__}); "
+        f"nova tentativa em {espera:.1f}s"
+    )
+    return espera
+
+
+def _vaga(
+    ponto: str, inicio: float, deadline: float, tentativa: int, model: str,
+    ultimo_erro: Optional[Exception],
+) -> float:
+    """
+    Espera até a vaga do limite de taxa desta tentativa. Se ela só vem
+    depois do prazo, registra o erro e levanta o erro da tentativa anterior
+    (ou TimeoutError na primeira), sem dormir à toa.
+    """
+    espera = _limite.reservar(deadline)
+    if espera is not None:
+        return espera
+
+    # As tentativas que chegaram a ser enviadas (0 se era a primeira)
+    _registrar(ponto, time.monotonic() - inicio, tentativa - 1, erro=True, model=model)
+    if ultimo_erro is not None:
+        raise ultimo_erro
+    raise TimeoutError(f"Prazo do LLM [{ponto}] esgotado esperando o limite de taxa")
+
+
+def _concluir(
+    ponto: str, model: str, inicio: float, tentativas: int, content: str, usage: Any
+) -> LLMResposta:
+    """Registra a chamada bem-sucedida e monta a resposta."""
+    latencia = time.monotonic() - inicio
+    _registrar(ponto, latencia, tentativas, SimpleNamespace(usage=usage), model=model)
+    return LLMResposta(
+        content=content,
+        prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+        completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+        latencia_s=latencia,
+        tentativas=tentativas,
+    )
+
+
+# Parâmetros extras de chat.completions.create para os streams
+_PARAMS_STREAM: Dict[str, Any] = {"stream": True, "stream_options": {"include_usage": True}}
+
+
+class _Leitura:
+    """Texto e usage de um stream em andamento, e o prazo dele."""
+
+    def __init__(self, ponto: str, deadline: float) -> None:
+        self.ponto = ponto
+        self.deadline = deadline
+        self.partes: List[str] = []
+        self.usage: Any = None
+
+    def pedacos(self, chunk: Any) -> List[str]:
+        """Textos do chunk; TimeoutError se o prazo passou."""
+        if chunk.usage is not None:
+            self.usage = chunk.usage
+        textos = [
+            choice.delta.content
+            for choice in chunk.choices
+            if choice.delta and choice.delta.content
+        ]
+        self.partes.extend(textos)
+        if time.monotonic() > self.deadline:
+            raise TimeoutError(f"Prazo do LLM [{self.ponto}] esgotado durante o stream")
+        return textos
+
+
+def _criar_com_retry(
+    ponto: str, inicio: float, deadline: float, **kwargs: Any
+) -> Tuple[Any, int]:
+    """
+    chat.completions.create com retry/backoff dentro do prazo.
+
+    Returns:
+        (resposta ou stream da OpenAI, número de tentativas)
+    """
+    client = get_client()
+    if client is None:
+        raise LLMIndisponivel("OPENAI_API_KEY não configurada")
+
+    tentativa = 0
+    ultimo_erro: Optional[Exception] = None
+    while True:
+        tentativa += 1
+        # A espera pelo limite de taxa conta no prazo do ponto
+        espera_taxa = _vaga(ponto, inicio, deadline, tentativa, kwargs.get("model", ""), ultimo_erro)
+        if espera_taxa > 0:
+            time.sleep(espera_taxa)
+        try:
+            resposta = client.with_options(
+                timeout=_timeout_tentativa(deadline)
+            ).chat.completions.create(**kwargs)
+            return resposta, tentativa
+        except Exception as e:
+            espera = _espera_apos_falha(ponto, inicio, deadline, tentativa, e, kwargs.get("model", ""))
+            if espera is None:
+                raise
+            ultimo_erro = e
+            time.sleep(espera)
+
+
+async def _criar_com_retry_async(
+    ponto: str, inicio: float, deadline: float, **kwargs: Any
+) -> Tuple[Any, int]:
+    """_criar_com_retry com o AsyncOpenAI: as esperas não prendem o event loop."""
+    client = get_async_client()
+    if client is None:
+        raise LLMIndisponivel("OPENAI_API_KEY não configurada")
+
+    tentativa = 0
+    ultimo_erro: Optional[Exception] = None
+    while True:
+        tentativa += 1
+        espera_taxa = _vaga(ponto, inicio, deadline, tentativa, kwargs.get("model", ""), ultimo_erro)
+        if espera_taxa > 0:
+            await asyncio.sleep(espera_taxa)
+        try:
+            resposta = await client.with_options(
+                timeout=_timeout_tentativa(deadline)
+            ).chat.completions.create(**kwargs)
+            return resposta, tentativa
+        except Exception as e:
+            espera = _espera_apos_falha(ponto, inicio, deadline, tentativa, e, kwargs.get("model", ""))
+            if espera is None:
+                raise
+            ultimo_erro = e
+            await asyncio.sleep(espera)
+
+
+def chat(
+    ponto: str,
+    messages: List[Dict[str, Any]],
+    model: str = "gpt-4o",
+    prazo_s: Optional[float] = None,
+    cache: bool = True,
+    **params: Any,
+) -> LLMResposta:
+    """
+    Chat completion com prazo, retry e contadores do ponto de chamada.
+
+    Args:
+        ponto: Ponto de chamada (extracao, lacunas, roteiro, landmarks, curadoria)
+        messages: Mensagens do chat
+        model: Modelo
+        prazo_s: Prazo total; padrão é o do ponto de chamada
+        cache: False para não ler nem gravar no cache de respostas
+        **params: Demais parâmetros de chat.completions.create
+
+    Raises:
+        LLMIndisponivel: sem OPENAI_API_KEY
+        llm_cache.LLMCacheMiss: modo replay e a chamada não está gravada
+        openai.OpenAIError: erro não repetível, ou o último erro quando o prazo
+            ou as tentativas acabam
+        TimeoutError: o prazo acaba na espera do limite de taxa (LLM_MAX_RPM)
+            antes da primeira tentativa
+    """
+    chave_cache = _chave_cache(ponto, model, messages, params, cache)
+    gravada = _resposta_gravada(ponto, chave_cache)
+    if gravada is not None:
+        return gravada
+
+    inicio, deadline = _prazos(ponto, prazo_s)
+    resposta, tentativas = _criar_com_retry(
+        ponto, inicio, deadline, model=model, messages=messages, **params
+    )
+    resultado = _concluir(
+        ponto, model, inicio, tentativas,
+        resposta.choices[0].message.content or "", getattr(resposta, "usage", None),
+    )
+    _gravar(ponto, model, chave_cache, resultado)
+    return resultado
+
+
+async def chat_async(
+    ponto: str,
+    messages: List[Dict[str, Any]],
+    model: str = "gpt-4o",
+    prazo_s: Optional[float] = None,
+    cache: bool = True,
+    **params: Any,
+) -> LLMResposta:
+    """
+    chat() para o event loop: mesmo prazo, retry, cache e contadores, com
+    o cliente AsyncOpenAI. O cache em disco é lido e gravado numa thread.
+    """
+    if _trocado:
+        return await asyncio.to_thread(
+            chat, ponto, messages, model=model, prazo_s=prazo_s, cache=cache, **params
+        )
+
+    chave_cache = _chave_cache(ponto, model, messages, params, cache)
+    gravada = await asyncio.to_thread(_resposta_gravada, ponto, chave_cache)
+    if gravada is not None:
+        return gravada
+
+    inicio, deadline = _prazos(ponto, prazo_s)
+    resposta, tentativas = await _criar_com_retry_async(
+        ponto, inicio, deadline, model=model, messages=messages, **params
+    )
+    resultado = _concluir(
+        ponto, model, inicio, tentativas,
+        resposta.choices[0].message.content or "", getattr(resposta, "usage", None),
+    )
+    await asyncio.to_thread(_gravar, ponto, model, chave_cache, resultado)
+    return resultado
+
+
+def chat_stream(
+    ponto: str,
+    messages: List[Dict[str, Any]],
+    model: str = "gpt-4o",
+    prazo_s: Optional[float] = None,
+    cache: bool = True,
+    ler_cache: bool = True,
+    **params: Any,
+) -> Iterator[str]:
+    """
+    Como chat(), mas devolve o texto em pedaços à medida que o modelo gera.
+
+    O retry só vale para abrir o stream; depois do primeiro pedaço um erro
+    é repassado ao chamador. Estourar o prazo no meio do stream levanta
+    TimeoutError. Uma resposta em cache sai inteira, num pedaço só, e a
+    resposta completa é gravada no cache ao final. Com ler_cache=False a
+    resposta em cache é ignorada (e substituída pela nova).
+    """
+    chave_cache = _chave_cache(ponto, model, messages, params, cache)
+    gravada = _resposta_gravada(ponto, chave_cache, ler_cache)
+    if gravada is not None:
+        yield gravada.content
+        return
+
+    inicio, deadline = _prazos(ponto, prazo_s)
+    stream, tentativas = _criar_com_retry(
+        ponto, inicio, deadline, model=model, messages=messages, **_PARAMS_STREAM, **params
+    )
+
+    leitura = _Leitura(ponto, deadline)
+    try:
+        for chunk in stream:
+            yield from leitura.pedacos(chunk)
+    except BaseException:
+        _registrar(ponto, time.monotonic() - inicio, tentativas, erro=True, model=model)
+        stream.close()
+        raise
+
+    resultado = _concluir(ponto, model, inicio, tentativas, "".join(leitura.partes), leitura.usage)
+    _gravar(ponto, model, chave_cache, resultado)
+
+
+async def chat_stream_async(
+    ponto: str,
+    messages: List[Dict[str, Any]],
+    model: str = "gpt-4o",
+    prazo_s: Optional[float] = None,
+    cache: bool = True,
+    ler_cache: bool = True,
+    **params: Any,
+) -> AsyncIterator[str]:
+    """chat_stream() para o event loop, com o cliente AsyncOpenAI."""
+    if _trocado:
+        # Cliente síncrono trocado: cada pedaço é buscado numa thread
+        pedacos = chat_stream(
+            ponto, messages, model=model, prazo_s=prazo_s, cache=cache, ler_cache=ler_cache, **params
+        )
+        fim = object()
+        while (pedaco := await asyncio.to_thread(next, pedacos, fim)) is not fim:
+            yield pedaco
+        return
+
+    chave_cache = _chave_cache(ponto, model, messages, params, cache)
+    gravada = await asyncio.to_thread(_resposta_gravada, ponto, chave_cache, ler_cache)
+    if gravada is not None:
+        yield gravada.content
+        return
+
+    inicio, deadline = _prazos(ponto, prazo_s)
+    stream, tentativas = await _criar_com_retry_async(
+        ponto, inicio, deadline, model=model, messages=messages, **_PARAMS_STREAM, **params
+    )
+
+    leitura = _Leitura(ponto, deadline)
+    try:
+        async for chunk in stream:
+            for texto in leitura.pedacos(chunk):
+                yield texto
+    except BaseException:
+        _registrar(ponto, time.monotonic() - inicio, tentativas, erro=True, model=model)
+        await stream.close()
+        raise
+
+    resultado = _concluir(ponto, model, inicio, tentativas, "".join(leitura.partes), leitura.usage)
+    await asyncio.to_thread(_gravar, ponto, model, chave_cache, resultado)
+
+
+def stats() -> Dict[str, Dict[str, float]]:
+    """Contadores por ponto de chamada (com latência média)."""
+    with _stats_lock:
+        copia = {ponto: dict(s) for ponto, s in _stats.items()}
+
+    for s in copia.values():
+        s["latencia_media_s"] = (
+            s["latencia_total_s"] / s["chamadas"] if s["chamadas"] else 0.0
+        )
+    return copia
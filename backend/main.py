@@ -1,33 +1,116 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-# Tentativa de importar as funções de imagem
-try:
-    from image_search import get_hero_image_for_trip, get_images_for_all_cities
-except ImportError as e:
-    print(f"⚠️ Erro ao importar image_search: {e}. Recursos de imagem serão desabilitados.")
-
-    def get_hero_image_for_trip(destinations):
-        return None
-
-    def get_images_for_all_cities(destinations):
-        return {}
-
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from contextlib import asynccontextmanager
 from pathlib import Path
 import json
+import os
+import shutil
+import threading
+import time
 import uuid
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 from pydantic import BaseModel
-import shutil
+
+from catalog_snapshot import snapshot as catalog_snapshot
+import landmark_match_cache
+import llm_cache
+import llm_gateway
+import metrics
+import pdf_text_cache
+import trip_images
+import trip_index
+from trip_cache import trip_cache
+from extraction_jobs import STATUS_DONE, extraction_queue
+from upload_store import (
+    BlobWriter,
+    CHUNK_SIZE,
+    buscar_extracao_em_cache,
+    chave_extracao,
+    hashes_da_trip,
+    lock_do_arquivo,
+    salvar_extracao_em_cache,
+    salvar_json_atomico,
+    salvar_manifest,
+    vincular_blob,
+)
+
+# Sem o pacote supabase o servidor sobe sem catálogo de imagens (como em trip_images)
+try:
+    import supabase_client
+except ImportError as e:
+    print(f"⚠️ Erro ao importar supabase_client: {e}. Catálogo de imagens desabilitado.")
+    supabase_client = None
+
+
+def sync_trip_index() -> None:
+    try:
+        resumo = trip_index.sincronizar(EXTRACAO_DIR)
+        print(f"🗂️ Índice de viagens sincronizado: {resumo}")
+    except Exception as e:
+        print(f"⚠️ Erro ao sincronizar índice de viagens: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Em segundo plano para não atrasar o boot com muitas trips
+    threading.Thread(target=sync_trip_index, daemon=True).start()
+    catalog_snapshot.iniciar()
+    yield
+    catalog_snapshot.parar()
+    extraction_queue.shutdown()
+    await llm_gateway.fechar_async()
+    if supabase_client is not None:
+        await supabase_client.fechar_async()
+
 
 app = FastAPI(
     title="DSC Travel API",
     description="API para gerenciamento de viagens e extrações",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
 )
 
+
+# Registrado antes do CORS para que o 413 também saia com os headers de CORS
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Recusa uploads grandes demais pelo Content-Length, antes de ler o corpo."""
+    if request.url.path == "/upload":
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit():
+            if int(content_length) > MAX_UPLOAD_REQUEST_BYTES:
+                return JSONResponse(
+                    status_code=413,
+                    content={"detail": "Upload excede o limite por requisição"},
+                )
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def medir_requisicao(request: Request, call_next):
+    inicio = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Rota do template ("/trips/{trip_id}"), não o caminho, para não
+        # criar uma série por trip
+        rota = getattr(request.scope.get("route"), "path", None) or "desconhecida"
+        metrics.HTTP_SEGUNDOS.observar(
+            time.perf_counter() - inicio,
+            rota=rota,
+            metodo=request.method,
+            status=str(status),
+        )
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -50,6 +133,28 @@ EXTRACAO_DIR = BASE_DIR / "extracao"
 UPLOADS_DIR.mkdir(exist_ok=True)
 EXTRACAO_DIR.mkdir(exist_ok=True)
 
+MAX_UPLOAD_FILE_BYTES = int(os.getenv("MAX_UPLOAD_FILE_MB", "25")) * 1024 * 1024
+MAX_UPLOAD_REQUEST_BYTES = int(os.getenv("MAX_UPLOAD_REQUEST_MB", "100")) * 1024 * 1024
+
+metrics.registrar_coletor(
+    metrics.coletor_de_stats(
+        "dsc_cache_stats",
+        "Contadores e tamanhos dos caches do processo",
+        {
+            "llm": llm_cache.stats,
+            "pdf_text": pdf_text_cache.stats,
+            "landmark_match": landmark_match_cache.stats,
+            "trip": trip_cache.stats,
+            "catalogo": catalog_snapshot.stats,
+        },
+    )
+)
+
+
+def timing_file(trip_id: str) -> Path:
+    """Registro de tempos da trip, ao lado do JSON extraído (o índice ignora)."""
+    return EXTRACAO_DIR / f"{trip_id}.timing.json"
+
 
 class TripResponse(BaseModel):
     trip_id: str
@@ -57,45 +162,33 @@ class TripResponse(BaseModel):
     data: Dict[str, Any]
 
 
-class UploadResponse(BaseModel):
+class TripSummary(BaseModel):
     trip_id: str
-    status: str
-    message: str
-    files: List[str]
+    cliente: str
+    periodo: Dict[str, str]
+    cidades: List[str]
+    hoteis: List[str]
+    valor: Optional[float]
+    atualizado_em: float
 
 
-def extract_cities_from_trip(trip: Dict[str, Any]) -> List[str]:
-    """Extrai lista de cidades de um objeto de viagem."""
-    cidades: List[str] = []
+class TripListResponse(BaseModel):
+    items: List[TripSummary]
+    next_cursor: Optional[str]
 
-    destinos = trip.get("destinations") or trip.get("destinos") or []
-    if isinstance(destinos, List):
-        for d in destinos:
-            if isinstance(d, Dict):
-                nome = (
-                    d.get("city")
-                    or d.get("cidade")
-                    or d.get("name")
-                    or d.get("nome")
-                )
-                if nome and nome not in cidades:
-                    cidades.append(str(nome))
-        if cidades:
-            return cidades
 
-    dias = trip.get("days") or trip.get("dias") or []
-    if isinstance(dias, List):
-        for dia in dias:
-            if isinstance(dia, Dict):
-                cidade = dia.get("city") or dia.get("cidade")
-                if cidade and cidade not in cidades:
-                    cidades.append(str(cidade))
+class UploadedFileInfo(BaseModel):
+    name: str
+    sha256: str
+    bytes: int
 
-    unica = trip.get("city") or trip.get("cidade")
-    if unica:
-        cidades.append(str(unica))
 
-    return cidades
+class UploadResponse(BaseModel):
+    trip_id: str
+    status: str
+    message: str
+    files: List[str]
+    file_info: List[UploadedFileInfo] = []
 
 
 @app.get("/")
@@ -108,99 +201,401 @@ def ping():
     return {"status": "ok", "message": "mini-sistema-dsc online"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Métricas no formato texto do Prometheus."""
+    return PlainTextResponse(
+        metrics.exportar(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @app.post("/upload", response_model=UploadResponse)
 async def upload_files(files: List[UploadFile] = File(...)):
     trip_id = f"trip_{uuid.uuid4().hex[:12]}"
     trip_folder = UPLOADS_DIR / trip_id
     trip_folder.mkdir(exist_ok=True)
+    inicio = time.perf_counter()
 
     saved_files: List[str] = []
+    file_info: List[UploadedFileInfo] = []
+    manifest: Dict[str, str] = {}
+    request_bytes = 0
 
     try:
         for file in files:
-            file_path = trip_folder / file.filename
-            with file_path.open("wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            saved_files.append(file.filename)
+            nome = Path(file.filename or "arquivo").name
+            writer = await run_in_threadpool(BlobWriter)
+            try:
+                # Lê e grava em pedaços fora do event loop, com hash e tamanho na mesma passada
+                while chunk := await file.read(CHUNK_SIZE):
+                    request_bytes += len(chunk)
+                    if writer.bytes + len(chunk) > MAX_UPLOAD_FILE_BYTES:
+                        raise HTTPException(
+                            status_code=413,
+                            detail=f"Arquivo {nome} excede o limite por arquivo",
+                        )
+                    if request_bytes > MAX_UPLOAD_REQUEST_BYTES:
+                        raise HTTPException(
+                            status_code=413,
+                            detail="Upload excede o limite por requisição",
+                        )
+                    await run_in_threadpool(writer.write, chunk)
+                sha256 = await run_in_threadpool(writer.finalizar)
+            except BaseException:
+                await run_in_threadpool(writer.descartar)
+                raise
+
+            await run_in_threadpool(vincular_blob, trip_folder, nome, sha256)
+            manifest[nome] = sha256
+            saved_files.append(nome)
+            file_info.append(
+                UploadedFileInfo(name=nome, sha256=sha256, bytes=writer.bytes)
+            )
+
+        await run_in_threadpool(salvar_manifest, trip_folder, manifest)
+
+        segundos = time.perf_counter() - inicio
+        metrics.observar_etapa("upload", segundos)
+        await run_in_threadpool(
+            metrics.salvar_secao,
+            timing_file(trip_id),
+            "upload",
+            {"total_s": round(segundos, 4), "arquivos": len(saved_files), "bytes": request_bytes},
+        )
 
         return UploadResponse(
             trip_id=trip_id,
             status="uploaded",
             message=f"{len(saved_files)} arquivo(s) enviado(s) com sucesso",
             files=saved_files,
+            file_info=file_info,
         )
 
+    except HTTPException:
+        await run_in_threadpool(shutil.rmtree, trip_folder, True)
+        raise
     except Exception as e:
+        await run_in_threadpool(shutil.rmtree, trip_folder, True)
         raise HTTPException(status_code=500, detail=f"Erro ao fazer upload: {str(e)}")
 
 
+@app.get("/trips", response_model=TripListResponse)
+def list_trips(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    q: Optional[str] = None,
+    cidade: Optional[str] = None,
+    cliente: Optional[str] = None,
+    valor_min: Optional[float] = None,
+    valor_max: Optional[float] = None,
+):
+    """
+    Lista viagens a partir do índice (sem abrir os JSONs de extracao/).
+    Paginação por cursor: repasse `next_cursor` para obter a próxima página.
+    """
+    try:
+        items, next_cursor = trip_index.listar(
+            limit=limit,
+            cursor=cursor,
+            q=q,
+            cidade=cidade,
+            cliente=cliente,
+            valor_min=valor_min,
+            valor_max=valor_max,
+        )
+    except trip_index.CursorInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return TripListResponse(items=items, next_cursor=next_cursor)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara o If-None-Match (lista ou *) com o ETag atual."""
+    if not if_none_match:
+        return False
+    candidatos = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidatos or etag in candidatos
+
+
 @app.get("/trips/{trip_id}", response_model=TripResponse)
-def get_trip(trip_id: str):
+async def get_trip(trip_id: str, if_none_match: Optional[str] = Header(None)):
     """
     Retorna dados de uma viagem.
-    Automaticamente busca imagens hero e por cidade (se o módulo de imagens estiver disponível).
+    As imagens hero e por cidade vêm do que foi calculado na extração; se o
+    catálogo de imagens mudou, a trip é reenriquecida em segundo plano (uma
+    task do event loop, com os clientes assíncronos). A demo não é
+    regravada: as imagens dela ficam em memória (trip_images).
+    Nenhuma chamada externa acontece dentro da requisição.
+    Responde 304 quando o If-None-Match bate com o ETag atual.
     """
     if trip_id == "demo":
-        try:
-            with open(EXTRACAO_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except FileNotFoundError:
-            raise HTTPException(status_code=404, detail="Arquivo não encontrado")
-        except json.JSONDecodeError:
-            raise HTTPException(status_code=500, detail="Erro ao ler JSON")
+        extracao_file = EXTRACAO_PATH
+        not_found_detail = "Arquivo não encontrado"
+        decode_error_detail = "Erro ao ler JSON"
     else:
         extracao_file = EXTRACAO_DIR / f"{trip_id}.json"
+        not_found_detail = f"Viagem {trip_id} não encontrada"
+        decode_error_detail = "Erro ao ler dados"
+
+    try:
+        with metrics.cronometro("leitura_trip"):
+            cached = await run_in_threadpool(trip_cache.carregar, extracao_file)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=not_found_detail)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise HTTPException(status_code=500, detail=decode_error_detail)
+
+    # Cópia rasa: o dict do cache não pode receber os campos desta resposta
+    data = dict(cached.data)
+    etag = f'"{cached.digest[:32]}"'
+
+    if trip_id == "demo":
+        # Fixture versionada no git: as imagens ficam em memória, por versão
+        # do catálogo, e entram no ETag (o arquivo não muda quando elas mudam)
+        imagens = trip_images.imagens_em_memoria(extracao_file, cached.digest)
+        if imagens is None:
+            trip_images.agendar_em_memoria_async(extracao_file, cached.data, cached.digest)
+        else:
+            data.update(imagens)
+            etag = f'"{cached.digest[:32]}-{imagens["imagens_versao"]}"'
+    elif not trip_images.enriquecimento_atual(cached.data):
+        trip_images.agendar_atualizacao_async(
+            extracao_file, on_done=lambda data: reindex_trip(trip_id, extracao_file, data)
+        )
 
-        if not extracao_file.exists():
-            raise HTTPException(
-                status_code=404, detail=f"Viagem {trip_id} não encontrada"
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    data.update(trip_images.imagens_da_trip(data))
+
+    return JSONResponse(
+        content=TripResponse(trip_id=trip_id, status="ok", data=data).model_dump(),
+        headers=headers,
+    )
+
+
+@app.post("/trips/{trip_id}/imagens")
+async def refresh_trip_images(trip_id: str):
+    """Recalcula agora as imagens hero e por cidade de uma viagem."""
+    extracao_file = EXTRACAO_PATH if trip_id == "demo" else EXTRACAO_DIR / f"{trip_id}.json"
+
+    if not extracao_file.exists():
+        raise HTTPException(status_code=404, detail=f"Viagem {trip_id} não encontrada")
+
+    try:
+        if trip_id == "demo":
+            # Fixture versionada no git: recalcula só em memória
+            cached = await run_in_threadpool(trip_cache.carregar, extracao_file)
+            data = await trip_images.enriquecer_em_memoria_async(
+                extracao_file, cached.data, cached.digest
             )
+        else:
+            data = await trip_images.atualizar_arquivo_async(extracao_file)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=500, detail="Erro ao ler dados")
+
+    await run_in_threadpool(reindex_trip, trip_id, extracao_file, data)
+
+    return {
+        "trip_id": trip_id,
+        "status": "ok",
+        "imagens_versao": data["imagens_versao"],
+        **trip_images.imagens_da_trip(data),
+    }
+
+
+def sse(evento: str, dados: Any) -> str:
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+def salvar_roteiro(trip_id: str, extracao_file: Path, dias: List[Dict[str, Any]]) -> None:
+    """
+    Grava o roteiro gerado em stream no JSON da trip (relido do disco).
+    Com o roteiro a extração fica completa e vai para o cache de extrações,
+    que run_extraction só alimenta quando gera o roteiro junto.
+    """
+    with lock_do_arquivo(extracao_file):
+        with extracao_file.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        data["roteiro"] = dias
+        salvar_json_atomico(extracao_file, data)
+    reindex_trip(trip_id, extracao_file, data)
+
+    trip_folder = UPLOADS_DIR / trip_id
+    if not data.get("simulado") and trip_folder.is_dir():
+        salvar_extracao_em_cache(chave_extracao(hashes_da_trip(trip_folder)), data)
+
+
+@app.get("/trips/{trip_id}/roteiro/stream")
+async def stream_roteiro(trip_id: str, regenerar: bool = False):
+    """
+    Roteiro via Server-Sent Events: um evento `dia` por dia, à medida que o
+    LLM escreve, com a foto que o catálogo resolve sem LLM; depois um
+    evento `foto` ({indice, dia, imagem_dia}) por dia cuja foto saiu do
+    match em lote com o LLM (uma chamada por trip); por fim `fim` (ou `erro`).
+    Se a trip já tem roteiro (e regenerar=false), os dias salvos saem na hora;
+    com regenerar=true o LLM escreve um roteiro novo, sem reaproveitar o cache.
+    O roteiro gerado é gravado na trip ao final (exceto na demo).
+    """
+    extracao_file = EXTRACAO_PATH if trip_id == "demo" else EXTRACAO_DIR / f"{trip_id}.json"
 
+    try:
+        cached = await run_in_threadpool(trip_cache.carregar, extracao_file)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Viagem {trip_id} não encontrada")
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise HTTPException(status_code=500, detail="Erro ao ler dados")
+
+    salvo = cached.data.get("roteiro") or []
+
+    async def eventos() -> AsyncIterator[str]:
+        if salvo and not regenerar:
+            for dia in salvo:
+                yield sse("dia", dia)
+            yield sse("fim", {"dias": len(salvo), "gerado": False})
+            return
+
+        from extract_with_ai import stream_roteiro_com_fotos_async
+
+        dias: List[Dict[str, Any]] = []
         try:
-            with open(extracao_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except json.JSONDecodeError:
-            raise HTTPException(status_code=500, detail="Erro ao ler dados")
-
-    cidades = extract_cities_from_trip(data)
-
-    if cidades:
-        hero = get_hero_image_for_trip(cidades)
-        imagens_por_cidade = get_images_for_all_cities(cidades)
-        data["heroImage"] = hero
-        data["cityImages"] = imagens_por_cidade
+            async for evento, dados in stream_roteiro_com_fotos_async(dict(cached.data), regenerar):
+                if evento == "dia":
+                    dias.append(dados)
+                yield sse(evento, dados)
+        except Exception as e:
+            print(f"❌ Erro no stream do roteiro de {trip_id}: {e}")
+            yield sse("erro", {"detail": str(e)})
+            return
+
+        if dias and trip_id != "demo":
+            await run_in_threadpool(salvar_roteiro, trip_id, extracao_file, dias)
+        yield sse("fim", {"dias": len(dias), "gerado": True})
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: proxies (nginx) repassam cada evento na hora
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def reindex_trip(trip_id: str, extracao_file: Path, data: Dict[str, Any]) -> None:
+    """Mantém o índice em dia depois que o JSON da trip é regravado."""
+    if trip_id == "demo":
+        return
+    trip_index.indexar_trip(trip_id, data, atualizado_em=extracao_file.stat().st_mtime)
+
+
+def run_extraction(
+    trip_id: str,
+    on_stage: Callable[[str], None],
+    roteiro_em_stream: bool = False,
+    usar_cache: bool = True,
+) -> Dict[str, Any]:
+    """
+    Executa a extração de uma trip (roda em um worker de extraction_jobs
+    ou no reextrair.py).
+    Com roteiro_em_stream o roteiro fica para GET /trips/{trip_id}/roteiro/stream.
+    Com usar_cache=False a extração é refeita mesmo com o resultado no
+    cache de extrações (que é regravado ao final).
+    Se a extração falhar e cair nos dados simulados, o resultado vem com
+    "simulado": True e uma extração anterior em disco não é sobrescrita.
+    Os tempos de cada etapa ficam em extracao/{trip_id}.timing.json.
+    """
+    with metrics.registro_da_trip(trip_id, timing_file(trip_id)) as registro:
+        resultado = _run_extraction(trip_id, on_stage, roteiro_em_stream, usar_cache)
+        registro.extra.update(resultado)
+        return resultado
+
+
+def _run_extraction(
+    trip_id: str, on_stage: Callable[[str], None], roteiro_em_stream: bool, usar_cache: bool
+) -> Dict[str, Any]:
+    trip_folder = UPLOADS_DIR / trip_id
+
+    on_stage("verificando_cache")
+    chave = chave_extracao(hashes_da_trip(trip_folder))
+    extracted_data = buscar_extracao_em_cache(chave) if usar_cache else None
+    from_cache = extracted_data is not None
+    resultado: Dict[str, Any] = {"cache": extracted_data is not None}
+
+    if from_cache:
+        print(f"⚡ Extração reaproveitada do cache para {trip_id}")
     else:
-        data["heroImage"] = None
-        data["cityImages"] = {}
+        from extract_with_ai import extract_travel_data
+
+        extracted_data = extract_travel_data(
+            trip_folder,
+            on_stage=on_stage,
+            gerar_roteiro=not roteiro_em_stream,
+            on_report=lambda relatorio: resultado.update(preprocessamento=relatorio),
+        )
+        # Sem roteiro não vai para o cache: um hit precisa servir os dois modos
+        if not extracted_data.get("simulado") and "roteiro" in extracted_data:
+            salvar_extracao_em_cache(chave, extracted_data)
+
+    extracao_file = EXTRACAO_DIR / f"{trip_id}.json"
+    if extracted_data.get("simulado"):
+        resultado["simulado"] = True
+        if extracao_file.exists():
+            # Falha passageira (limite de taxa, prazo) não apaga uma extração boa
+            print(f"⚠️ Extração de {trip_id} falhou; mantendo a extração anterior")
+            return resultado
 
-    return TripResponse(trip_id=trip_id, status="ok", data=data)
+    if not trip_images.enriquecimento_atual(extracted_data):
+        on_stage("enriquecendo_imagens")
+        with metrics.cronometro("enriquecendo_imagens"):
+            trip_images.enriquecer_imagens(extracted_data)
 
+    on_stage("salvando")
+    with lock_do_arquivo(extracao_file):
+        salvar_json_atomico(extracao_file, extracted_data)
+    reindex_trip(trip_id, extracao_file, extracted_data)
 
-@app.post("/extract/{trip_id}")
-async def extract_trip_data(trip_id: str):
-    """Extrai dados dos arquivos enviados usando IA."""
-    from extract_with_ai import extract_travel_data
+    return resultado
 
+
+@app.post("/extract/{trip_id}", status_code=202)
+async def extract_trip_data(trip_id: str, roteiro_em_stream: bool = False):
+    """
+    Enfileira a extração dos arquivos enviados e devolve o job imediatamente.
+    Com roteiro_em_stream=true o job não gera o roteiro; o front abre
+    GET /trips/{trip_id}/roteiro/stream e recebe os dias conforme saem.
+    """
     trip_folder = UPLOADS_DIR / trip_id
 
     if not trip_folder.exists():
         raise HTTPException(status_code=404, detail=f"Trip {trip_id} não encontrado")
 
-    try:
-        extracted_data = extract_travel_data(trip_folder)
-
-        extracao_file = EXTRACAO_DIR / f"{trip_id}.json"
-        with extracao_file.open("w", encoding="utf-8") as f:
-            json.dump(extracted_data, f, ensure_ascii=False, indent=2)
-
-        return {
-            "trip_id": trip_id,
-            "status": "extracted",
-            "message": "Dados extraídos com sucesso",
-        }
+    job = extraction_queue.submeter(
+        trip_id, lambda on_stage: run_extraction(trip_id, on_stage, roteiro_em_stream)
+    )
+
+    return {
+        "trip_id": trip_id,
+        "job_id": job.job_id,
+        "status": job.status,
+        "stage": job.stage,
+        "message": "Extração enfileirada",
+    }
+
+
+@app.get("/extract/{trip_id}/status")
+def get_extraction_status(trip_id: str):
+    """Estado da extração: queued, running, done ou failed, com a etapa atual."""
+    job = extraction_queue.status(trip_id)
+
+    if job is None:
+        # Job de antes de um restart: o resultado em disco basta
+        if (EXTRACAO_DIR / f"{trip_id}.json").exists():
+            return {"trip_id": trip_id, "job_id": None, "status": STATUS_DONE, "stage": None}
+        raise HTTPException(
+            status_code=404, detail=f"Nenhuma extração para {trip_id}"
+        )
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro na extração: {str(e)}")
+    return job.to_dict()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,348 @@
+"""
+Métricas do pipeline no formato texto do Prometheus (GET /metrics).
+
+Sem dependência nova: histogramas e contadores simples, protegidos por
+lock, exportados em text/plain 0.0.4.
+
+- dsc_stage_duration_seconds{stage}: cada etapa (upload, leitura_pdf,
+  preparando_texto, template, catalogo, match_semantico, leitura_trip e
+  as etapas do grafo pós-extração)
+- dsc_llm_request_duration_seconds{ponto}: chamadas ao LLM (sem as do cache)
+- dsc_llm_requests_total{ponto,resultado}: ok, erro, cache ou limite
+  (prazo esgotado na fila do limite de taxa, sem chegar à rede)
+- dsc_llm_tokens_total{ponto,tipo}: tokens de prompt e de completion
+- dsc_llm_cost_usd_total{ponto}: custo estimado pelos preços de LLM_PRECOS
+- dsc_http_request_duration_seconds{rota,metodo,status}
+
+Além do agregado, cada extração grava um registro por trip em
+extracao/{trip_id}.timing.json (registro_da_trip): o tempo de cada etapa
+e os tokens de cada ponto de chamada daquela trip. O registro segue o
+contextvars, então etapas em threads só entram nele se a thread for
+submetida com contextvars.copy_context().run.
+"""
+
+import contextvars
+import functools
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from upload_store import salvar_json_atomico
+
+BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# USD por milhão de tokens (entrada, saída); modelo desconhecido usa o gpt-4o
+LLM_PRECOS: Dict[str, Tuple[float, float]] = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+if os.getenv("LLM_PRECOS"):
+    # LLM_PRECOS='{"gpt-4o": [2.5, 10]}'
+    LLM_PRECOS.update({m: tuple(p) for m, p in json.loads(os.environ["LLM_PRECOS"]).items()})
+
+
+def _labels(nomes: Tuple[str, ...], valores: Tuple[str, ...], extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _numero(valor: float) -> str:
+    if math.isinf(valor):
+        return "+Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class Contador:
+    def __init__(self, nome: str, ajuda: str, labels: Tuple[str, ...] = ()) -> None:
+        self.nome = nome
+        self.ajuda = ajuda
+        self.labels = labels
+        self._valores: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        _METRICAS.append(self)
+
+    def inc(self, valor: float = 1, **labels: str) -> None:
+        chave = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def linhas(self) -> List[str]:
+        with self._lock:
+            valores = sorted(self._valores.items())
+        saida = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} counter"]
+        saida += [f"{self.nome}{_labels(self.labels, k)} {_numero(v)}" for k, v in valores]
+        return saida
+
+
+class Histograma:
+    def __init__(
+        self,
+        nome: str,
+        ajuda: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = BUCKETS_S,
+    ) -> None:
+        self.nome = nome
+        self.ajuda = ajuda
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # labels → (contagem por bucket, soma, total)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+        _METRICAS.append(self)
+
+    def observar(self, valor: float, **labels: str) -> None:
+        chave = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            contagens, soma, total = self._series.get(chave, ([0] * len(self.buckets), 0.0, 0))
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    contagens[i] += 1
+            self._series[chave] = (contagens, soma + valor, total + 1)
+
+    def linhas(self) -> List[str]:
+        with self._lock:
+            series = sorted((k, (list(c), s, t)) for k, (c, s, t) in self._series.items())
+        saida = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        for chave, (contagens, soma, total) in series:
+            for limite, n in zip(self.buckets, contagens):
+                le = 'le="' + _numero(limite) + '"'
+                saida.append(f"{self.nome}_bucket{_labels(self.labels, chave, le)} {n}")
+            saida.append(f"{self.nome}_sum{_labels(self.labels, chave)} {_numero(soma)}")
+            saida.append(f"{self.nome}_count{_labels(self.labels, chave)} {total}")
+        return saida
+
+
+_METRICAS: List[Any] = []
+# Funções que devolvem linhas prontas (contadores de outros módulos)
+_COLETORES: List[Callable[[], List[str]]] = []
+
+ETAPA_SEGUNDOS = Histograma(
+    "dsc_stage_duration_seconds", "Duração de cada etapa do pipeline", ("stage",)
+)
+LLM_SEGUNDOS = Histograma(
+    "dsc_llm_request_duration_seconds",
+    "Duração das chamadas ao LLM, com retries (sem as respondidas pelo cache)",
+    ("ponto",),
+)
+LLM_CHAMADAS = Contador(
+    "dsc_llm_requests_total", "Chamadas ao LLM por resultado (ok, erro, cache, limite)", ("ponto", "resultado")
+)
+LLM_TOKENS = Contador(
+    "dsc_llm_tokens_total", "Tokens consumidos (prompt, completion)", ("ponto", "tipo")
+)
+LLM_CUSTO = Contador(
+    "dsc_llm_cost_usd_total", "Custo estimado das chamadas ao LLM em USD", ("ponto",)
+)
+HTTP_SEGUNDOS = Histograma(
+    "dsc_http_request_duration_seconds",
+    "Duração das requisições HTTP até a resposta",
+    ("rota", "metodo", "status"),
+)
+
+
+def registrar_coletor(coletor: Callable[[], List[str]]) -> None:
+    _COLETORES.append(coletor)
+
+
+def coletor_de_stats(nome: str, ajuda: str, fontes: Dict[str, Callable[[], Dict[str, Any]]]):
+    """
+    Coletor para os stats() que os caches já expõem: um gauge
+    `nome{fonte, campo}` por valor numérico.
+    """
+
+    def coletar() -> List[str]:
+        linhas = [f"# HELP {nome} {ajuda}", f"# TYPE {nome} gauge"]
+        for fonte, stats in fontes.items():
+            for campo, valor in sorted(stats().items()):
+                if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                    linhas.append(f"{nome}{_labels(('fonte', 'campo'), (fonte, campo))} {_numero(valor)}")
+        return linhas
+
+    return coletar
+
+
+def exportar() -> str:
+    linhas: List[str] = []
+    for metrica in _METRICAS:
+        linhas += metrica.linhas()
+    for coletor in _COLETORES:
+        try:
+            linhas += coletor()
+        except Exception as e:
+            print(f"⚠️ Coletor de métricas falhou: {e}")
+    return "\n".join(linhas) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Registro por trip
+# ---------------------------------------------------------------------------
+
+
+class RegistroTrip:
+    def __init__(self, trip_id: str) -> None:
+        self.trip_id = trip_id
+        self.inicio = time.time()
+        self.etapas: Dict[str, Dict[str, float]] = {}
+        self.llm: Dict[str, Dict[str, float]] = {}
+        self.extra: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def etapa(self, nome: str, segundos: float) -> None:
+        with self._lock:
+            e = self.etapas.setdefault(nome, {"n": 0, "total_s": 0.0, "max_s": 0.0})
+            e["n"] += 1
+            e["total_s"] += segundos
+            e["max_s"] = max(e["max_s"], segundos)
+
+    def chamada_llm(
+        self, ponto: str, segundos: float, prompt: int, completion: int, custo: float, resultado: str
+    ) -> None:
+        with self._lock:
+            s = self.llm.setdefault(
+                ponto,
+                {"chamadas": 0, "cache_hits": 0, "erros": 0, "latencia_s": 0.0,
+                 "prompt_tokens": 0, "completion_tokens": 0, "custo_usd": 0.0},
+            )
+            # Como no Prometheus: só conta chamada o que chegou à rede
+            s["chamadas"] += resultado in ("ok", "erro")
+            s["cache_hits"] += resultado == "cache"
+            s["erros"] += resultado in ("erro", "limite")
+            s["latencia_s"] += segundos
+            s["prompt_tokens"] += prompt
+            s["completion_tokens"] += completion
+            s["custo_usd"] += custo
+
+    def para_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "inicio": self.inicio,
+                "etapas": {
+                    nome: {k: round(v, 4) if isinstance(v, float) else v for k, v in e.items()}
+                    for nome, e in self.etapas.items()
+                },
+                "llm": {
+                    ponto: {k: round(v, 6) if isinstance(v, float) else v for k, v in s.items()}
+                    for ponto, s in self.llm.items()
+                },
+                **self.extra,
+            }
+
+
+_registro_atual: contextvars.ContextVar[Optional[RegistroTrip]] = contextvars.ContextVar(
+    "registro_trip", default=None
+)
+_arquivo_lock = threading.Lock()
+
+
+def salvar_secao(destino: Path, secao: str, dados: Dict[str, Any]) -> None:
+    """Atualiza uma seção (upload, extracao) do registro de tempos da trip."""
+    with _arquivo_lock:
+        try:
+            with destino.open("r", encoding="utf-8") as f:
+                atual = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            atual = {}
+        atual[secao] = dados
+        try:
+            salvar_json_atomico(destino, atual)
+        except OSError as e:
+            print(f"⚠️ Não foi possível salvar tempos em {destino.name}: {e}")
+
+
+@contextmanager
+def registro_da_trip(trip_id: str, destino: Path, secao: str = "extracao") -> Iterator[RegistroTrip]:
+    """
+    Junta as etapas e chamadas ao LLM feitas dentro do bloco e grava em
+    `destino` (seção `secao`) ao sair, com ou sem erro.
+    """
+    registro = RegistroTrip(trip_id)
+    token = _registro_atual.set(registro)
+    inicio = time.monotonic()
+    erro: Optional[str] = None
+    try:
+        yield registro
+    except BaseException as e:
+        erro = f"{e.__class__.__name__}: {e}"
+        raise
+    finally:
+        _registro_atual.reset(token)
+        dados = registro.para_dict()
+        dados["total_s"] = round(time.monotonic() - inicio, 4)
+        if erro:
+            dados["erro"] = erro
+        salvar_secao(destino, secao, dados)
+
+
+# ---------------------------------------------------------------------------
+# Pontos de medição
+# ---------------------------------------------------------------------------
+
+
+def observar_etapa(etapa: str, segundos: float) -> None:
+    ETAPA_SEGUNDOS.observar(segundos, stage=etapa)
+    registro = _registro_atual.get()
+    if registro is not None:
+        registro.etapa(etapa, segundos)
+
+
+@contextmanager
+def cronometro(etapa: str) -> Iterator[None]:
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar_etapa(etapa, time.perf_counter() - inicio)
+
+
+def cronometrado(etapa: str):
+    """Decorator: mede cada chamada da função como a etapa `etapa`."""
+
+    def decorar(func):
+        @functools.wraps(func)
+        def medida(*args, **kwargs):
+            with cronometro(etapa):
+                return func(*args, **kwargs)
+
+        return medida
+
+    return decorar
+
+
+def custo_usd(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    entrada, saida = LLM_PRECOS.get(model) or LLM_PRECOS["gpt-4o"]
+    return (prompt_tokens * entrada + completion_tokens * saida) / 1_000_000
+
+
+def registrar_llm(
+    ponto: str,
+    model: str,
+    segundos: float,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    resultado: str = "ok",
+) -> None:
+    """Uma chamada ao LLM: resultado é ok, erro, cache ou limite (não chegou à rede)."""
+    LLM_CHAMADAS.inc(ponto=ponto, resultado=resultado)
+    custo = 0.0
+    if resultado in ("ok", "erro"):
+        LLM_SEGUNDOS.observar(segundos, ponto=ponto)
+        custo = custo_usd(model, prompt_tokens, completion_tokens)
+        LLM_TOKENS.inc(prompt_tokens, ponto=ponto, tipo="prompt")
+        LLM_TOKENS.inc(completion_tokens, ponto=ponto, tipo="completion")
+        LLM_CUSTO.inc(custo, ponto=ponto)
+
+    registro = _registro_atual.get()
+    if registro is not None:
+        registro.chamada_llm(ponto, segundos, prompt_tokens, completion_tokens, custo, resultado)
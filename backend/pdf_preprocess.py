@@ -0,0 +1,317 @@
+"""
+Limpeza do texto dos PDFs antes do prompt de extração.
+
+As cotações trazem cabeçalhos repetidos, páginas inteiras de texto jurídico
+(políticas de alteração, Resolução 400 da ANAC, termos e privacidade) e,
+não raro, o mesmo PDF enviado mais de uma vez. Nada disso vira campo no
+JSON extraído, mas tudo vira token de entrada. Aqui, na ordem:
+
+1. páginas idênticas (inclusive de arquivos repetidos) entram uma vez só
+2. blocos de texto padrão conhecidos são removidos
+3. linhas longas repetidas entre páginas/arquivos entram uma vez só
+4. cada página é classificada nas seções que interessam (voos, hoteis,
+   passeios, precos) pelas palavras-chave
+5. o total é medido contra PDF_PROMPT_TOKEN_BUDGET; se passar, saem
+   primeiro as páginas sem nenhuma seção relevante, depois o fim do texto
+
+O relatório diz quanto foi cortado em cada etapa.
+"""
+
+import hashlib
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from texto import normalizar
+
+PDF_PROMPT_TOKEN_BUDGET = int(os.getenv("PDF_PROMPT_TOKEN_BUDGET", "12000"))
+
+# Linhas curtas repetem por motivo legítimo ("GRU", "Econômica", "São Paulo");
+# só linhas a partir deste tamanho são deduplicadas
+DEDUPE_MIN_CHARS = 40
+
+# Onde começa um bloco de texto padrão. O que vier antes do marcador na mesma
+# linha é mantido ("Buenos Aires - VDCVocê deve levar..." → "Buenos Aires - VDC")
+BOILERPLATE_INICIO = [
+    r"pol[ií]tica de altera[cç][oõ]es e cancelamentos",
+    r"os custos informados se aplicam",
+    r"e se eu quiser fazer uma altera[cç][aã]o",
+    r"voc[eê] deve levar em considera[cç][aã]o que o transporte",
+    r"tenho direito a desist[eê]ncia",
+    r"\*?caso o cancelamento seja solicitado",
+    r"o que acontecer[aá] se eu quiser",
+    r"termos e condi[cç][oõ]es",
+    r"privacidade, dados pessoais",
+    r"tenha em mente que n[aã]o [eé] poss[ií]vel garantir",
+]
+
+# Linhas curtas que fazem parte dos blocos acima
+BOILERPLATE_CURTAS = {
+    "alteracoes",
+    "cancelamento",
+    "permite (com custo)",
+    "nao reembolsavel",
+    "nao reembolsavel *",
+    "alteracao de data ou itinerario",
+    "importante",
+}
+
+_RE_INICIO = re.compile("|".join(BOILERPLATE_INICIO), re.IGNORECASE)
+
+SECOES: Dict[str, List[str]] = {
+    "voos": [
+        r"\bvoo\b", r"\baeroporto\b", r"\bembarque\b", r"\bbagagem\b",
+        r"\bdura[cç][aã]o\b", r"\b[A-Z]{3}\b", r"\bconex[aã]o\b",
+    ],
+    "hoteis": [
+        r"\bhotel\b", r"\bcheck[ -]?in\b", r"\bcheck[ -]?out\b", r"\bnoites?\b",
+        r"\bquarto\b", r"\bhospedagem\b", r"\bcaf[eé] da manh[aã]\b",
+    ],
+    "passeios": [
+        r"\bpasseios?\b", r"\btour\b", r"\bexcurs[aã]o\b", r"\btransfer\b",
+        r"\bingressos?\b", r"\bcity ?tour\b",
+    ],
+    "precos": [
+        r"\btotal\b", r"R\$", r"\bvalor\b", r"\bpre[cç]o\b", r"\btarifa\b",
+    ],
+}
+_RE_SECOES = {
+    nome: [re.compile(p) if p == r"\b[A-Z]{3}\b" else re.compile(p, re.IGNORECASE) for p in padroes]
+    for nome, padroes in SECOES.items()
+}
+
+try:
+    import tiktoken
+
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _ENCODING = None
+
+
+def contar_tokens(texto: str) -> int:
+    """Tokens do gpt-4o (tiktoken), ou ~4 caracteres por token sem ele."""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(texto, disallowed_special=()))
+    return (len(texto) + 3) // 4
+
+
+@dataclass
+class _Pagina:
+    arquivo: str
+    numero: int
+    linhas: List[str]
+    secoes: Set[str] = field(default_factory=set)
+
+    @property
+    def texto(self) -> str:
+        return "\n".join(self.linhas)
+
+
+@dataclass(frozen=True)
+class PaginaPreparada:
+    arquivo: str
+    numero: int
+    texto: str
+    secoes: Tuple[str, ...]
+
+
+@dataclass
+class TextoPreparado:
+    # (nome do arquivo, texto limpo), na ordem dos arquivos
+    arquivos: List[Tuple[str, str]]
+    relatorio: Dict[str, Any]
+    # As mesmas páginas, uma a uma, para quem precisa dividir o texto
+    paginas: List[PaginaPreparada] = field(default_factory=list)
+
+
+def _limpar_linha(linha: str) -> str:
+    return " ".join(linha.split())
+
+
+def _chave_linha(linha: str) -> str:
+    return normalizar(linha)
+
+
+def _hash_pagina(linhas: List[str]) -> str:
+    bruto = "\n".join(_chave_linha(l) for l in linhas if l)
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+
+def _prosa(linha: str) -> bool:
+    """Linha que parece continuação de um parágrafo de texto padrão."""
+    if len(linha) >= 60 or _chave_linha(linha) in BOILERPLATE_CURTAS:
+        return True
+    # "A passagem não é reembolsável." sim; "Duração total 6h 20mSex.. 30 Jan." não
+    return linha.endswith((".", "?", ":", ";", ",")) and not re.search(r"\d", linha)
+
+
+def _remover_boilerplate(linhas: List[str]) -> Tuple[List[str], int]:
+    mantidas: List[str] = []
+    removidas = 0
+    em_bloco = False
+
+    for linha in linhas:
+        if not linha:
+            continue
+
+        marcador = _RE_INICIO.search(linha)
+        if marcador:
+            prefixo = linha[: marcador.start()].strip()
+            if prefixo:
+                mantidas.append(prefixo)
+            em_bloco = True
+            removidas += 1
+            continue
+
+        if em_bloco and _prosa(linha):
+            removidas += 1
+            continue
+
+        em_bloco = False
+        mantidas.append(linha)
+
+    return mantidas, removidas
+
+
+def _classificar(pagina: _Pagina) -> None:
+    texto = pagina.texto
+    for nome, padroes in _RE_SECOES.items():
+        # Duas palavras-chave diferentes evitam falsos positivos ("total" solto)
+        if sum(1 for p in padroes if p.search(texto)) >= 2:
+            pagina.secoes.add(nome)
+
+
+def preparar_texto(
+    arquivos: List[Tuple[str, List[str]]],
+    orcamento_tokens: Optional[int] = None,
+) -> TextoPreparado:
+    """
+    Limpa e deduplica o texto das páginas de todos os arquivos da trip.
+
+    Args:
+        arquivos: (nome do arquivo, páginas) na ordem em que vão ao prompt
+        orcamento_tokens: Limite de tokens do texto (padrão PDF_PROMPT_TOKEN_BUDGET)
+
+    Returns:
+        Texto limpo por arquivo e o relatório do que foi cortado
+    """
+    orcamento = orcamento_tokens if orcamento_tokens is not None else PDF_PROMPT_TOKEN_BUDGET
+
+    texto_original = "\n".join("\n".join(paginas) for _, paginas in arquivos)
+    relatorio: Dict[str, Any] = {
+        "arquivos": len(arquivos),
+        "paginas": sum(len(paginas) for _, paginas in arquivos),
+        "paginas_duplicadas": 0,
+        "linhas_boilerplate": 0,
+        "linhas_duplicadas": 0,
+        "paginas_cortadas_orcamento": 0,
+        "truncado": False,
+        "secoes": {nome: 0 for nome in SECOES},
+        "tokens_originais": contar_tokens(texto_original),
+        "orcamento_tokens": orcamento,
+    }
+
+    paginas: List[_Pagina] = []
+    hashes_vistos: Set[str] = set()
+    linhas_vistas: Set[str] = set()
+
+    for nome, textos in arquivos:
+        for numero, texto in enumerate(textos, 1):
+            linhas = [_limpar_linha(l) for l in texto.splitlines()]
+
+            hash_pagina = _hash_pagina(linhas)
+            if hash_pagina in hashes_vistos:
+                relatorio["paginas_duplicadas"] += 1
+                continue
+            hashes_vistos.add(hash_pagina)
+
+            linhas, removidas = _remover_boilerplate(linhas)
+            relatorio["linhas_boilerplate"] += removidas
+
+            unicas: List[str] = []
+            for linha in linhas:
+                if len(linha) >= DEDUPE_MIN_CHARS:
+                    chave = _chave_linha(linha)
+                    if chave in linhas_vistas:
+                        relatorio["linhas_duplicadas"] += 1
+                        continue
+                    linhas_vistas.add(chave)
+                unicas.append(linha)
+
+            if not unicas:
+                continue
+
+            pagina = _Pagina(arquivo=nome, numero=numero, linhas=unicas)
+            _classificar(pagina)
+            for secao in pagina.secoes:
+                relatorio["secoes"][secao] += 1
+            paginas.append(pagina)
+
+    paginas = _aplicar_orcamento(paginas, orcamento, relatorio)
+
+    por_arquivo: Dict[str, List[str]] = {}
+    for pagina in paginas:
+        por_arquivo.setdefault(pagina.arquivo, []).append(pagina.texto)
+    resultado = [
+        (nome, "\n".join(por_arquivo[nome]))
+        for nome, _ in arquivos
+        if nome in por_arquivo
+    ]
+
+    tokens_finais = contar_tokens("\n".join(texto for _, texto in resultado))
+    relatorio["tokens_finais"] = tokens_finais
+    relatorio["reducao_pct"] = (
+        round(100 * (1 - tokens_finais / relatorio["tokens_originais"]), 1)
+        if relatorio["tokens_originais"]
+        else 0.0
+    )
+    return TextoPreparado(
+        arquivos=resultado,
+        relatorio=relatorio,
+        paginas=[
+            PaginaPreparada(p.arquivo, p.numero, p.texto, tuple(sorted(p.secoes)))
+            for p in paginas
+        ],
+    )
+
+
+def _aplicar_orcamento(
+    paginas: List[_Pagina], orcamento: int, relatorio: Dict[str, Any]
+) -> List[_Pagina]:
+    tokens = [contar_tokens(p.texto) for p in paginas]
+    total = sum(tokens)
+    if total <= orcamento:
+        return paginas
+
+    # Primeiro saem as páginas sem seção relevante, de trás para frente
+    manter = [True] * len(paginas)
+    for i in reversed(range(len(paginas))):
+        if total <= orcamento:
+            break
+        if not paginas[i].secoes:
+            manter[i] = False
+            total -= tokens[i]
+            relatorio["paginas_cortadas_orcamento"] += 1
+
+    restantes = [p for p, m in zip(paginas, manter) if m]
+    if total <= orcamento:
+        return restantes
+
+    # Ainda acima: corta o fim do texto, linha a linha
+    relatorio["truncado"] = True
+    cortadas: List[_Pagina] = []
+    usado = 0
+    for pagina in restantes:
+        linhas: List[str] = []
+        for linha in pagina.linhas:
+            custo = contar_tokens(linha) + 1
+            if usado + custo > orcamento:
+                break
+            linhas.append(linha)
+            usado += custo
+        if linhas:
+            cortadas.append(_Pagina(pagina.arquivo, pagina.numero, linhas, pagina.secoes))
+        if usado >= orcamento or len(linhas) < len(pagina.linhas):
+            break
+    return cortadas
@@ -0,0 +1,209 @@
+"""
+Leitura de texto de PDFs em paralelo, por arquivo e por página.
+
+O PyPDF2 é puro Python e não libera o GIL, então a leitura vai para um pool
+de processos compartilhado. Cada PDF é aberto uma vez só:
+
+- Trip com vários arquivos: cada worker recebe um arquivo inteiro, e a trip
+  leva mais ou menos o tempo do maior arquivo.
+- Um arquivo só: o PdfReader aberto para contar as páginas é reaproveitado
+  para ler a primeira faixa aqui mesmo, e o resto vai para os workers em
+  faixas grandes (uma por worker, de pelo menos PDF_PAGES_PER_TASK páginas).
+
+A ordem original das páginas é sempre preservada.
+
+Arquivos já lidos antes vêm do cache em disco (pdf_text_cache) e nem
+chegam ao pool.
+
+O pool é criado na primeira leitura, de dentro das threads de extração;
+por isso os workers saem de um forkserver (ou spawn, onde não houver), e
+não de um fork do servidor com várias threads rodando.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import PyPDF2
+
+import pdf_text_cache
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "4"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """Pool de processos criado sob demanda (None se o paralelismo estiver desligado)."""
+    global _pool
+    if PDF_WORKERS <= 1:
+        return None
+
+    with _pool_lock:
+        if _pool is None:
+            metodo = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context(metodo)
+            )
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _extrair_faixa(pdf_path: str, inicio: int, fim: int) -> List[str]:
+    """Extrai o texto das páginas [inicio, fim) de um PDF (roda no worker)."""
+    reader = PyPDF2.PdfReader(pdf_path)
+    return [reader.pages[i].extract_text() or "" for i in range(inicio, fim)]
+
+
+def _extrair_arquivo(pdf_path: str) -> List[str]:
+    """Extrai o texto de todas as páginas de um PDF (roda no worker)."""
+    reader = PyPDF2.PdfReader(pdf_path)
+    return [pagina.extract_text() or "" for pagina in reader.pages]
+
+
+def _faixas(total: int, partes: int) -> List[Tuple[int, int]]:
+    """Divide as páginas em até `partes` faixas de pelo menos PDF_PAGES_PER_TASK."""
+    passo = max(1, PDF_PAGES_PER_TASK, -(-total // max(1, partes)))
+    return [(i, min(i + passo, total)) for i in range(0, total, passo)]
+
+
+def read_pdfs_pages(pdf_paths: Sequence[Path]) -> Dict[Path, List[str]]:
+    """
+    Lê vários PDFs de uma vez e devolve {caminho: [texto de cada página]}.
+
+    Arquivos ilegíveis aparecem com lista vazia, como o read_pdf_text antigo
+    que devolvia "" em caso de erro.
+    """
+    resultado: Dict[Path, List[str]] = {}
+    hashes: Dict[Path, str] = {}
+    pendentes: List[Path] = []
+
+    for pdf_path in pdf_paths:
+        sha256 = pdf_text_cache.hash_pdf(pdf_path)
+        paginas = pdf_text_cache.buscar(sha256) if sha256 else None
+        if paginas is not None:
+            resultado[pdf_path] = paginas
+            continue
+        if sha256:
+            hashes[pdf_path] = sha256
+        pendentes.append(pdf_path)
+
+    for pdf_path, paginas in _ler_sem_cache(pendentes).items():
+        resultado[pdf_path] = paginas
+        if paginas and pdf_path in hashes:
+            pdf_text_cache.salvar(hashes[pdf_path], paginas)
+
+    return resultado
+
+
+def _ler_sem_cache(pdf_paths: Sequence[Path]) -> Dict[Path, List[str]]:
+    if len(pdf_paths) == 1:
+        return {pdf_paths[0]: _ler_um_arquivo(pdf_paths[0])}
+
+    resultado: Dict[Path, List[str]] = {}
+    futures: Dict[Path, Future] = {}
+    pool = _get_pool() if pdf_paths else None
+
+    if pool is not None:
+        try:
+            for pdf_path in pdf_paths:
+                futures[pdf_path] = pool.submit(_extrair_arquivo, str(pdf_path))
+        except Exception as e:
+            # Pool quebrado (ex.: worker morto pelo SO): recria na próxima e segue serial
+            print(f"⚠️ Pool de PDF indisponível, lendo em série: {e}")
+            _reset_pool()
+
+    for pdf_path in pdf_paths:
+        future = futures.get(pdf_path)
+        if future is not None:
+            try:
+                resultado[pdf_path] = future.result()
+                continue
+            except BrokenProcessPool as e:
+                # Cai na leitura em série logo abaixo
+                print(f"⚠️ Pool de PDF quebrou, lendo {pdf_path.name} em série: {e}")
+                _reset_pool()
+            except Exception as e:
+                print(f"Erro ao ler PDF {pdf_path}: {e}")
+                resultado[pdf_path] = []
+                continue
+
+        try:
+            resultado[pdf_path] = _extrair_arquivo(str(pdf_path))
+        except Exception as e:
+            print(f"Erro ao ler PDF {pdf_path}: {e}")
+            resultado[pdf_path] = []
+
+    return resultado
+
+
+def _ler_um_arquivo(pdf_path: Path) -> List[str]:
+    """
+    Lê um PDF sozinho: a primeira faixa sai do mesmo PdfReader que contou as
+    páginas, e as demais vão para os workers.
+    """
+    try:
+        reader = PyPDF2.PdfReader(str(pdf_path))
+        total = len(reader.pages)
+    except Exception as e:
+        print(f"Erro ao ler PDF {pdf_path}: {e}")
+        return []
+
+    faixas = _faixas(total, PDF_WORKERS)
+    pool = _get_pool() if len(faixas) > 1 else None
+    futures: List[Future] = []
+
+    if pool is not None:
+        try:
+            futures = [
+                pool.submit(_extrair_faixa, str(pdf_path), inicio, fim)
+                for inicio, fim in faixas[1:]
+            ]
+        except Exception as e:
+            print(f"⚠️ Pool de PDF indisponível, lendo em série: {e}")
+            _reset_pool()
+            futures = []
+
+    try:
+        if not futures:
+            return [pagina.extract_text() or "" for pagina in reader.pages]
+
+        primeira_inicio, primeira_fim = faixas[0]
+        paginas = [
+            reader.pages[i].extract_text() or ""
+            for i in range(primeira_inicio, primeira_fim)
+        ]
+        for (inicio, fim), future in zip(faixas[1:], futures):
+            try:
+                paginas.extend(future.result())
+            except BrokenProcessPool as e:
+                print(f"⚠️ Pool de PDF quebrou, lendo {pdf_path.name} em série: {e}")
+                _reset_pool()
+                paginas.extend(reader.pages[i].extract_text() or "" for i in range(inicio, fim))
+        return paginas
+    except Exception as e:
+        print(f"Erro ao ler PDF {pdf_path}: {e}")
+        return []
+
+
+def read_pdf_pages(pdf_path: Path) -> List[str]:
+    """Texto de cada página de um PDF, na ordem original."""
+    return read_pdfs_pages([pdf_path])[pdf_path]
+
+
+def juntar_paginas(paginas: List[str]) -> str:
+    """Junta as páginas uma única vez, no mesmo formato do read_pdf_text original."""
+    return "".join(f"{pagina}\n" for pagina in paginas)
@@ -0,0 +1,135 @@
+"""
+Cache persistente do texto extraído de PDFs.
+
+Cada PDF lido tem as páginas salvas em uploads/_pdf_text/, indexadas pelo
+SHA-256 do arquivo e pela versão do parser. Reextrações, testes de prompt e
+reprocessamentos em lote não passam de novo pelo PyPDF2.
+
+Uso na linha de comando:
+    python pdf_text_cache.py stats
+    python pdf_text_cache.py invalidar [--versao VERSAO | --todas]
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import PyPDF2
+
+from upload_store import UPLOADS_DIR, hash_arquivo, salvar_json_atomico
+
+PDF_TEXT_CACHE_DIR = UPLOADS_DIR / "_pdf_text"
+
+# Incrementar o sufixo quando a forma de extrair/limpar o texto mudar
+PARSER_VERSION = f"pypdf2-{PyPDF2.__version__}-1"
+
+_stats: Dict[str, int] = {"hits": 0, "misses": 0, "writes": 0, "errors": 0}
+_stats_lock = threading.Lock()
+
+
+def _contar(chave: str) -> None:
+    with _stats_lock:
+        _stats[chave] += 1
+
+
+def stats() -> Dict[str, int]:
+    """Contadores do processo atual (hits, misses, writes, errors)."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _caminho(sha256: str, versao: str = PARSER_VERSION) -> Path:
+    return PDF_TEXT_CACHE_DIR / sha256[:2] / f"{sha256}.{versao}.json"
+
+
+def buscar(sha256: str) -> Optional[List[str]]:
+    """Páginas em cache para o hash na versão atual do parser, ou None."""
+    cache_file = _caminho(sha256)
+    try:
+        with cache_file.open("r", encoding="utf-8") as f:
+            paginas = json.load(f)["paginas"]
+    except FileNotFoundError:
+        _contar("misses")
+        return None
+    except (OSError, KeyError, TypeError, json.JSONDecodeError) as e:
+        print(f"⚠️ Cache de texto corrompido ({cache_file.name}): {e}")
+        _contar("errors")
+        _contar("misses")
+        return None
+
+    _contar("hits")
+    return paginas
+
+
+def salvar(sha256: str, paginas: List[str]) -> None:
+    try:
+        salvar_json_atomico(
+            _caminho(sha256),
+            {"sha256": sha256, "parser": PARSER_VERSION, "paginas": paginas},
+        )
+        _contar("writes")
+    except OSError as e:
+        print(f"⚠️ Não foi possível salvar cache de texto {sha256[:12]}: {e}")
+        _contar("errors")
+
+
+def hash_pdf(pdf_path: Path) -> Optional[str]:
+    try:
+        return hash_arquivo(pdf_path)
+    except OSError:
+        return None
+
+
+def invalidar(versao: Optional[str] = None, todas: bool = False) -> int:
+    """
+    Remove entradas do cache e devolve quantas foram apagadas.
+
+    Sem argumentos apaga tudo que não é da versão atual do parser;
+    com `versao` apaga só aquela versão; com `todas` limpa o cache inteiro.
+    """
+    removidos = 0
+    for cache_file in PDF_TEXT_CACHE_DIR.glob("??/*.json"):
+        versao_arquivo = cache_file.name.split(".", 1)[1][: -len(".json")]
+
+        if todas:
+            apagar = True
+        elif versao is not None:
+            apagar = versao_arquivo == versao
+        else:
+            apagar = versao_arquivo != PARSER_VERSION
+
+        if apagar:
+            cache_file.unlink(missing_ok=True)
+            removidos += 1
+
+    return removidos
+
+
+def resumo_em_disco() -> Dict[str, int]:
+    """Quantidade de entradas em disco por versão do parser."""
+    por_versao: Dict[str, int] = {}
+    for cache_file in PDF_TEXT_CACHE_DIR.glob("??/*.json"):
+        versao_arquivo = cache_file.name.split(".", 1)[1][: -len(".json")]
+        por_versao[versao_arquivo] = por_versao.get(versao_arquivo, 0) + 1
+    return por_versao
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cache de texto dos PDFs")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("stats", help="Entradas em disco por versão do parser")
+    inv = sub.add_parser("invalidar", help="Remove entradas do cache")
+    inv.add_argument("--versao", help="Apaga apenas esta versão do parser")
+    inv.add_argument("--todas", action="store_true", help="Apaga o cache inteiro")
+    args = parser.parse_args()
+
+    if args.comando == "stats":
+        print(f"📄 Versão atual do parser: {PARSER_VERSION}")
+        for versao, total in sorted(resumo_em_disco().items()):
+            print(f"  {versao}: {total} arquivo(s)")
+    else:
+        total = invalidar(versao=args.versao, todas=args.todas)
+        print(f"🗑️ {total} entrada(s) removida(s)")
@@ -0,0 +1,262 @@
+"""
+Reextração em lote das trips de uploads/.
+
+Depois de mudar o prompt de extração ou o catálogo de landmarks, todas as
+trips (ou um filtro delas) precisam passar de novo pelo pipeline. Cada
+trip roda o mesmo main.run_extraction do POST /extract/{trip_id}, então o
+resultado vai para extracao/{trip_id}.json por escrita atômica e o índice
+de trips é atualizado.
+
+- concorrência limitada (--concorrencia trips ao mesmo tempo)
+- limite de chamadas ao LLM por minuto (--rpm, via llm_gateway), somando
+  todas as trips em andamento
+- checkpoint após cada trip: se o processo cair, rodar de novo retoma de
+  onde parou (as concluídas são puladas, as que falharam são repetidas)
+- resumo ao final com vazão, tempos e falhas
+
+Uso:
+    python reextrair.py                          # todas as trips
+    python reextrair.py trip_abc123 trip_def456  # só estas
+    python reextrair.py --padrao "trip_0*" --concorrencia 4 --rpm 60
+    python reextrair.py --sem-cache              # prompt mudou: ignora o cache de extrações
+    python reextrair.py --recomecar              # descarta o checkpoint anterior
+"""
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import fnmatch
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from upload_store import salvar_json_atomico
+
+BASE_DIR = Path(__file__).resolve().parent
+UPLOADS_DIR = BASE_DIR / "uploads"
+EXTRACAO_DIR = BASE_DIR / "extracao"
+CHECKPOINT_PATH = BASE_DIR / "cache" / "reextracao.json"
+
+
+class Checkpoint:
+    """Trips concluídas e falhas do lote, regravadas a cada trip."""
+
+    def __init__(self, caminho: Path, recomecar: bool = False) -> None:
+        self.caminho = caminho
+        self._lock = threading.Lock()
+
+        dados: Dict[str, Any] = {}
+        if not recomecar:
+            try:
+                with caminho.open("r", encoding="utf-8") as f:
+                    dados = json.load(f)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Checkpoint ilegível ({caminho.name}), começando do zero: {e}")
+
+        self.iniciado_em: str = dados.get("iniciado_em") or datetime.now().isoformat(timespec="seconds")
+        self.concluidas: Dict[str, Dict[str, Any]] = dados.get("concluidas") or {}
+        self.falhas: Dict[str, str] = dados.get("falhas") or {}
+
+    def _salvar(self) -> None:
+        salvar_json_atomico(
+            self.caminho,
+            {
+                "iniciado_em": self.iniciado_em,
+                "atualizado_em": datetime.now().isoformat(timespec="seconds"),
+                "concluidas": self.concluidas,
+                "falhas": self.falhas,
+            },
+        )
+
+    def concluir(self, trip_id: str, segundos: float, resultado: Dict[str, Any]) -> None:
+        with self._lock:
+            self.concluidas[trip_id] = {
+                "segundos": round(segundos, 2),
+                "cache": bool(resultado.get("cache")),
+                "em": datetime.now().isoformat(timespec="seconds"),
+            }
+            self.falhas.pop(trip_id, None)
+            self._salvar()
+
+    def falhar(self, trip_id: str, erro: str) -> None:
+        with self._lock:
+            self.falhas[trip_id] = erro
+            self._salvar()
+
+
+def listar_trips(
+    trip_ids: List[str],
+    padrao: Optional[str] = None,
+    sem_extracao: bool = False,
+) -> List[str]:
+    """Pastas trip_* de uploads/ com PDF, em ordem, com os filtros aplicados."""
+    trips = sorted(
+        pasta.name
+        for pasta in UPLOADS_DIR.glob("trip_*")
+        if pasta.is_dir() and any(p.suffix.lower() == ".pdf" for p in pasta.iterdir())
+    )
+    if trip_ids:
+        desconhecidas = sorted(set(trip_ids) - set(trips))
+        if desconhecidas:
+            print(f"⚠️ Sem pasta com PDF em uploads/: {', '.join(desconhecidas)}")
+        trips = [t for t in trips if t in set(trip_ids)]
+    if padrao:
+        trips = [t for t in trips if fnmatch.fnmatch(t, padrao)]
+    if sem_extracao:
+        trips = [t for t in trips if not (EXTRACAO_DIR / f"{t}.json").exists()]
+    return trips
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(round((len(ordenados) - 1) * p / 100)))]
+
+
+def reextrair(args: argparse.Namespace) -> int:
+    """Roda o lote e devolve o código de saída (1 se alguma trip falhou)."""
+    # Só depois do LLM_CACHE_MODE definido em __main__
+    import llm_gateway
+    import main
+    from catalog_snapshot import snapshot as catalog_snapshot
+
+    trips = listar_trips(args.trips, args.padrao, args.sem_extracao)
+    checkpoint = Checkpoint(args.checkpoint, recomecar=args.recomecar)
+
+    puladas = [t for t in trips if t in checkpoint.concluidas]
+    pendentes = [t for t in trips if t not in checkpoint.concluidas]
+    if args.limite:
+        pendentes = pendentes[: args.limite]
+
+    if puladas:
+        print(
+            f"↩️ Retomando o lote de {checkpoint.iniciado_em}: {len(puladas)} trip(s) já "
+            f"concluída(s) (--recomecar para refazer tudo)"
+        )
+    if not pendentes:
+        print("✅ Nada a reextrair")
+        return 0
+
+    rpm = args.rpm if args.rpm is not None else llm_gateway.LLM_MAX_RPM
+    llm_gateway.definir_limite_rpm(rpm)
+    if not llm_gateway.disponivel():
+        print("❌ OPENAI_API_KEY não configurada")
+        return 1
+
+    # Um snapshot do catálogo para o lote todo, em vez de uma consulta por cidade
+    catalog_snapshot.recarregar()
+
+    print(
+        f"🔁 Reextraindo {len(pendentes)} trip(s), concorrência {args.concorrencia}, "
+        f"{f'{rpm:g} chamadas/min ao LLM' if rpm else 'sem limite de taxa'}"
+        f"{', sem cache de extrações' if args.sem_cache else ''}"
+    )
+
+    tempos: List[float] = []
+    reaproveitadas = 0
+    falhas: Dict[str, str] = {}
+    inicio_lote = time.monotonic()
+
+    def processar(trip_id: str) -> Dict[str, Any]:
+        inicio = time.monotonic()
+        resultado = main.run_extraction(
+            trip_id, on_stage=lambda etapa: None, usar_cache=not args.sem_cache
+        )
+        resultado["segundos"] = time.monotonic() - inicio
+        return resultado
+
+    executor = ThreadPoolExecutor(max_workers=max(1, args.concorrencia), thread_name_prefix="reextrair")
+    futuros = {executor.submit(processar, trip_id): trip_id for trip_id in pendentes}
+    try:
+        for n, futuro in enumerate(as_completed(futuros), 1):
+            trip_id = futuros[futuro]
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                erro = f"{e.__class__.__name__}: {e}"
+                falhas[trip_id] = erro
+                checkpoint.falhar(trip_id, erro)
+                print(f"❌ [{n}/{len(pendentes)}] {trip_id}: {erro}")
+                continue
+
+            if resultado.get("simulado"):
+                # Caiu nos dados simulados: a extração anterior ficou intacta
+                erro = "extração falhou (dados simulados), extração anterior mantida"
+                falhas[trip_id] = erro
+                checkpoint.falhar(trip_id, erro)
+                print(f"❌ [{n}/{len(pendentes)}] {trip_id}: {erro}")
+                continue
+
+            tempos.append(resultado["segundos"])
+            reaproveitadas += bool(resultado.get("cache"))
+            checkpoint.concluir(trip_id, resultado["segundos"], resultado)
+            print(f"✅ [{n}/{len(pendentes)}] {trip_id} em {resultado['segundos']:.1f}s")
+    except KeyboardInterrupt:
+        print("\n⏹️ Interrompido: esperando as trips em andamento; rode de novo para retomar")
+        executor.shutdown(wait=True, cancel_futures=True)
+        return 130
+    executor.shutdown(wait=True)
+
+    total_s = time.monotonic() - inicio_lote
+    stats_llm = llm_gateway.stats()
+    chamadas = sum(s["chamadas"] for s in stats_llm.values())
+    tokens = sum(s["prompt_tokens"] + s["completion_tokens"] for s in stats_llm.values())
+
+    print(f"\n📊 Lote concluído em {total_s:.1f}s")
+    print(
+        f"  {len(tempos)} ok ({reaproveitadas} do cache de extrações), {len(falhas)} falha(s), "
+        f"{len(puladas)} pulada(s) pelo checkpoint"
+    )
+    if tempos:
+        print(
+            f"  Vazão: {len(tempos) / total_s * 60:.1f} trip(s)/min | por trip: "
+            f"p50 {_percentil(tempos, 50):.1f}s, p95 {_percentil(tempos, 95):.1f}s, "
+            f"máx {max(tempos):.1f}s"
+        )
+    print(f"  LLM: {chamadas} chamada(s), {tokens} tokens")
+    if falhas:
+        print("  Falhas (repetidas na próxima execução):")
+        for trip_id, erro in sorted(falhas.items()):
+            print(f"    - {trip_id}: {erro}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reextração em lote das trips de uploads/")
+    parser.add_argument("trips", nargs="*", help="trip_ids (padrão: todas)")
+    parser.add_argument("--padrao", help='Filtro por nome, ex.: "trip_0*"')
+    parser.add_argument("--sem-extracao", action="store_true", help="Só trips sem extracao/{trip_id}.json")
+    parser.add_argument("--limite", type=int, default=0, help="No máximo N trips nesta execução")
+    parser.add_argument(
+        "--concorrencia",
+        type=int,
+        default=int(os.getenv("EXTRACTION_WORKERS", "2")),
+        help="Trips extraídas ao mesmo tempo",
+    )
+    parser.add_argument("--rpm", type=float, help="Chamadas ao LLM por minuto (padrão LLM_MAX_RPM)")
+    parser.add_argument("--sem-cache", action="store_true", help="Ignora o cache de extrações por PDF")
+    parser.add_argument(
+        "--sem-cache-llm",
+        action="store_true",
+        help="Chama o LLM mesmo com a resposta em cache (e regrava o cache)",
+    )
+    parser.add_argument("--checkpoint", type=Path, default=CHECKPOINT_PATH, help="Arquivo de progresso")
+    parser.add_argument("--recomecar", action="store_true", help="Descarta o checkpoint e refaz tudo")
+    args = parser.parse_args()
+
+    if args.sem_cache_llm:
+        # Antes de qualquer import de llm_cache
+        os.environ["LLM_CACHE_MODE"] = "record"
+
+    sys.exit(reextrair(args))
@@ -0,0 +1,111 @@
+"""
+Execução de etapas como um pequeno grafo de dependências.
+
+Cada etapa declara de quais outras depende; assim que todas as dependências
+terminam ela entra no pool, então etapas independentes rodam ao mesmo tempo
+e o tempo total fica no caminho crítico, não na soma das etapas.
+
+Se uma etapa falha, as que dependem dela não rodam e o erro é relançado
+depois que as etapas já em andamento terminam.
+"""
+
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class Etapa:
+    nome: str
+    func: Callable[[], Any]
+    depende_de: Tuple[str, ...] = ()
+
+
+@dataclass
+class ResultadoGrafo:
+    resultados: Dict[str, Any]
+    # Segundos desde o início do grafo: (início, fim) de cada etapa
+    tempos: Dict[str, Tuple[float, float]]
+    total_s: float
+
+
+def executar(
+    etapas: List[Etapa],
+    on_stage: Optional[Callable[[str], None]] = None,
+    max_workers: Optional[int] = None,
+) -> ResultadoGrafo:
+    """
+    Roda as etapas respeitando as dependências.
+
+    Args:
+        etapas: Etapas do grafo (nomes únicos, sem ciclos)
+        on_stage: Callback chamado quando cada etapa começa
+        max_workers: Etapas simultâneas (padrão: todas as etapas)
+
+    Raises:
+        ValueError: dependência desconhecida ou ciclo
+        Exception: o primeiro erro de uma etapa
+    """
+    por_nome = {e.nome: e for e in etapas}
+    for etapa in etapas:
+        for dep in etapa.depende_de:
+            if dep not in por_nome:
+                raise ValueError(f"Etapa '{etapa.nome}' depende de '{dep}', que não existe")
+
+    inicio = time.monotonic()
+    resultados: Dict[str, Any] = {}
+    tempos: Dict[str, Tuple[float, float]] = {}
+    pendentes = dict(por_nome)
+    rodando: Dict[Future, str] = {}
+    erro: Optional[BaseException] = None
+
+    def rodar(etapa: Etapa) -> Any:
+        comeco = time.monotonic() - inicio
+        if on_stage:
+            on_stage(etapa.nome)
+        try:
+            return etapa.func()
+        finally:
+            tempos[etapa.nome] = (comeco, time.monotonic() - inicio)
+
+    with ThreadPoolExecutor(
+        max_workers=max_workers or max(1, len(etapas)),
+        thread_name_prefix="etapa",
+    ) as executor:
+        while pendentes or rodando:
+            if erro is None:
+                prontas = [
+                    e for e in pendentes.values()
+                    if all(dep in resultados for dep in e.depende_de)
+                ]
+                for etapa in prontas:
+                    del pendentes[etapa.nome]
+                    # Cada etapa herda o contexto de quem chamou (registro de métricas da trip)
+                    rodando[
+                        executor.submit(contextvars.copy_context().run, rodar, etapa)
+                    ] = etapa.nome
+
+            if not rodando:
+                if pendentes and erro is None:
+                    raise ValueError(f"Ciclo entre as etapas: {', '.join(pendentes)}")
+                break
+
+            feitas, _ = wait(rodando, return_when=FIRST_COMPLETED)
+            for future in feitas:
+                nome = rodando.pop(future)
+                try:
+                    resultados[nome] = future.result()
+                except Exception as e:
+                    if erro is None:
+                        erro = e
+
+    if erro is not None:
+        raise erro
+
+    return ResultadoGrafo(
+        resultados=resultados,
+        tempos=tempos,
+        total_s=time.monotonic() - inicio,
+    )
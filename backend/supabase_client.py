@@ -0,0 +1,196 @@
+"""
+Cliente Supabase único do processo.
+
+image_search, supabase_images e catalog_snapshot usam a mesma instância
+(e o mesmo pool de conexões) em vez de cada módulo criar a sua no import.
+A leitura prefere a chave anon; supabase_images, que grava no catálogo
+(curar_fotos.py), usa get_supabase_escrita com SUPABASE_KEY, para a
+escrita não cair na chave anon (e no RLS) quando as duas existem.
+
+Para o event loop (leitura de trips e enriquecimento de imagens) há um
+cliente PostgREST assíncrono em httpx, um por event loop, com pool limitado
+a SUPABASE_MAX_CONEXOES e prazo de SUPABASE_TIMEOUT_S por consulta:
+esperar o Supabase não prende nenhuma thread do servidor.
+"""
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import asyncio
+import os
+import threading
+import weakref
+from typing import Any, Dict, List, Optional
+
+import httpx
+from supabase import create_client, Client
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = (
+    os.getenv("SUPABASE_ANON_KEY")
+    or os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    or os.getenv("SUPABASE_KEY")
+)
+SUPABASE_WRITE_KEY = os.getenv("SUPABASE_KEY") or SUPABASE_KEY
+
+SUPABASE_TIMEOUT_S = float(os.getenv("SUPABASE_TIMEOUT_S", "10"))
+SUPABASE_MAX_CONEXOES = int(os.getenv("SUPABASE_MAX_CONEXOES", "20"))
+
+_client: Optional[Client] = None
+_inicializado = False
+_client_escrita: Optional[Client] = None
+_escrita_inicializada = False
+_lock = threading.Lock()
+
+# Um cliente por event loop: o pool do httpx só serve ao loop em que abriu
+_clients_async: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+# usar_cliente trocou o cliente: as consultas assíncronas passam por ele
+_trocado = False
+
+
+def configurado() -> bool:
+    return bool(SUPABASE_URL and SUPABASE_KEY) or _client is not None
+
+
+def get_supabase() -> Optional[Client]:
+    """Cliente compartilhado, criado na primeira chamada (None se não configurado)."""
+    global _client, _inicializado
+
+    with _lock:
+        if _inicializado:
+            return _client
+        _inicializado = True
+
+        if not SUPABASE_URL or not SUPABASE_KEY:
+            print("ℹ️ Variáveis SUPABASE_URL ou SUPABASE_KEY não configuradas")
+            return None
+
+        try:
+            _client = create_client(SUPABASE_URL, SUPABASE_KEY)
+            print("✅ Conexão com Supabase inicializada")
+        except Exception as e:
+            print(f"⚠️ Erro ao conectar no Supabase: {e}")
+            _client = None
+
+        return _client
+
+
+def get_supabase_escrita() -> Optional[Client]:
+    """Cliente com a chave de escrita; o compartilhado se a chave for a mesma."""
+    global _client_escrita, _escrita_inicializada
+
+    if _trocado or SUPABASE_WRITE_KEY == SUPABASE_KEY:
+        return get_supabase()
+
+    with _lock:
+        if _escrita_inicializada:
+            return _client_escrita
+        _escrita_inicializada = True
+
+        if not SUPABASE_URL:
+            return None
+
+        try:
+            _client_escrita = create_client(SUPABASE_URL, SUPABASE_WRITE_KEY)
+        except Exception as e:
+            print(f"⚠️ Erro ao conectar no Supabase (escrita): {e}")
+            _client_escrita = None
+
+        return _client_escrita
+
+
+def usar_cliente(client: Any) -> None:
+    """
+    Troca o cliente do processo (ex.: o Supabase local do benchmark).
+    Precisa vir antes do import de image_search e supabase_images, que
+    guardam o cliente no import.
+    """
+    global _client, _inicializado, _trocado
+
+    with _lock:
+        _client = client
+        _inicializado = True
+        _trocado = True
+
+
+def get_postgrest_async() -> Optional[httpx.AsyncClient]:
+    """Cliente httpx do PostgREST (/rest/v1) do loop atual, criado na primeira chamada."""
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        return None
+
+    loop = asyncio.get_running_loop()
+    client = _clients_async.get(loop)
+    # Sem await entre o teste e a atribuição: o event loop não intercala aqui
+    if client is None or client.is_closed:
+        client = _clients_async[loop] = httpx.AsyncClient(
+            base_url=f"{SUPABASE_URL.rstrip('/')}/rest/v1",
+            headers={
+                "apikey": SUPABASE_KEY,
+                "Authorization": f"Bearer {SUPABASE_KEY}",
+            },
+            timeout=httpx.Timeout(SUPABASE_TIMEOUT_S),
+            limits=httpx.Limits(
+                max_connections=SUPABASE_MAX_CONEXOES,
+                max_keepalive_connections=SUPABASE_MAX_CONEXOES,
+            ),
+        )
+    return client
+
+
+def _selecionar_sync(
+    client: Any,
+    tabela: str,
+    colunas: str,
+    igual: Optional[Dict[str, Any]],
+    inicio: Optional[int],
+    fim: Optional[int],
+) -> List[dict]:
+    consulta = client.table(tabela).select(colunas)
+    for coluna, valor in (igual or {}).items():
+        consulta = consulta.eq(coluna, valor)
+    if inicio is not None and fim is not None:
+        consulta = consulta.range(inicio, fim)
+    return consulta.execute().data or []
+
+
+async def selecionar(
+    tabela: str,
+    colunas: str = "*",
+    igual: Optional[Dict[str, Any]] = None,
+    inicio: Optional[int] = None,
+    fim: Optional[int] = None,
+) -> List[dict]:
+    """
+    SELECT pelo PostgREST: `igual` vira filtros eq; inicio/fim, o Range.
+
+    Com um cliente trocado por usar_cliente (Supabase local do benchmark),
+    a mesma consulta vai por ele, numa thread.
+
+    Raises:
+        RuntimeError: Supabase não configurado
+        httpx.HTTPError: erro HTTP ou prazo esgotado
+    """
+    client = None if _trocado else get_postgrest_async()
+    if client is None:
+        local = get_supabase()
+        if local is None:
+            raise RuntimeError("Supabase não configurado")
+        return await asyncio.to_thread(_selecionar_sync, local, tabela, colunas, igual, inicio, fim)
+
+    params = {"select": colunas.replace(" ", "")}
+    for coluna, valor in (igual or {}).items():
+        params[coluna] = f"eq.{valor}"
+    headers = {}
+    if inicio is not None and fim is not None:
+        headers = {"Range-Unit": "items", "Range": f"{inicio}-{fim}"}
+
+    resposta = await client.get(f"/{tabela}", params=params, headers=headers)
+    resposta.raise_for_status()
+    return resposta.json()
+
+
+async def fechar_async() -> None:
+    """Fecha o pool do cliente assíncrono deste loop (shutdown do servidor)."""
+    client = _clients_async.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -5,20 +5,13 @@ Módulo para gerenciar imagens de destinos no Supabase
 from dotenv import load_dotenv
 load_dotenv()
 
-import os
 from typing import Optional
-from supabase import create_client, Client
 
-# Inicializar cliente Supabase
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+from catalog_snapshot import snapshot
+from supabase_client import get_supabase_escrita
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    print("⚠️ SUPABASE_URL ou SUPABASE_KEY não configuradas")
-    supabase: Optional[Client] = None
-else:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    print("✅ Supabase conectado")
+# Grava no catálogo: cliente com a chave de escrita (SUPABASE_KEY)
+supabase = get_supabase_escrita()
 
 
 def buscar_imagem(city: str, landmark: str) -> Optional[str]:
@@ -32,6 +25,14 @@ def buscar_imagem(city: str, landmark: str) -> Optional[str]:
     Returns:
         URL da imagem ou None se não encontrar
     """
+    # Acerto exato no snapshot em memória: sem rede
+    img = snapshot.imagem(city, landmark)
+    if img:
+        print(f"💎 [SNAPSHOT] {city} - {landmark}")
+        return img['image_url']
+    if snapshot.pronto:
+        return None
+
     if not supabase:
         return None
     
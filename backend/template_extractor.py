@@ -0,0 +1,701 @@
+"""
+Extração determinística para layouts de cotação conhecidos.
+
+A maior parte dos uploads sai do mesmo modelo de cotação da operadora, com
+voos, hotel, passeios e total sempre no mesmo lugar. Para esses layouts as
+regras abaixo montam o mesmo JSON de extract_travel_data direto do texto
+do PDF, em milissegundos.
+
+A exceção comum é a cidade do hotel: a cotação traz só rua e número, e a
+cidade do aeroporto nem sempre é a do hotel (POA → Gramado). Sem traslado
+ou nome que confirme a cidade, ela fica incerta e a maioria das cotações
+ainda passa por completar_lacunas, uma chamada ao LLM com resposta curta
+(mas com o texto inteiro na entrada).
+
+Cada template registrado (@template) diz se reconhece o texto e devolve os
+dados com uma confiança de 0 a 1 por campo. Os caminhos dos campos são
+"voos", "periodo", "hoteis.0.cidade" etc. Campos abaixo de
+TEMPLATE_CONFIANCA_MIN ficam para o LLM completar (completar_lacunas);
+se nenhum template reconhece um dos arquivos, a extração vai inteira para
+o LLM, como antes.
+"""
+
+import copy
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from chunked_extraction import juntar_valores
+from texto import normalizar
+
+TEMPLATE_CONFIANCA_MIN = float(os.getenv("TEMPLATE_CONFIANCA_MIN", "0.9"))
+
+MESES = {
+    "jan": 1, "fev": 2, "mar": 3, "abr": 4, "mai": 5, "jun": 6,
+    "jul": 7, "ago": 8, "set": 9, "out": 10, "nov": 11, "dez": 12,
+}
+MESES_EXTENSO = {
+    "janeiro": 1, "fevereiro": 2, "marco": 3, "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+}
+
+REGIMES = re.compile(
+    r"^(s[oó] hospedagem|caf[eé] da manh[aã].*|meia pens[aã]o|pens[aã]o completa|"
+    r"tudo inclu[ií]do|all inclusive|sem alimenta[cç][aã]o)$",
+    re.IGNORECASE,
+)
+
+# Palavras que deixam o nome do passeio pela metade no fim da linha
+CONECTORES = {
+    "e", "y", "de", "del", "da", "do", "das", "dos", "com", "em", "a", "ao",
+    "as", "por", "para", "la", "los", "las", "el", "san", "santa", "-",
+}
+
+_HORA = re.compile(r"^(\d{1,2}:\d{2})(.*)$")
+_IATA = re.compile(r"^[A-Z]{3}$")
+# "Sex. 30 jan. 2026"
+_DATA_COMPLETA = re.compile(r"(\d{1,2}) ([A-Za-zç]{3})\.? (\d{4})")
+# "2h 55mSex.. 30 Jan." (data do trecho, sem ano)
+_DATA_TRECHO = re.compile(r"(\d{1,2}) ([A-Za-zç]{3})\.\s*$")
+
+
+@dataclass
+class ExtracaoTemplate:
+    template: str
+    dados: Dict[str, Any]
+    # Caminho do campo → confiança (0 a 1)
+    confianca: Dict[str, float]
+    tempo_ms: float = 0.0
+    completados_llm: List[str] = field(default_factory=list)
+
+    def incertos(self, minimo: Optional[float] = None) -> List[str]:
+        limite = TEMPLATE_CONFIANCA_MIN if minimo is None else minimo
+        return [c for c, v in self.confianca.items() if v < limite]
+
+    @property
+    def completa(self) -> bool:
+        return not self.incertos()
+
+    def relatorio(self) -> Dict[str, Any]:
+        return {
+            "nome": self.template,
+            "tempo_ms": round(self.tempo_ms, 2),
+            "confianca": dict(self.confianca),
+            "incertos": self.incertos(),
+        }
+
+
+@dataclass(frozen=True)
+class Template:
+    nome: str
+    reconhece: Callable[[str], bool]
+    extrair: Callable[[List[str]], Tuple[Dict[str, Any], Dict[str, float]]]
+
+
+TEMPLATES: List[Template] = []
+
+
+def template(nome: str, reconhece: Callable[[str], bool]):
+    """Registra um extrator de layout; a ordem de registro é a de tentativa."""
+
+    def registrar(func):
+        TEMPLATES.append(Template(nome=nome, reconhece=reconhece, extrair=func))
+        return func
+
+    return registrar
+
+
+# ---------------------------------------------------------------------------
+# Utilitários
+# ---------------------------------------------------------------------------
+
+
+def _linhas(texto: str) -> List[str]:
+    return [" ".join(l.split()) for l in texto.splitlines() if l.strip()]
+
+
+def _mes(nome: str) -> Optional[int]:
+    return MESES.get(normalizar(nome)[:3])
+
+
+def _data_completa(linha: str) -> Optional[date]:
+    m = _DATA_COMPLETA.search(linha)
+    if not m or not _mes(m.group(2)):
+        return None
+    try:
+        return date(int(m.group(3)), _mes(m.group(2)), int(m.group(1)))
+    except ValueError:
+        return None
+
+
+def _fmt(d: date) -> str:
+    return d.strftime("%d/%m/%Y")
+
+
+def _valor(texto: str) -> float:
+    """ "7.910" → 7910; "1.234,50" → 1234.5"""
+    numero = float(texto.replace(".", "").replace(",", "."))
+    return int(numero) if numero.is_integer() else numero
+
+
+def _separar_colado(linha: str) -> Tuple[str, bool]:
+    """
+    O PDF às vezes cola a linha seguinte sem espaço ("Pousada La SierraEm
+    voos combinados..."). Corta na primeira minúscula seguida de maiúscula.
+    """
+    m = re.search(r"(?<=[a-záéíóúâêôãõç)])(?=[A-ZÁÉÍÓÚ][a-záéíóúâêôãõç])", linha)
+    if not m:
+        return linha, False
+    return linha[: m.start()].strip(), True
+
+
+# ---------------------------------------------------------------------------
+# Cotação da operadora ("Detalhe da compra ... COTAÇÃO")
+# ---------------------------------------------------------------------------
+
+
+def _reconhece_cotacao(texto: str) -> bool:
+    return "Detalhe da compra" in texto and "COTAÇÃO" in texto and "TOTAL" in texto
+
+
+class _Anos:
+    """
+    Os trechos de voo trazem só dia e mês ("Sex.. 30 Jan."). O ano sai das
+    datas completas do próprio PDF ("Sex. 30 jan. 2026"); sem nenhuma para o
+    mês, vale a data da compra (virando o ano se o mês já passou).
+    """
+
+    def __init__(self, linhas: List[str]) -> None:
+        self.por_mes: Dict[int, int] = {}
+        for linha in linhas:
+            d = _data_completa(linha)
+            if d:
+                self.por_mes.setdefault(d.month, d.year)
+
+        self.compra: Optional[date] = None
+        for linha in linhas:
+            m = re.search(r"Detalhe da compra(\d{1,2}) de (\w+) de (\d{4})", linha)
+            if m and normalizar(m.group(2)) in MESES_EXTENSO:
+                self.compra = date(
+                    int(m.group(3)), MESES_EXTENSO[normalizar(m.group(2))], int(m.group(1))
+                )
+                break
+
+    def data(self, dia: int, mes: int) -> Tuple[Optional[date], bool]:
+        """(data, ano confirmado por uma data completa do PDF)"""
+        if mes in self.por_mes:
+            return date(self.por_mes[mes], mes, dia), True
+        if self.compra:
+            ano = self.compra.year + (1 if mes < self.compra.month else 0)
+            return date(ano, mes, dia), False
+        return None, False
+
+
+def _voos_cotacao(linhas: List[str], anos: _Anos) -> Tuple[List[Dict[str, Any]], float, List[dict]]:
+    # Cada trecho aparece de trás para frente: chegada (hora, código, cidade),
+    # "Duração", data do trecho, e só depois a saída
+    pontos = []
+    for i in range(len(linhas) - 2):
+        if re.fullmatch(r"\d{1,2}:\d{2}", linhas[i]) and _IATA.match(linhas[i + 1]):
+            pontos.append((i, linhas[i], linhas[i + 1], linhas[i + 2]))
+
+    confianca = 1.0
+    if len(pontos) % 2:
+        confianca = 0.5
+
+    trechos: List[dict] = []
+    for chegada, saida in zip(pontos[::2], pontos[1::2]):
+        entre = linhas[chegada[0] + 3 : saida[0]]
+        if not any("Duração" in l for l in entre):
+            confianca = min(confianca, 0.5)
+        data_trecho = None
+        for linha in entre:
+            m = _DATA_TRECHO.search(linha)
+            if m and _mes(m.group(2)):
+                data_trecho, confirmado = anos.data(int(m.group(1)), _mes(m.group(2)))
+                if not confirmado:
+                    confianca = min(confianca, 0.8)
+        if data_trecho is None:
+            confianca = min(confianca, 0.5)
+        trechos.append({
+            "data": data_trecho,
+            "saida": saida[1],
+            "chegada": chegada[1],
+            "origem": f"{saida[3]} ({saida[2]})",
+            "destino": f"{chegada[3]} ({chegada[2]})",
+            "cidade_chegada": chegada[3],
+            "cidade_saida": saida[3],
+        })
+
+    numeros = sum(len(re.findall(r"Voo [A-Z0-9]{2}\d{2,4}\b", l)) for l in linhas)
+    if numeros != len(trechos):
+        confianca = min(confianca, 0.7)
+
+    trechos.sort(key=lambda t: (t["data"] or date.min, t["saida"].zfill(5)))
+    voos = [
+        {
+            "origem": t["origem"],
+            "destino": t["destino"],
+            "data": _fmt(t["data"]) if t["data"] else "",
+            "horario_saida": t["saida"],
+            "horario_chegada": t["chegada"],
+        }
+        for t in trechos
+    ]
+    return voos, confianca, trechos
+
+
+def _cidade_do_hotel(
+    checkin: date,
+    checkout: date,
+    nome: str,
+    endereco: str,
+    trechos: List[dict],
+    traslados: List[str],
+) -> Tuple[str, float]:
+    """
+    Cidade do último voo que chega até o check-in. Confiança alta só com
+    evidência no próprio PDF (nome, endereço ou traslado na cidade); a
+    cidade do aeroporto nem sempre é a do hotel (POA → Gramado).
+    """
+    chegadas = [t for t in trechos if t["data"] and t["data"] <= checkin]
+    if not chegadas:
+        return "", 0.0
+    cidade = chegadas[-1]["cidade_chegada"]
+
+    alvo = normalizar(cidade)
+    if alvo in normalizar(f"{nome} {endereco}") or alvo in {normalizar(t) for t in traslados}:
+        return cidade, 0.95
+
+    sai_da_cidade = any(
+        t["data"] == checkout and t["cidade_saida"] == cidade for t in trechos
+    )
+    return cidade, 0.8 if sai_da_cidade else 0.5
+
+
+def _hoteis_cotacao(
+    linhas: List[str], trechos: List[dict]
+) -> Tuple[List[Dict[str, Any]], Dict[str, float], List[Tuple[date, date]]]:
+    traslados = [
+        m.group(1).strip()
+        for l in linhas
+        for m in [re.search(r"Traslado .*? em ([^:]+):", l)]
+        if m
+    ]
+
+    hoteis: List[Dict[str, Any]] = []
+    confianca: Dict[str, float] = {}
+    estadias: List[Tuple[date, date]] = []
+
+    for j, linha in enumerate(linhas):
+        m = re.search(r"(\d+) noites?,.*Check out$", linha)
+        if not m or j + 5 >= len(linhas):
+            continue
+
+        checkout = _data_completa(linhas[j + 1])
+        checkin = _data_completa(linhas[j + 3])
+        hora_endereco = _HORA.match(linhas[j + 4])
+        if not checkin or not checkout or not hora_endereco or "Check in" not in linhas[j + 2]:
+            continue
+
+        noites = int(m.group(1))
+        endereco = hora_endereco.group(2).strip()
+        nome, colado = _separar_colado(linhas[j + 5])
+
+        regime, conf_regime = "", 0.3
+        for anterior in reversed(linhas[max(0, j - 8) : j]):
+            if REGIMES.match(anterior):
+                regime, conf_regime = anterior, 0.95
+                break
+
+        cidade, conf_cidade = _cidade_do_hotel(
+            checkin, checkout, nome, endereco, trechos, traslados
+        )
+
+        n = len(hoteis)
+        conf_datas = 1.0 if (checkout - checkin).days == noites else 0.6
+        confianca.update({
+            f"hoteis.{n}.cidade": conf_cidade,
+            f"hoteis.{n}.nome": 0.8 if colado else 0.95,
+            f"hoteis.{n}.noites": conf_datas,
+            f"hoteis.{n}.checkin": conf_datas,
+            f"hoteis.{n}.checkout": conf_datas,
+            f"hoteis.{n}.regime": conf_regime,
+        })
+        hoteis.append({
+            "cidade": cidade,
+            "nome": nome,
+            "noites": noites,
+            "checkin": _fmt(checkin),
+            "checkout": _fmt(checkout),
+            "regime": regime,
+        })
+        estadias.append((checkin, checkout))
+
+    return hoteis, confianca, estadias
+
+
+def _nome_passeio(linhas: List[str]) -> Tuple[str, bool]:
+    """Junta a continuação do nome quando a linha termina num conector."""
+    if not linhas:
+        return "", False
+    nome, colado = _separar_colado(linhas[0])
+    usadas = 1
+    while not colado and usadas < len(linhas) and usadas < 3:
+        ultima = normalizar(nome.split()[-1]) if nome.split() else ""
+        aberto = nome.count("(") > nome.count(")")
+        if ultima not in CONECTORES and not nome.endswith(",") and not aberto:
+            break
+        continuacao, colado = _separar_colado(linhas[usadas])
+        nome = f"{nome} {continuacao}"
+        usadas += 1
+
+    # "(saída do hotel)", "(a maior piscina da América Latina)"
+    nome = re.sub(r"\s*\([^()]*\)\s*$", "", nome).strip()
+    ultima = normalizar(nome.split()[-1]) if nome.split() else ""
+    inteiro = bool(nome) and ultima not in CONECTORES and nome.count("(") == nome.count(")")
+    return nome, inteiro
+
+
+def _passeios_cotacao(linhas: List[str]) -> Tuple[List[Dict[str, Any]], float]:
+    passeios: List[Dict[str, Any]] = []
+    confianca = 0.95
+    for i, linha in enumerate(linhas):
+        if not linha.endswith("Data e horário") or i + 3 >= len(linhas):
+            continue
+        if not _data_completa(linhas[i + 1]) or not re.fullmatch(r"\d{1,2}:\d{2}", linhas[i + 2]):
+            confianca = min(confianca, 0.6)
+            continue
+        nome, inteiro = _nome_passeio(linhas[i + 3 : i + 6])
+        if not inteiro:
+            confianca = min(confianca, 0.6)
+        if nome and all(p["nome"] != nome for p in passeios):
+            passeios.append({"nome": nome, "valor_por_pessoa": 0, "incluido": True})
+    return passeios, confianca
+
+
+def _periodo(voos: List[dict], estadias: List[Tuple[date, date]]) -> Tuple[Dict[str, str], float]:
+    datas = [d for d, _ in estadias] + [d for _, d in estadias]
+    for voo in voos:
+        try:
+            dia, mes, ano = (int(p) for p in voo["data"].split("/"))
+            datas.append(date(ano, mes, dia))
+        except (ValueError, KeyError):
+            continue
+    if not datas:
+        return {"inicio": "", "fim": ""}, 0.0
+    return {"inicio": _fmt(min(datas)), "fim": _fmt(max(datas))}, 1.0
+
+
+def _descricao_pacote(voos: list, hoteis: list) -> str:
+    partes = (["Aéreo"] if voos else []) + (["Hotel"] if hoteis else [])
+    return " + ".join(partes) or "Pacote"
+
+
+@template("cotacao_operadora", _reconhece_cotacao)
+def extrair_cotacao(linhas: List[str]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    anos = _Anos(linhas)
+    voos, conf_voos, trechos = _voos_cotacao(linhas, anos)
+    hoteis, conf_hoteis, estadias = _hoteis_cotacao(linhas, trechos)
+    passeios, conf_passeios = _passeios_cotacao(linhas)
+    periodo, conf_periodo = _periodo(voos, estadias)
+
+    valor, conf_valor = 0, 0.3
+    for linha in linhas:
+        m = re.search(r"R\$\s*([\d.]+(?:,\d{2})?)\s+TOTAL", linha)
+        if m:
+            valor, conf_valor = _valor(m.group(1)), 0.95
+            break
+
+    confianca = {
+        "periodo": conf_periodo,
+        "voos": conf_voos if voos else 0.3,
+        "hoteis": 0.95 if hoteis else 0.3,
+        "passeios": conf_passeios,
+        "pacote_base": conf_valor,
+        **conf_hoteis,
+    }
+    dados = {
+        "periodo": periodo,
+        "voos": voos,
+        "hoteis": hoteis,
+        "passeios": passeios,
+        "pacote_base": {"descricao": _descricao_pacote(voos, hoteis), "valor": valor},
+    }
+    return dados, confianca
+
+
+# ---------------------------------------------------------------------------
+# Voucher de hotel ("Detalhes da reserva ... Check-in")
+# ---------------------------------------------------------------------------
+
+
+def _reconhece_voucher(texto: str) -> bool:
+    return "Detalhes da reserva" in texto and "Check-in" in texto and "Nº de reserva" in texto
+
+
+@template("voucher_hotel", _reconhece_voucher)
+def extrair_voucher(linhas: List[str]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    noites, checkin, checkout = 0, None, None
+    nome, cidade, regime = "", "", ""
+    conf_nome, conf_cidade, conf_regime = 0.3, 0.3, 0.3
+
+    for i, linha in enumerate(linhas):
+        m = re.search(r"(\d+) noites?;", linha)
+        if m:
+            noites = int(m.group(1))
+        if linha.endswith("Check-in"):
+            checkin = _data_completa(linha)
+        if linha.endswith("Check-out"):
+            checkout = _data_completa(linha)
+
+        # Nome do hotel, endereço e e-mail da hospedagem em sequência
+        if linha.startswith("E-mail: reservas") and i >= 2:
+            partes = [p.strip() for p in linhas[i - 1].split(",")]
+            if len(partes) >= 3:
+                cidade, conf_cidade = partes[-2], 0.9
+            # O nome vem colado no fim do parágrafo anterior ("...quartos.Rede Andrade LG Inn")
+            nome = re.split(r"[.!?]\s*", linhas[i - 2])[-1].strip()
+            conf_nome = 0.85 if nome and nome != linhas[i - 2] else 0.95
+
+        if re.fullmatch(r"Quarto \d+", linha) and i + 1 < len(linhas):
+            ultimo = linhas[i + 1].split(",")[-1].strip()
+            if REGIMES.match(ultimo):
+                regime, conf_regime = ultimo, 0.95
+
+    hoteis, confianca = [], {}
+    estadias: List[Tuple[date, date]] = []
+    if checkin and checkout:
+        conf_datas = 1.0 if (checkout - checkin).days == noites else 0.6
+        hoteis.append({
+            "cidade": cidade,
+            "nome": nome,
+            "noites": noites or (checkout - checkin).days,
+            "checkin": _fmt(checkin),
+            "checkout": _fmt(checkout),
+            "regime": regime,
+        })
+        estadias.append((checkin, checkout))
+        confianca.update({
+            "hoteis.0.cidade": conf_cidade,
+            "hoteis.0.nome": conf_nome,
+            "hoteis.0.noites": conf_datas,
+            "hoteis.0.checkin": conf_datas,
+            "hoteis.0.checkout": conf_datas,
+            "hoteis.0.regime": conf_regime,
+        })
+
+    periodo, conf_periodo = _periodo([], estadias)
+    confianca.update({
+        "periodo": conf_periodo,
+        "voos": 0.95,
+        "hoteis": 0.95 if hoteis else 0.3,
+        "passeios": 0.95,
+        # O voucher não traz o valor pago
+        "pacote_base": 0.3,
+    })
+    dados = {
+        "periodo": periodo,
+        "voos": [],
+        "hoteis": hoteis,
+        "passeios": [],
+        "pacote_base": {"descricao": "Hotel", "valor": 0},
+    }
+    return dados, confianca
+
+
+# ---------------------------------------------------------------------------
+# Entrada
+# ---------------------------------------------------------------------------
+
+
+def _juntar(partes: List[Tuple[Dict[str, Any], Dict[str, float]]]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Vários arquivos da mesma trip: listas concatenadas sem repetidos e o
+    valor do pacote pela regra de chunked_extraction.juntar_valores (sem
+    somar totais que discordam).
+    """
+    if len(partes) == 1:
+        return partes[0]
+
+    dados: Dict[str, Any] = {"voos": [], "hoteis": [], "passeios": []}
+    confianca: Dict[str, float] = {}
+    for parte, conf in partes:
+        # Índice de cada hotel desta parte na lista junta; repetidos ficam de fora
+        indices: Dict[str, int] = {}
+        for chave in ("voos", "hoteis", "passeios"):
+            for n, item in enumerate(parte[chave]):
+                if item not in dados[chave]:
+                    if chave == "hoteis":
+                        indices[str(n)] = len(dados["hoteis"])
+                    dados[chave].append(item)
+        for caminho, v in conf.items():
+            if caminho.startswith("hoteis."):
+                _, n, campo = caminho.split(".")
+                if n not in indices:
+                    continue
+                caminho = f"hoteis.{indices[n]}.{campo}"
+            confianca[caminho] = min(v, confianca.get(caminho, 1.0))
+
+    valor, incerto = juntar_valores(
+        [parte["pacote_base"]["valor"] for parte, _ in partes if parte["pacote_base"]["valor"]]
+    )
+    dados["voos"].sort(key=lambda v: (_chave_data(v["data"]), v["horario_saida"].zfill(5)))
+    dados["pacote_base"] = {
+        "descricao": _descricao_pacote(dados["voos"], dados["hoteis"]),
+        "valor": valor,
+        **({"valor_incerto": True} if incerto else {}),
+    }
+    datas = [_chave_data(p["periodo"][k]) for p, _ in partes for k in ("inicio", "fim")]
+    datas = [d for d in datas if d != date.min]
+    dados["periodo"] = (
+        {"inicio": _fmt(min(datas)), "fim": _fmt(max(datas))} if datas else {"inicio": "", "fim": ""}
+    )
+    if incerto:
+        # Arquivos com totais diferentes: o LLM confere qual vale
+        confianca["pacote_base"] = min(confianca.get("pacote_base", 1.0), 0.6)
+    return dados, confianca
+
+
+def _chave_data(texto: str) -> date:
+    try:
+        dia, mes, ano = (int(p) for p in texto.split("/"))
+        return date(ano, mes, dia)
+    except ValueError:
+        return date.min
+
+
+def extrair_por_template(
+    arquivos: List[Tuple[str, List[str]]],
+    cliente_nome: str = "",
+) -> Optional[ExtracaoTemplate]:
+    """
+    Tenta os templates registrados em cada arquivo da trip.
+
+    Args:
+        arquivos: (nome do arquivo, páginas), já deduplicadas por preparar_texto
+        cliente_nome: Nome do cliente (opcional)
+
+    Returns:
+        Dados no formato de extract_travel_data com a confiança de cada
+        campo, ou None se algum arquivo não bate com nenhum template
+    """
+    inicio = time.perf_counter()
+    partes = []
+    nomes = []
+    for _, paginas in arquivos:
+        texto = "".join(f"{pagina}\n" for pagina in paginas)
+        encontrado = next((t for t in TEMPLATES if t.reconhece(texto)), None)
+        if encontrado is None:
+            return None
+        try:
+            partes.append(encontrado.extrair(_linhas(texto)))
+        except Exception as e:
+            print(f"⚠️ Template {encontrado.nome} falhou: {e}")
+            return None
+        nomes.append(encontrado.nome)
+
+    if not partes:
+        return None
+
+    dados, confianca = _juntar(partes)
+    return ExtracaoTemplate(
+        template="+".join(sorted(set(nomes))),
+        dados={"cliente": cliente_nome if cliente_nome else "Cliente", **dados},
+        confianca=confianca,
+        tempo_ms=(time.perf_counter() - inicio) * 1000,
+    )
+
+
+def _pegar(dados: Any, caminho: str) -> Any:
+    atual = dados
+    for parte in caminho.split("."):
+        if isinstance(atual, list) and parte.isdigit() and int(parte) < len(atual):
+            atual = atual[int(parte)]
+        elif isinstance(atual, dict) and parte in atual:
+            atual = atual[parte]
+        else:
+            return None
+    return atual
+
+
+def _por(dados: Any, caminho: str, valor: Any) -> bool:
+    *pais, ultima = caminho.split(".")
+    alvo = _pegar(dados, ".".join(pais)) if pais else dados
+    if isinstance(alvo, dict):
+        alvo[ultima] = valor
+        return True
+    if isinstance(alvo, list) and ultima.isdigit() and int(ultima) < len(alvo):
+        alvo[int(ultima)] = valor
+        return True
+    return False
+
+
+def completar_lacunas(
+    extracao: ExtracaoTemplate,
+    texto: str,
+    chat: Callable[[List[Dict[str, Any]]], str],
+) -> Dict[str, Any]:
+    """
+    Pede ao LLM só os campos incertos do template.
+
+    O prompt leva o que o template já extraiu e a lista de caminhos
+    incertos; a resposta é um objeto pequeno {"campos": {caminho: valor}}.
+    Campos que o LLM não devolve ficam com o valor do template.
+
+    Args:
+        extracao: Resultado de extrair_por_template
+        texto: Texto (já preparado) dos arquivos
+        chat: Recebe as mensagens e devolve o texto JSON da resposta
+    """
+    dados = copy.deepcopy(extracao.dados)
+    incertos = extracao.incertos()
+    if not incertos:
+        return dados
+
+    lista = "\n".join(
+        f"- {caminho}: {json.dumps(_pegar(dados, caminho), ensure_ascii=False)}"
+        for caminho in incertos
+    )
+    prompt = f"""Um extrator automático já leu o orçamento de viagem abaixo, mas alguns campos ficaram incertos.
+
+DADOS JÁ EXTRAÍDOS:
+{json.dumps(dados, ensure_ascii=False, indent=2)}
+
+CAMPOS INCERTOS (caminho: valor atual):
+{lista}
+
+CONTEÚDO DOS ARQUIVOS:
+{texto}
+
+INSTRUÇÕES:
+- Confira cada campo incerto no conteúdo e devolva o valor correto
+- Mantenha o mesmo tipo e formato do valor atual (datas DD/MM/AAAA, valores sem moeda)
+- Em "hoteis.N.cidade", use a cidade onde o hotel fica, não a do aeroporto
+
+FORMATO JSON (retorne APENAS JSON):
+{{"campos": {{"<caminho>": <valor>}}}}"""
+
+    resposta = json.loads(
+        chat([
+            {
+                "role": "system",
+                "content": (
+                    "Você é um assistente especializado em extrair dados "
+                    "de orçamentos de viagem. Retorne SEMPRE em formato "
+                    "JSON válido."
+                ),
+            },
+            {"role": "user", "content": prompt},
+        ])
+    )
+
+    campos = resposta.get("campos") if isinstance(resposta, dict) else None
+    for caminho, valor in (campos or {}).items():
+        if caminho in incertos and valor is not None and _por(dados, caminho, valor):
+            extracao.completados_llm.append(caminho)
+    return dados
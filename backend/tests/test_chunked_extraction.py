@@ -0,0 +1,88 @@
+import pytest
+
+from chunked_extraction import _numero, juntar_extracoes, juntar_valores
+
+
+def parcial(valor, descricao="Aéreo + Hotel"):
+    return {"pacote_base": {"descricao": descricao, "valor": valor}}
+
+
+@pytest.mark.parametrize(
+    "texto, esperado",
+    [
+        ("R$ 7.910,00", 7910.0),
+        ("7.910,50", 7910.5),
+        ("7,910.00", 7910.0),
+        ("1.234.567", 1234567.0),
+        ("1,234,567.89", 1234567.89),
+        # Um separador seguido de exatamente três dígitos é milhar
+        ("7.910", 7910.0),
+        ("7,910", 7910.0),
+        ("7910,5", 7910.5),
+        ("7910.50", 7910.5),
+        ("R$ 0,99", 0.99),
+        (7910, 7910.0),
+        (7910.5, 7910.5),
+        ("", 0.0),
+        (None, 0.0),
+        ("a combinar", 0.0),
+    ],
+)
+def test_numero_le_formatos_brasileiro_e_americano(texto, esperado):
+    assert _numero(texto) == esperado
+
+
+def test_valores_iguais_contam_uma_vez():
+    assert juntar_valores([7910, 7910, 7910]) == (7910, False)
+
+
+def test_valores_iguais_ate_o_arredondamento_contam_uma_vez():
+    valor, incerto = juntar_valores([7910, 7910.4, 7912])
+
+    assert valor == 7912
+    assert not incerto
+
+
+def test_total_que_e_a_soma_dos_demais_vale_sozinho():
+    assert juntar_valores([4000, 10000, 6000]) == (10000, False)
+
+
+def test_valores_que_discordam_nao_sao_somados():
+    assert juntar_valores([3000, 4000]) == (4000, True)
+
+
+def test_sem_valores():
+    assert juntar_valores([]) == (0, False)
+
+
+def test_partes_que_concordam_em_formatos_diferentes():
+    pacote = juntar_extracoes([parcial("R$ 7.910,00"), parcial(7910), parcial("7,910.00")])["pacote_base"]
+
+    assert pacote == {"descricao": "Aéreo + Hotel", "valor": 7910}
+
+
+def test_partes_que_discordam_ficam_com_o_maior_valor_marcado_incerto():
+    pacote = juntar_extracoes([parcial(3000, "Aéreo"), parcial("4.000,00", "Hotel")])["pacote_base"]
+
+    # A descrição vem da parte que tem o valor escolhido
+    assert pacote == {"descricao": "Hotel", "valor": 4000, "valor_incerto": True}
+
+
+def test_parte_com_o_total_e_partes_com_os_itens():
+    pacote = juntar_extracoes(
+        [parcial(6000, "Aéreo"), parcial(4000, "Hotel"), parcial(10000, "Aéreo + Hotel")]
+    )["pacote_base"]
+
+    assert pacote == {"descricao": "Aéreo + Hotel", "valor": 10000}
+
+
+def test_partes_sem_valor_nao_entram_na_conta():
+    pacote = juntar_extracoes([{}, parcial(0, ""), parcial("", ""), parcial(5000, "Hotel")])["pacote_base"]
+
+    assert pacote == {"descricao": "Hotel", "valor": 5000}
+
+
+def test_nenhuma_parte_com_valor():
+    pacote = juntar_extracoes([{}, parcial(0, "")])["pacote_base"]
+
+    assert pacote == {"descricao": "Aéreo + Hotel", "valor": 0}
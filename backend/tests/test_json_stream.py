@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from json_stream import ArrayJsonIncremental
+
+DIAS = [
+    {"dia": 1, "titulo": "Chegada em São Paulo", "atividades": ["Check-in", "Jantar"]},
+    {"dia": 2, "titulo": 'Passeio "clássico" \\ centro', "atividades": []},
+    {"dia": 3, "titulo": "Fim [da] viagem {volta}", "atividades": [{"hora": "10:00"}]},
+]
+
+
+def alimentar_em_pedacos(texto, tamanho):
+    parser = ArrayJsonIncremental()
+    objetos = []
+    for i in range(0, len(texto), tamanho):
+        objetos += parser.alimentar(texto[i : i + tamanho])
+    return parser, objetos
+
+
+@pytest.mark.parametrize("tamanho", [1, 2, 3, 7, 1000])
+def test_qualquer_divisao_em_pedacos_da_o_mesmo_resultado(tamanho):
+    texto = json.dumps(DIAS, ensure_ascii=False)
+
+    parser, objetos = alimentar_em_pedacos(texto, tamanho)
+
+    assert objetos == DIAS
+    assert parser.terminou
+
+
+def test_objeto_sai_assim_que_fecha():
+    parser = ArrayJsonIncremental()
+
+    assert parser.alimentar('[{"dia": 1}, {"dia"') == [{"dia": 1}]
+    assert parser.alimentar(": 2}") == [{"dia": 2}]
+    assert parser.alimentar("]") == []
+    assert parser.terminou
+
+
+def test_chaves_e_colchetes_dentro_de_string_dividida():
+    parser = ArrayJsonIncremental()
+
+    assert parser.alimentar('[{"titulo": "a } b ] c') == []
+    assert parser.alimentar(' { [ d"}') == [{"titulo": "a } b ] c { [ d"}]
+
+
+def test_aspas_escapadas_divididas_entre_pedacos():
+    parser = ArrayJsonIncremental()
+
+    # O pedaço termina na barra: a aspa seguinte não fecha a string
+    assert parser.alimentar('[{"titulo": "Passeio \\') == []
+    assert parser.alimentar('"clássico\\"}"}]') == [{"titulo": 'Passeio "clássico"}'}]
+
+
+def test_barra_escapada_antes_da_aspa_fecha_a_string():
+    parser = ArrayJsonIncremental()
+
+    assert parser.alimentar('[{"caminho": "C:\\\\') == []
+    assert parser.alimentar('"}]') == [{"caminho": "C:\\"}]
+    assert parser.terminou
+
+
+def test_escape_unicode_dividido_entre_pedacos():
+    parser = ArrayJsonIncremental()
+    objetos = []
+    for pedaco in ['[{"cidade": "S\\u', "00e3", "o Paulo", ' \\ud83c', '\\udf0e"}]']:
+        objetos += parser.alimentar(pedaco)
+
+    assert objetos == [{"cidade": "São Paulo 🌎"}]
+
+
+def test_arrays_aninhados_nao_fecham_o_objeto():
+    texto = '[{"atividades": [["manhã", "tarde"], [{"hora": "10:00"}]], "dia": 1}, {"dia": 2}]'
+
+    parser, objetos = alimentar_em_pedacos(texto, 4)
+
+    assert objetos == [
+        {"atividades": [["manhã", "tarde"], [{"hora": "10:00"}]], "dia": 1},
+        {"dia": 2},
+    ]
+    assert parser.terminou
+
+
+def test_saida_cortada_no_meio_de_um_valor():
+    parser = ArrayJsonIncremental()
+
+    assert parser.alimentar('[{"dia": 1}, {"dia": 2, "titulo": "Passeio no cen') == [{"dia": 1}]
+    # Nada de erro: o objeto incompleto só nunca sai
+    assert not parser.terminou
+
+
+def test_saida_cortada_no_meio_de_um_escape():
+    parser = ArrayJsonIncremental()
+
+    assert parser.alimentar('[{"dia": 1}, {"titulo": "S\\u00') == [{"dia": 1}]
+    assert not parser.terminou
+
+
+def test_cercas_de_markdown_e_texto_antes_do_array():
+    texto = 'Aqui está o roteiro:\n```json\n[{"dia": 1}]\n```'
+
+    parser, objetos = alimentar_em_pedacos(texto, 5)
+
+    assert objetos == [{"dia": 1}]
+    assert parser.terminou
+
+
+def test_ignora_o_que_vem_depois_do_array():
+    parser = ArrayJsonIncremental()
+
+    assert parser.alimentar('[{"dia": 1}] e [{"dia": 2}]') == [{"dia": 1}]
+    assert parser.alimentar('{"dia": 3}') == []
+
+
+def test_objeto_completo_invalido_levanta_erro():
+    parser = ArrayJsonIncremental()
+
+    with pytest.raises(json.JSONDecodeError):
+        parser.alimentar('[{"dia": 1,}]')
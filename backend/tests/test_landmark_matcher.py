@@ -0,0 +1,108 @@
+import pytest
+
+from landmark_matcher import LANDMARK_LOCAL_THRESHOLD, MatchLocal, casar_localmente
+
+CATALOGO = [
+    "Cemitério da Recoleta",
+    "Centro Cultural Recoleta",
+    "Teatro Colón",
+    "Obelisco",
+    "Caminito",
+    "Estadio La Boca",
+    "Puerto Madero",
+    "San Telmo",
+    "Mercado de San Telmo",
+    "Museu Evita",
+    "Jardim Japonês",
+]
+
+
+@pytest.mark.parametrize(
+    "buscado, esperado",
+    [
+        ("Cemiterio da Recoleta", "Cemitério da Recoleta"),
+        ("cemitério da recoleta", "Cemitério da Recoleta"),
+        ("TEATRO COLON", "Teatro Colón"),
+        ("Teatro Colón.", "Teatro Colón"),
+    ],
+)
+def test_acentos_caixa_e_pontuacao_casam_normalizados(buscado, esperado):
+    assert casar_localmente(buscado, CATALOGO) == MatchLocal(esperado, 1.0, "normalizado")
+
+
+def test_catalogo_sem_acento_casa_busca_com_acento():
+    match = casar_localmente("Jardim Japonês", ["Jardim Japones", "Obelisco"])
+
+    assert (match.landmark, match.tier) == ("Jardim Japones", "normalizado")
+
+
+def test_erro_de_digitacao_casa_por_similaridade():
+    match = casar_localmente("Obelisko", CATALOGO)
+
+    assert (match.landmark, match.tier) == ("Obelisco", "fuzzy")
+    assert match.score >= LANDMARK_LOCAL_THRESHOLD
+
+
+def test_alias_vence_landmark_que_contem_o_apelido():
+    # "La Boca" também está dentro de "Estadio La Boca", mas o apelido diz Caminito
+    match = casar_localmente("La Boca", CATALOGO)
+
+    assert (match.landmark, match.tier) == ("Caminito", "alias")
+
+
+def test_alias_que_e_parte_de_outro_landmark():
+    # O alvo do apelido ("San Telmo") também é parte de "Mercado de San Telmo"
+    match = casar_localmente("Feira de San Telmo", CATALOGO)
+
+    assert (match.landmark, match.tier) == ("San Telmo", "alias")
+
+
+def test_alias_sem_alvo_no_catalogo_segue_para_o_fuzzy():
+    match = casar_localmente("La Boca", ["Obelisco", "Teatro Colón"])
+
+    assert match.landmark is None
+    assert match.tier is None
+
+
+def test_nome_contido_em_dois_landmarks_empata_e_fica_para_o_llm():
+    match = casar_localmente("Recoleta", CATALOGO)
+
+    assert match.landmark is None
+    assert match.score >= LANDMARK_LOCAL_THRESHOLD
+
+
+@pytest.mark.parametrize("buscado", ["Porto Madeira", "Jardim Botânico", "Teatro Cervantes"])
+def test_quase_igual_abaixo_do_limite_fica_para_o_llm(buscado):
+    match = casar_localmente(buscado, CATALOGO)
+
+    assert match.landmark is None
+    assert 0 < match.score < LANDMARK_LOCAL_THRESHOLD
+
+
+def test_catalogo_vazio():
+    assert casar_localmente("Obelisco", []) == MatchLocal(None, 0.0, None)
+
+
+def test_abaixo_do_limite_o_llm_e_chamado(monkeypatch):
+    pytest.importorskip("supabase")
+    import image_search
+    import landmark_match_cache
+    import llm_gateway
+
+    chamadas = []
+
+    def chat(ponto, messages, **params):
+        chamadas.append(ponto)
+        return llm_gateway.LLMResposta("Puerto Madero", 0, 0, 0.0, 1)
+
+    monkeypatch.setattr(image_search, "supabase", object())
+    monkeypatch.setattr(landmark_match_cache, "buscar", lambda *a: (False, None))
+    monkeypatch.setattr(landmark_match_cache, "salvar", lambda *a: None)
+    monkeypatch.setattr(llm_gateway, "disponivel", lambda: True)
+    monkeypatch.setattr(llm_gateway, "chat", chat)
+
+    assert image_search.encontrar_landmark_semantico("Buenos Aires", "Obelisko", CATALOGO) == "Obelisco"
+    assert chamadas == []
+
+    assert image_search.encontrar_landmark_semantico("Buenos Aires", "Porto Madeira", CATALOGO) == "Puerto Madero"
+    assert chamadas == ["landmarks"]
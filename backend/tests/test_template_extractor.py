@@ -0,0 +1,121 @@
+from pathlib import Path
+
+import pytest
+
+from pdf_preprocess import preparar_texto
+from pdf_text import read_pdf_pages
+from template_extractor import extrair_por_template
+
+UPLOADS = Path(__file__).resolve().parent.parent / "uploads"
+
+
+def paginas_da_trip(trip_id):
+    """(nome do arquivo, páginas) de cada PDF da trip, como na extração."""
+    return [(pdf.name, read_pdf_pages(pdf)) for pdf in sorted((UPLOADS / trip_id).glob("*.pdf"))]
+
+
+def deduplicadas(arquivos):
+    paginas = {}
+    for pagina in preparar_texto(arquivos, orcamento_tokens=10**9).paginas:
+        paginas.setdefault(pagina.arquivo, []).append(pagina.texto)
+    return list(paginas.items())
+
+
+def test_cotacao_da_operadora():
+    extracao = extrair_por_template(paginas_da_trip("trip_02772d14821f"), "Ana")
+
+    assert extracao.template == "cotacao_operadora"
+    assert extracao.dados["cliente"] == "Ana"
+    assert extracao.dados["periodo"] == {"inicio": "30/01/2026", "fim": "06/02/2026"}
+    assert [(v["origem"], v["destino"], v["data"], v["horario_saida"]) for v in extracao.dados["voos"]] == [
+        ("Vitória da Conquista (VDC)", "São Paulo (GRU)", "30/01/2026", "10:40"),
+        ("São Paulo (GRU)", "Buenos Aires (AEP)", "30/01/2026", "14:05"),
+        ("Buenos Aires (EZE)", "São Paulo (GRU)", "06/02/2026", "02:30"),
+        ("São Paulo (GRU)", "Vitória da Conquista (VDC)", "06/02/2026", "08:00"),
+    ]
+    assert extracao.dados["hoteis"] == [{
+        "cidade": "Buenos Aires",
+        "nome": "Waldorf Hotel",
+        "noites": 7,
+        "checkin": "30/01/2026",
+        "checkout": "06/02/2026",
+        "regime": "Só hospedagem",
+    }]
+    assert extracao.dados["pacote_base"] == {"descricao": "Aéreo + Hotel", "valor": 7910}
+    # Só o aeroporto indica a cidade do hotel: fica para completar_lacunas
+    assert extracao.incertos() == ["hoteis.0.cidade"]
+
+
+def test_cotacao_com_traslado_na_cidade_sai_completa():
+    extracao = extrair_por_template(paginas_da_trip("trip_16ad4d8ff006"))
+
+    assert extracao.template == "cotacao_operadora"
+    assert extracao.completa
+    assert extracao.dados["hoteis"][0]["cidade"] == "Santiago"
+    assert extracao.dados["hoteis"][0]["nome"] == "Hotel Bonaparte Boutique"
+    assert [p["nome"] for p in extracao.dados["passeios"]] == [
+        "Excursão às vinhas Undurraga",
+        "Visita a Valparaíso, Viña del Mar, Casablanca e Reñaca",
+        "Isla Negra, Casa de Pablo Neruda, Algarrobo e San Alfonso del Mar",
+    ]
+    assert extracao.dados["pacote_base"]["valor"] == 10467
+
+
+def test_voucher_de_hotel():
+    extracao = extrair_por_template(paginas_da_trip("trip_90069c2411c7"))
+
+    assert extracao.template == "voucher_hotel"
+    assert extracao.dados["voos"] == []
+    assert extracao.dados["hoteis"] == [{
+        "cidade": "Recife",
+        "nome": "Rede Andrade LG Inn",
+        "noites": 5,
+        "checkin": "30/01/2026",
+        "checkout": "04/02/2026",
+        "regime": "Café da manhã",
+    }]
+    # O voucher não traz o valor pago
+    assert "pacote_base" in extracao.incertos()
+
+
+def test_arquivo_sem_template_vai_inteiro_para_o_llm():
+    assert extrair_por_template([("orcamento.pdf", ["Orçamento livre\nHotel em Paris\nTotal 5.000"])]) is None
+
+
+def test_mesma_cotacao_enviada_duas_vezes_nao_dobra_o_valor():
+    (nome, paginas), = paginas_da_trip("trip_02772d14821f")
+
+    extracao = extrair_por_template(deduplicadas([(nome, paginas), (f"copia {nome}", paginas)]))
+
+    assert extracao.dados["pacote_base"]["valor"] == 7910
+    assert len(extracao.dados["hoteis"]) == 1
+    assert extracao.incertos() == ["hoteis.0.cidade"]
+
+
+def test_hotel_repetido_entre_arquivos_nao_deixa_caminho_sem_hotel():
+    (nome, paginas), = paginas_da_trip("trip_02772d14821f")
+
+    # Sem deduplicar as páginas, a junção ainda descarta o hotel repetido
+    extracao = extrair_por_template([(nome, paginas), (f"copia {nome}", paginas)])
+
+    assert len(extracao.dados["hoteis"]) == 1
+    assert not any(c.startswith("hoteis.1.") for c in extracao.confianca)
+    assert extracao.dados["pacote_base"]["valor"] == 7910
+
+
+def test_cotacoes_diferentes_nao_somam_os_totais():
+    arquivos = paginas_da_trip("trip_02772d14821f") + paginas_da_trip("trip_16ad4d8ff006")
+
+    extracao = extrair_por_template(arquivos)
+
+    assert [h["nome"] for h in extracao.dados["hoteis"]] == ["Waldorf Hotel", "Hotel Bonaparte Boutique"]
+    assert extracao.dados["pacote_base"]["valor"] == 10467
+    assert extracao.dados["pacote_base"]["valor_incerto"] is True
+    assert "pacote_base" in extracao.incertos()
+
+
+@pytest.mark.parametrize("trip_id", ["trip_02772d14821f", "trip_16ad4d8ff006", "trip_90069c2411c7"])
+def test_paginas_deduplicadas_dao_o_mesmo_resultado(trip_id):
+    arquivos = paginas_da_trip(trip_id)
+
+    assert extrair_por_template(deduplicadas(arquivos)).dados == extrair_por_template(arquivos).dados
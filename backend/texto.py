@@ -0,0 +1,11 @@
+"""
+Utilitários de texto compartilhados.
+"""
+
+import unicodedata
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas, sem acentos e sem espaços nas pontas, para comparações."""
+    sem_acento = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in sem_acento if not unicodedata.combining(c)).strip().lower()
@@ -0,0 +1,96 @@
+"""
+Cache LRU em memória das viagens já lidas de extracao/.
+
+Cada entrada é validada pelo mtime e tamanho do arquivo: se o JSON mudar em
+disco (nova extração), a próxima leitura recarrega. O orçamento de memória
+é medido pelo tamanho dos JSONs em disco (TRIP_CACHE_MAX_MB) e as entradas
+menos usadas saem primeiro. Também guarda o SHA-256 do arquivo, base do
+ETag de GET /trips/{trip_id}.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+TRIP_CACHE_MAX_BYTES = int(os.getenv("TRIP_CACHE_MAX_MB", "32")) * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class CachedTrip:
+    data: Dict[str, Any]
+    digest: str
+    size: int
+
+
+class TripCache:
+    def __init__(self, max_bytes: int = TRIP_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Path, Tuple[Tuple[int, int], CachedTrip]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def carregar(self, path: Path) -> CachedTrip:
+        """
+        Retorna a trip parseada, relendo o arquivo só se ele mudou.
+
+        Raises:
+            FileNotFoundError: arquivo não existe
+            json.JSONDecodeError: JSON inválido
+        """
+        stat = path.stat()
+        versao = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entrada = self._entries.get(path)
+            if entrada and entrada[0] == versao:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entrada[1]
+            self.misses += 1
+
+        raw = path.read_bytes()
+        trip = CachedTrip(
+            data=json.loads(raw.decode("utf-8")),
+            digest=hashlib.sha256(raw).hexdigest(),
+            size=len(raw),
+        )
+
+        with self._lock:
+            anterior = self._entries.pop(path, None)
+            if anterior:
+                self._bytes -= anterior[1].size
+
+            if trip.size <= self.max_bytes:
+                self._entries[path] = (versao, trip)
+                self._bytes += trip.size
+                while self._bytes > self.max_bytes:
+                    _, (_, removida) = self._entries.popitem(last=False)
+                    self._bytes -= removida.size
+
+        return trip
+
+    def invalidar(self, path: Path) -> None:
+        with self._lock:
+            entrada = self._entries.pop(path, None)
+            if entrada:
+                self._bytes -= entrada[1].size
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+trip_cache = TripCache()
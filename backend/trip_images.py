@@ -0,0 +1,278 @@
+"""
+Enriquecimento de imagens (hero + imagens por cidade) das viagens.
+
+Calculado uma vez na extração e salvo junto com a trip, com a versão do
+catálogo de imagens usada. A leitura (GET /trips/{trip_id}) só lê o que
+está salvo; se a versão do catálogo mudou, a trip é reenriquecida em
+segundo plano, ou na hora via POST /trips/{trip_id}/imagens. Só os campos
+de imagem são regravados, sob o lock do arquivo (upload_store), para não
+perder um roteiro salvo no meio do caminho. A demo, fixture versionada no
+git, nunca é regravada: os campos dela ficam em memória, por conteúdo e
+versão do catálogo (imagens_em_memoria).
+
+É o único lugar que calcula essas imagens (a etapa buscando_imagens da
+extração também chama enriquecer_imagens). Os campos saem com os dois
+nomes: heroImage/cityImages da API e imagem_hero/imagens_cidades que o
+front lê.
+
+As versões _async são as do servidor: os catálogos vêm pelo cliente
+assíncrono do Supabase e o reenriquecimento em segundo plano é uma task
+do event loop, não uma thread esperando a rede.
+"""
+
+import asyncio
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from upload_store import lock_do_arquivo, salvar_json_atomico
+
+# Tentativa de importar as funções de imagem
+try:
+    from image_search import (
+        get_hero_image_for_trip,
+        get_images_for_all_cities,
+        imagens_da_trip_async as _imagens_da_trip_async,
+    )
+except ImportError as e:
+    print(f"⚠️ Erro ao importar image_search: {e}. Recursos de imagem serão desabilitados.")
+
+    def get_hero_image_for_trip(destinations):
+        return None
+
+    def get_images_for_all_cities(destinations):
+        return {}
+
+    async def _imagens_da_trip_async(destinations):
+        return None, {}
+
+
+# 2: cidades vindas dos hotéis (antes as trips extraídas saíam sem imagens)
+IMAGE_CATALOG_VERSION = os.getenv("IMAGE_CATALOG_VERSION", "2")
+
+CAMPOS_IMAGENS = ("heroImage", "cityImages", "imagem_hero", "imagens_cidades", "imagens_versao")
+
+_em_andamento: Set[Path] = set()
+_lock = threading.Lock()
+# Referência às tasks em andamento (o event loop só guarda referência fraca)
+_tarefas: Set["asyncio.Task[None]"] = set()
+# Arquivo → ((digest, versão do catálogo), campos de imagem) das trips que
+# não são regravadas (a demo, fixture versionada no git)
+_em_memoria: Dict[Path, Tuple[Tuple[str, str], Dict[str, Any]]] = {}
+
+
+def _snapshot_pronto() -> bool:
+    try:
+        from catalog_snapshot import snapshot
+    except ImportError:
+        return False
+    return snapshot.pronto
+
+
+def versao_catalogo() -> str:
+    """Versão atual do catálogo de imagens (muda quando o catálogo é curado)."""
+    try:
+        from catalog_snapshot import snapshot
+    except ImportError:
+        return IMAGE_CATALOG_VERSION
+
+    if snapshot.versao is None:
+        return IMAGE_CATALOG_VERSION
+    return f"{IMAGE_CATALOG_VERSION}:{snapshot.versao}"
+
+
+def extract_cities_from_trip(trip: Dict[str, Any]) -> List[str]:
+    """
+    Extrai lista de cidades de um objeto de viagem: as dos hotéis, que é o
+    que a extração produz, e na falta delas destinos, dias ou cidade.
+    """
+    cidades: List[str] = []
+
+    hoteis = trip.get("hoteis") or []
+    if isinstance(hoteis, List):
+        for hotel in hoteis:
+            if isinstance(hotel, Dict):
+                cidade = str(hotel.get("cidade") or "").strip()
+                if cidade and cidade not in cidades:
+                    cidades.append(cidade)
+        if cidades:
+            return cidades
+
+    destinos = trip.get("destinations") or trip.get("destinos") or []
+    if isinstance(destinos, List):
+        for d in destinos:
+            if isinstance(d, Dict):
+                nome = (
+                    d.get("city")
+                    or d.get("cidade")
+                    or d.get("name")
+                    or d.get("nome")
+                )
+                if nome and nome not in cidades:
+                    cidades.append(str(nome))
+        if cidades:
+            return cidades
+
+    dias = trip.get("days") or trip.get("dias") or []
+    if isinstance(dias, List):
+        for dia in dias:
+            if isinstance(dia, Dict):
+                cidade = dia.get("city") or dia.get("cidade")
+                if cidade and cidade not in cidades:
+                    cidades.append(str(cidade))
+
+    unica = trip.get("city") or trip.get("cidade")
+    if unica:
+        cidades.append(str(unica))
+
+    return cidades
+
+
+def _aplicar_imagens(
+    data: Dict[str, Any], hero: Optional[str], imagens: Dict[str, List[str]]
+) -> Dict[str, Any]:
+    data["heroImage"] = data["imagem_hero"] = hero
+    data["cityImages"] = data["imagens_cidades"] = imagens
+    data["imagens_versao"] = versao_catalogo()
+    return data
+
+
+def enriquecer_imagens(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Calcula heroImage/cityImages e grava na própria trip, com a versão do catálogo."""
+    cidades = extract_cities_from_trip(data)
+    if not cidades:
+        return _aplicar_imagens(data, None, {})
+    return _aplicar_imagens(
+        data, get_hero_image_for_trip(cidades), get_images_for_all_cities(cidades)
+    )
+
+
+async def enriquecer_imagens_async(data: Dict[str, Any]) -> Dict[str, Any]:
+    """enriquecer_imagens sem prender thread: catálogos buscados em paralelo."""
+    cidades = extract_cities_from_trip(data)
+    if not cidades:
+        return _aplicar_imagens(data, None, {})
+    return _aplicar_imagens(data, *(await _imagens_da_trip_async(cidades)))
+
+
+def enriquecimento_atual(data: Dict[str, Any]) -> bool:
+    if "heroImage" not in data:
+        return False
+    # Antes do snapshot carregar a versão ainda não diz nada: comparar agora
+    # reenriqueceria todas as trips lidas no boot, e de novo depois da carga
+    if not _snapshot_pronto():
+        return True
+    return data.get("imagens_versao") == versao_catalogo()
+
+
+def _ler_trip(extracao_file: Path) -> Dict[str, Any]:
+    with extracao_file.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _gravar_imagens(extracao_file: Path, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Grava os campos de imagem de data sobre a versão atual do arquivo."""
+    with lock_do_arquivo(extracao_file):
+        atual = _ler_trip(extracao_file)
+        atual.update({campo: data[campo] for campo in CAMPOS_IMAGENS})
+        salvar_json_atomico(extracao_file, atual)
+    return atual
+
+
+async def atualizar_arquivo_async(extracao_file: Path) -> Dict[str, Any]:
+    """
+    Relê a trip do disco, reenriquece e grava os campos de imagem, com o
+    disco numa thread e a rede no event loop.
+    """
+    data = await asyncio.to_thread(_ler_trip, extracao_file)
+    await enriquecer_imagens_async(data)
+    return await asyncio.to_thread(_gravar_imagens, extracao_file, data)
+
+
+async def _atualizar_em_task(
+    extracao_file: Path, on_done: Optional[Callable[[Dict[str, Any]], None]]
+) -> None:
+    data = await atualizar_arquivo_async(extracao_file)
+    if on_done:
+        await asyncio.to_thread(on_done, data)
+
+
+async def _rodar_e_liberar(extracao_file: Path, corrotina: Awaitable[None]) -> None:
+    try:
+        await corrotina
+        print(f"🖼️ Imagens atualizadas para {extracao_file.stem}")
+    except Exception as e:
+        print(f"⚠️ Erro ao atualizar imagens de {extracao_file.stem}: {e}")
+    finally:
+        with _lock:
+            _em_andamento.discard(extracao_file)
+
+
+def _agendar_task(extracao_file: Path, criar: Callable[[], Awaitable[None]]) -> bool:
+    """Uma task por arquivo de cada vez; criar só é chamado se a task sair."""
+    with _lock:
+        if extracao_file in _em_andamento:
+            return False
+        _em_andamento.add(extracao_file)
+
+    tarefa = asyncio.get_running_loop().create_task(_rodar_e_liberar(extracao_file, criar()))
+    _tarefas.add(tarefa)
+    tarefa.add_done_callback(_tarefas.discard)
+    return True
+
+
+def agendar_atualizacao_async(
+    extracao_file: Path,
+    on_done: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> bool:
+    """
+    Reenriquece a trip fora da requisição (uma vez por arquivo de cada vez):
+    o reenriquecimento vira uma task do event loop, e on_done (síncrono)
+    roda numa thread ao final.
+
+    Returns:
+        True se a atualização foi agendada agora
+    """
+    return _agendar_task(extracao_file, lambda: _atualizar_em_task(extracao_file, on_done))
+
+
+def imagens_em_memoria(extracao_file: Path, digest: str) -> Optional[Dict[str, Any]]:
+    """
+    Campos de imagem de uma trip que não é regravada (a demo), calculados
+    para este conteúdo (digest do trip_cache) e a versão atual do catálogo.
+    """
+    guardado = _em_memoria.get(extracao_file)
+    if guardado and guardado[0] == (digest, versao_catalogo()):
+        return guardado[1]
+    return None
+
+
+async def enriquecer_em_memoria_async(
+    extracao_file: Path, data: Dict[str, Any], digest: str
+) -> Dict[str, Any]:
+    """Enriquece uma cópia de data e guarda os campos de imagem em memória, sem gravar."""
+    copia = await enriquecer_imagens_async(dict(data))
+    campos = {campo: copia[campo] for campo in CAMPOS_IMAGENS}
+    _em_memoria[extracao_file] = ((digest, campos["imagens_versao"]), campos)
+    return copia
+
+
+def agendar_em_memoria_async(extracao_file: Path, data: Dict[str, Any], digest: str) -> bool:
+    """enriquecer_em_memoria_async fora da requisição (uma task por arquivo)."""
+
+    async def enriquecer() -> None:
+        await enriquecer_em_memoria_async(extracao_file, data, digest)
+
+    return _agendar_task(extracao_file, enriquecer)
+
+
+def imagens_da_trip(data: Dict[str, Any]) -> Dict[str, Optional[Any]]:
+    """Imagens já salvas na trip (vazias se ainda não foram calculadas)."""
+    return {
+        "heroImage": data.get("heroImage"),
+        "cityImages": data.get("cityImages") or {},
+        "imagem_hero": data.get("imagem_hero"),
+        "imagens_cidades": data.get("imagens_cidades") or {},
+    }
@@ -0,0 +1,298 @@
+"""
+Índice de metadados das viagens em SQLite embutido.
+
+Mantido incrementalmente: cada extração salva atualiza a linha da trip,
+e na inicialização só os JSONs com mtime mais novo que o indexado são
+relidos. Guarda cliente, período, cidades, hotéis e valor do pacote,
+com índice full-text (FTS5) sobre esses campos, para que GET /trips
+pagine, filtre e busque sem abrir os arquivos de extracao/.
+"""
+
+import base64
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from texto import normalizar
+
+BASE_DIR = Path(__file__).resolve().parent
+INDEX_PATH = BASE_DIR / "cache" / "trips_index.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trips (
+    trip_id TEXT PRIMARY KEY,
+    cliente TEXT NOT NULL DEFAULT '',
+    inicio TEXT NOT NULL DEFAULT '',
+    fim TEXT NOT NULL DEFAULT '',
+    cidades TEXT NOT NULL DEFAULT '[]',
+    hoteis TEXT NOT NULL DEFAULT '[]',
+    valor REAL,
+    atualizado_em REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trips_ordem ON trips (atualizado_em DESC, trip_id DESC);
+CREATE INDEX IF NOT EXISTS trips_valor ON trips (valor);
+
+CREATE TABLE IF NOT EXISTS trip_cidades (
+    trip_id TEXT NOT NULL,
+    cidade TEXT NOT NULL,
+    PRIMARY KEY (cidade, trip_id)
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS trips_fts USING fts5 (
+    trip_id UNINDEXED,
+    cliente,
+    cidades,
+    hoteis,
+    tokenize = "unicode61 remove_diacritics 2"
+);
+"""
+
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _conn = sqlite3.connect(str(INDEX_PATH), check_same_thread=False)
+        _conn.row_factory = sqlite3.Row
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.executescript(_SCHEMA)
+    return _conn
+
+
+def _cidades(data: Dict[str, Any]) -> List[str]:
+    cidades: List[str] = []
+    for hotel in data.get("hoteis") or []:
+        if isinstance(hotel, dict):
+            cidade = str(hotel.get("cidade") or "").strip()
+            if cidade and cidade not in cidades:
+                cidades.append(cidade)
+    return cidades
+
+
+def _hoteis(data: Dict[str, Any]) -> List[str]:
+    return [
+        str(hotel.get("nome")).strip()
+        for hotel in data.get("hoteis") or []
+        if isinstance(hotel, dict) and hotel.get("nome")
+    ]
+
+
+def _valor(data: Dict[str, Any]) -> Optional[float]:
+    pacote = data.get("pacote_base")
+    if not isinstance(pacote, dict):
+        return None
+    try:
+        return float(pacote.get("valor"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _linha_para_item(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "trip_id": row["trip_id"],
+        "cliente": row["cliente"],
+        "periodo": {"inicio": row["inicio"], "fim": row["fim"]},
+        "cidades": json.loads(row["cidades"]),
+        "hoteis": json.loads(row["hoteis"]),
+        "valor": row["valor"],
+        "atualizado_em": row["atualizado_em"],
+    }
+
+
+def indexar_trip(
+    trip_id: str, data: Dict[str, Any], atualizado_em: Optional[float] = None
+) -> None:
+    """Insere ou atualiza a trip no índice (e no índice full-text)."""
+    periodo = data.get("periodo") if isinstance(data.get("periodo"), dict) else {}
+    cidades = _cidades(data)
+    hoteis = _hoteis(data)
+    cliente = str(data.get("cliente") or "")
+
+    with _lock:
+        conn = _get_conn()
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO trips (trip_id, cliente, inicio, fim, cidades, hoteis, valor, atualizado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (trip_id) DO UPDATE SET
+                    cliente = excluded.cliente,
+                    inicio = excluded.inicio,
+                    fim = excluded.fim,
+                    cidades = excluded.cidades,
+                    hoteis = excluded.hoteis,
+                    valor = excluded.valor,
+                    atualizado_em = excluded.atualizado_em
+                """,
+                (
+                    trip_id,
+                    cliente,
+                    str(periodo.get("inicio") or ""),
+                    str(periodo.get("fim") or ""),
+                    json.dumps(cidades, ensure_ascii=False),
+                    json.dumps(hoteis, ensure_ascii=False),
+                    _valor(data),
+                    atualizado_em if atualizado_em is not None else time.time(),
+                ),
+            )
+            conn.execute("DELETE FROM trip_cidades WHERE trip_id = ?", (trip_id,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO trip_cidades (trip_id, cidade) VALUES (?, ?)",
+                [(trip_id, normalizar(c)) for c in cidades],
+            )
+            conn.execute("DELETE FROM trips_fts WHERE trip_id = ?", (trip_id,))
+            conn.execute(
+                "INSERT INTO trips_fts (trip_id, cliente, cidades, hoteis) VALUES (?, ?, ?, ?)",
+                (trip_id, cliente, " ".join(cidades), " ".join(hoteis)),
+            )
+
+
+def remover_trip(trip_id: str) -> None:
+    with _lock:
+        conn = _get_conn()
+        with conn:
+            conn.execute("DELETE FROM trips WHERE trip_id = ?", (trip_id,))
+            conn.execute("DELETE FROM trip_cidades WHERE trip_id = ?", (trip_id,))
+            conn.execute("DELETE FROM trips_fts WHERE trip_id = ?", (trip_id,))
+
+
+def _arquivos_de_trip(extracao_dir: Path) -> Dict[str, Path]:
+    """trip_*.json de extracao/ (ignora sidecars como trip_x.timing.json)."""
+    return {
+        path.stem: path
+        for path in extracao_dir.glob("trip_*.json")
+        if "." not in path.stem
+    }
+
+
+def sincronizar(extracao_dir: Path) -> Dict[str, int]:
+    """
+    Atualiza o índice a partir de extracao/, relendo só o que mudou.
+
+    Returns:
+        Contagem de trips indexadas, removidas e inalteradas
+    """
+    with _lock:
+        indexadas = {
+            row["trip_id"]: row["atualizado_em"]
+            for row in _get_conn().execute("SELECT trip_id, atualizado_em FROM trips")
+        }
+
+    arquivos = _arquivos_de_trip(extracao_dir)
+    resumo = {"indexadas": 0, "removidas": 0, "inalteradas": 0}
+
+    for trip_id, path in arquivos.items():
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            continue
+
+        if indexadas.get(trip_id) == mtime:
+            resumo["inalteradas"] += 1
+            continue
+
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ Não foi possível indexar {path.name}: {e}")
+            continue
+
+        if isinstance(data, dict):
+            indexar_trip(trip_id, data, atualizado_em=mtime)
+            resumo["indexadas"] += 1
+
+    for trip_id in indexadas.keys() - arquivos.keys():
+        remover_trip(trip_id)
+        resumo["removidas"] += 1
+
+    return resumo
+
+
+def _codificar_cursor(row: sqlite3.Row) -> str:
+    bruto = json.dumps([row["atualizado_em"], row["trip_id"]])
+    return base64.urlsafe_b64encode(bruto.encode("utf-8")).decode("ascii")
+
+
+def _decodificar_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        atualizado_em, trip_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(atualizado_em), str(trip_id)
+    except Exception as e:
+        raise CursorInvalido(f"Cursor inválido: {cursor}") from e
+
+
+def _consulta_fts(q: str) -> Optional[str]:
+    """Transforma o texto livre em consulta FTS5 (todos os termos, por prefixo)."""
+    termos = [t.replace('"', "") for t in q.split()]
+    termos = [t for t in termos if t]
+    if not termos:
+        return None
+    return " ".join(f'"{t}"*' for t in termos)
+
+
+def listar(
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    q: Optional[str] = None,
+    cidade: Optional[str] = None,
+    cliente: Optional[str] = None,
+    valor_min: Optional[float] = None,
+    valor_max: Optional[float] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Lista trips da mais recente para a mais antiga, com paginação por cursor.
+
+    Returns:
+        (itens da página, cursor da próxima página ou None)
+    """
+    where: List[str] = []
+    params: List[Any] = []
+
+    if cursor:
+        atualizado_em, trip_id = _decodificar_cursor(cursor)
+        where.append("(atualizado_em < ? OR (atualizado_em = ? AND trip_id < ?))")
+        params.extend([atualizado_em, atualizado_em, trip_id])
+
+    consulta = _consulta_fts(q) if q else None
+    if consulta:
+        where.append("trip_id IN (SELECT trip_id FROM trips_fts WHERE trips_fts MATCH ?)")
+        params.append(consulta)
+
+    if cidade:
+        where.append("trip_id IN (SELECT trip_id FROM trip_cidades WHERE cidade = ?)")
+        params.append(normalizar(cidade))
+
+    if cliente:
+        where.append("cliente LIKE ?")
+        params.append(f"%{cliente}%")
+
+    if valor_min is not None:
+        where.append("valor >= ?")
+        params.append(valor_min)
+
+    if valor_max is not None:
+        where.append("valor <= ?")
+        params.append(valor_max)
+
+    sql = "SELECT * FROM trips"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY atualizado_em DESC, trip_id DESC LIMIT ?"
+    params.append(limit + 1)
+
+    with _lock:
+        rows = _get_conn().execute(sql, params).fetchall()
+
+    proximo = _codificar_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return [_linha_para_item(row) for row in rows[:limit]], proximo
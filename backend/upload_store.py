@@ -0,0 +1,244 @@
+"""
+Armazenamento de uploads endereçado por conteúdo (SHA-256).
+
+Cada arquivo é gravado uma única vez em uploads/_blobs/<aa>/<sha256>.
+As pastas trip_* apenas referenciam os blobs (hardlink, com symlink ou
+cópia como alternativa) e guardam um manifest.json com o hash de cada arquivo.
+
+Também mantém o cache de extrações: o resultado de extract_travel_data é
+salvo indexado pelo conjunto de hashes dos PDFs da trip, então uma cotação
+já vista não passa de novo pelo PyPDF2 nem pela OpenAI.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent
+UPLOADS_DIR = BASE_DIR / "uploads"
+BLOBS_DIR = UPLOADS_DIR / "_blobs"
+BLOBS_TMP_DIR = BLOBS_DIR / "_tmp"
+EXTRACOES_CACHE_DIR = BASE_DIR / "cache" / "extracoes"
+
+MANIFEST_NAME = "manifest.json"
+
+# Incrementar quando o resultado da extração mudar (prompt, esquema,
+# pdf_preprocess, template_extractor, junção de chunked_extraction), para
+# invalidar o cache.
+# 2: pré-processamento com orçamento, extração por template e em partes
+# 3: valor do pacote na junção das partes não soma valores que discordam
+# 4: template lê as páginas deduplicadas e junta arquivos pela mesma regra
+EXTRACAO_CACHE_VERSAO = "4"
+
+CHUNK_SIZE = 1024 * 1024
+
+_locks_arquivos: Dict[Path, threading.Lock] = {}
+_locks_lock = threading.Lock()
+
+
+def caminho_blob(sha256: str) -> Path:
+    """Caminho do blob para um hash (dois níveis para não lotar um diretório)."""
+    return BLOBS_DIR / sha256[:2] / sha256
+
+
+def salvar_json_atomico(path: Path, data: Any) -> None:
+    """Grava JSON em arquivo temporário e troca de uma vez (sem leitura parcial)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def lock_do_arquivo(path: Path) -> threading.Lock:
+    """
+    Lock do processo para ler-alterar-gravar um JSON (um por arquivo).
+    salvar_json_atomico evita leitura parcial, mas não que duas escritas
+    concorrentes percam a alteração uma da outra.
+    """
+    with _locks_lock:
+        return _locks_arquivos.setdefault(path, threading.Lock())
+
+
+class BlobWriter:
+    """
+    Grava um arquivo em pedaços, calculando o SHA-256 na mesma passada.
+
+    Uso:
+        writer = BlobWriter()
+        writer.write(chunk)  # quantas vezes precisar
+        sha256 = writer.finalizar()
+    """
+
+    def __init__(self) -> None:
+        BLOBS_TMP_DIR.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = BLOBS_TMP_DIR / uuid.uuid4().hex
+        self._file = self.tmp_path.open("wb")
+        self._hash = hashlib.sha256()
+        self.bytes = 0
+
+    def write(self, chunk: bytes) -> None:
+        self._hash.update(chunk)
+        self._file.write(chunk)
+        self.bytes += len(chunk)
+
+    def finalizar(self) -> str:
+        """Move o temporário para o blob definitivo (ou descarta se já existe)."""
+        self._file.close()
+        sha256 = self._hash.hexdigest()
+        destino = caminho_blob(sha256)
+
+        if destino.exists():
+            self.tmp_path.unlink()
+        else:
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self.tmp_path, destino)
+
+        return sha256
+
+    def descartar(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+        if self.tmp_path.exists():
+            self.tmp_path.unlink()
+
+
+def vincular_blob(trip_folder: Path, nome: str, sha256: str) -> Path:
+    """Cria em trip_folder uma referência ao blob com o nome original do arquivo."""
+    origem = caminho_blob(sha256)
+    destino = trip_folder / nome
+
+    if destino.exists() or destino.is_symlink():
+        destino.unlink()
+
+    try:
+        os.link(origem, destino)
+    except OSError:
+        try:
+            os.symlink(origem, destino)
+        except OSError:
+            shutil.copyfile(origem, destino)
+
+    return destino
+
+
+def ler_manifest(trip_folder: Path) -> Dict[str, str]:
+    """Retorna {nome_do_arquivo: sha256} da trip (vazio se não houver manifest)."""
+    manifest_file = trip_folder / MANIFEST_NAME
+    if not manifest_file.exists():
+        return {}
+
+    try:
+        with manifest_file.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+    arquivos = data.get("arquivos") if isinstance(data, dict) else None
+    return arquivos if isinstance(arquivos, dict) else {}
+
+
+def salvar_manifest(trip_folder: Path, arquivos: Dict[str, str]) -> None:
+    salvar_json_atomico(trip_folder / MANIFEST_NAME, {"arquivos": arquivos})
+
+
+def hash_arquivo(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hashes_da_trip(trip_folder: Path) -> List[str]:
+    """
+    Hashes dos PDFs da trip (os únicos arquivos que a extração lê).
+
+    Usa o manifest quando existe; pastas antigas, sem manifest,
+    têm os PDFs lidos e hasheados na hora.
+    """
+    manifest = ler_manifest(trip_folder)
+    if manifest:
+        return sorted(
+            sha for nome, sha in manifest.items()
+            if Path(nome).suffix.lower() == ".pdf"
+        )
+
+    return sorted(
+        hash_arquivo(file_path)
+        for file_path in trip_folder.glob("*")
+        if file_path.suffix.lower() == ".pdf" and file_path.is_file()
+    )
+
+
+def chave_extracao(hashes: List[str]) -> Optional[str]:
+    """Chave do cache de extração para um conjunto de PDFs (None se não há PDFs)."""
+    if not hashes:
+        return None
+    base = f"v{EXTRACAO_CACHE_VERSAO}\n" + "\n".join(sorted(hashes))
+    return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+
+def buscar_extracao_em_cache(chave: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not chave:
+        return None
+
+    cache_file = EXTRACOES_CACHE_DIR / f"{chave}.json"
+    try:
+        with cache_file.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️ Cache de extração corrompido ({cache_file.name}): {e}")
+        return None
+
+
+def salvar_extracao_em_cache(chave: Optional[str], data: Dict[str, Any]) -> None:
+    if not chave:
+        return
+    salvar_json_atomico(EXTRACOES_CACHE_DIR / f"{chave}.json", data)
+
+
+def migrar_pasta_legada(trip_folder: Path) -> Dict[str, str]:
+    """Converte uma pasta trip_* antiga (arquivos soltos) para blobs + manifest."""
+    arquivos: Dict[str, str] = dict(ler_manifest(trip_folder))
+
+    for file_path in sorted(trip_folder.iterdir()):
+        if file_path.name == MANIFEST_NAME or file_path.name in arquivos:
+            continue
+        if not file_path.is_file() or file_path.is_symlink():
+            continue
+
+        sha256 = hash_arquivo(file_path)
+        destino = caminho_blob(sha256)
+        if not destino.exists():
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(file_path, destino)
+
+        vincular_blob(trip_folder, file_path.name, sha256)
+        arquivos[file_path.name] = sha256
+
+    salvar_manifest(trip_folder, arquivos)
+    return arquivos
+
+
+if __name__ == "__main__":
+    pastas = sorted(p for p in UPLOADS_DIR.glob("trip_*") if p.is_dir())
+    print(f"📦 Migrando {len(pastas)} pasta(s) para o armazenamento por conteúdo...")
+
+    for pasta in pastas:
+        arquivos = migrar_pasta_legada(pasta)
+        print(f"  {pasta.name}: {len(arquivos)} arquivo(s)")
+
+    total_blobs = sum(1 for p in BLOBS_DIR.glob("??/*") if p.is_file())
+    print(f"✅ {total_blobs} blob(s) únicos em {BLOBS_DIR}")
@@ -74,7 +74,7 @@ function App() {
 
           {/* COLUNA 3 - Preview */}
           <div>
-            <AppPreview tripData={data} />
+            <AppPreview tripData={data} tripId={trip.trip_id} />
           </div>
         </div>
       </main>
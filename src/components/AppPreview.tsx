@@ -26,9 +26,10 @@ type AppScreen =
 
 interface AppPreviewProps {
     tripData?: any;
+    tripId?: string;
 }
 
-export function AppPreview({ tripData }: AppPreviewProps) {
+export function AppPreview({ tripData, tripId }: AppPreviewProps) {
     const [previewScreen, setPreviewScreen] = useState<PreviewScreen>("hero");
     const [currentScreen, setCurrentScreen] = useState<AppScreen>("hero");
     const [activeTab, setActiveTab] = useState<BottomTab>("roteiro");
@@ -277,6 +278,7 @@ export function AppPreview({ tripData }: AppPreviewProps) {
                                     {currentScreen === "roteiro" && (
                                         <RoteiroScreen
                                             dias={tripData?.roteiro || []}
+                                            tripId={tripId}
                                             imagensCidades={tripData?.imagens_cidades || {}}
                                             onBack={() => {
                                                 setCurrentScreen("cidades");
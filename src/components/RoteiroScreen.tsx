@@ -1,5 +1,6 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { motion } from "framer-motion";
+import { streamRoteiro } from "../services/tripService";
 
 interface DiaRoteiro {
     dia: number;
@@ -15,16 +16,49 @@ interface DiaRoteiro {
 
 interface RoteiroScreenProps {
     dias: DiaRoteiro[];
+    // Sem dias salvos, a tela recebe o roteiro por stream desta trip
+    tripId?: string;
     imagensCidades: Record<string, string[]>;
     onBack: () => void;
 }
 
 export function RoteiroScreen({
-    dias,
+    dias: diasSalvos,
+    tripId,
     imagensCidades,
     onBack,
 }: RoteiroScreenProps) {
     const [diaAtual, setDiaAtual] = useState(0);
+    const [diasStream, setDiasStream] = useState<DiaRoteiro[]>([]);
+    const [gerando, setGerando] = useState(false);
+    const [erroStream, setErroStream] = useState<string | null>(null);
+
+    const temDiasSalvos = Boolean(diasSalvos?.length);
+
+    useEffect(() => {
+        if (temDiasSalvos || !tripId) return;
+
+        setDiasStream([]);
+        setErroStream(null);
+        setGerando(true);
+
+        return streamRoteiro<DiaRoteiro>(tripId, {
+            onDia: (dia) => setDiasStream((anteriores) => [...anteriores, dia]),
+            onFoto: (indice, imagemDia) =>
+                setDiasStream((anteriores) =>
+                    anteriores.map((dia, i) =>
+                        i === indice ? { ...dia, imagem_dia: imagemDia } : dia
+                    )
+                ),
+            onFim: () => setGerando(false),
+            onErro: (detail) => {
+                setErroStream(detail);
+                setGerando(false);
+            },
+        });
+    }, [tripId, temDiasSalvos]);
+
+    const dias = temDiasSalvos ? diasSalvos : diasStream;
 
     if (!dias?.length) {
         return (
@@ -32,7 +66,9 @@ export function RoteiroScreen({
                 <h1 className="text-[32px] mb-3" style={{ color: "#09077D" }}>
                     Roteiro
                 </h1>
-                <p className="text-gray-700">Gerando roteiro...</p>
+                <p className="text-gray-700">
+                    {erroStream ? `Erro ao gerar roteiro: ${erroStream}` : "Gerando roteiro..."}
+                </p>
             </div>
         );
     }
@@ -128,9 +164,10 @@ export function RoteiroScreen({
                 )}
 
                 <button
-                    onClick={() =>
-                        proximoDia ? setDiaAtual(diaAtual + 1) : onBack()
-                    }
+                    onClick={() => {
+                        if (proximoDia) setDiaAtual(diaAtual + 1);
+                        else if (!gerando) onBack();
+                    }}
                     className="w-full px-8 py-5 text-white rounded-[16px] text-[17px] transition-all"
                     style={{
                         background: "#09077D",
@@ -138,7 +175,11 @@ export function RoteiroScreen({
                         fontWeight: "500",
                     }}
                 >
-                    {proximoDia ? proximoDia.titulo : "← Voltar ao Início"}
+                    {proximoDia
+                        ? proximoDia.titulo
+                        : gerando
+                          ? "Gerando próximo dia..."
+                          : "← Voltar ao Início"}
                 </button>
             </div>
         </div>
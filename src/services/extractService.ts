@@ -1,14 +1,36 @@
 const API_BASE_URL = import.meta.env.VITE_API_URL || "https://api.dsctravel.com.br";
 
+const POLL_INTERVAL_MS = 1500;
+
+export type ExtractJobStatus = "queued" | "running" | "done" | "failed";
+
 export interface ExtractResponse {
     trip_id: string;
-    status: string;
-    message: string;
+    job_id: string | null;
+    status: ExtractJobStatus;
+    stage: string | null;
+    message?: string;
+    error?: string | null;
+}
+
+export async function getExtractStatus(tripId: string): Promise<ExtractResponse> {
+    const response = await fetch(`${API_BASE_URL}/extract/${tripId}/status`);
+
+    if (!response.ok) {
+        throw new Error(`Erro ao consultar extração. Status ${response.status}`);
+    }
+
+    return response.json();
 }
 
-export async function extractTripData(tripId: string, nomeCliente?: string): Promise<ExtractResponse> {
+export async function extractTripData(
+    tripId: string,
+    nomeCliente?: string,
+    onStage?: (stage: string | null) => void
+): Promise<ExtractResponse> {
     try {
-        const response = await fetch(`${API_BASE_URL}/extract/${tripId}`, {
+        // O roteiro não entra no job: a tela de roteiro recebe os dias por stream
+        const response = await fetch(`${API_BASE_URL}/extract/${tripId}?roteiro_em_stream=true`, {
             method: "POST",
             headers: {
                 "Content-Type": "application/json",
@@ -22,10 +44,21 @@ export async function extractTripData(tripId: string, nomeCliente?: string): Pro
             throw new Error(`Erro ao extrair dados. Status ${response.status}`);
         }
 
-        const data = await response.json();
-        return data;
+        // A extração roda em segundo plano: acompanha o job até terminar
+        let job: ExtractResponse = await response.json();
+        while (job.status === "queued" || job.status === "running") {
+            onStage?.(job.stage);
+            await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+            job = await getExtractStatus(tripId);
+        }
+
+        if (job.status === "failed") {
+            throw new Error(`Erro na extração: ${job.error || "falha desconhecida"}`);
+        }
+
+        return job;
     } catch (error) {
         console.error("Erro em extractTripData:", error);
         throw error;
     }
-}
\ No newline at end of file
+}
@@ -19,3 +19,50 @@ export async function getTrip(tripId: string): Promise<Trip> {
     throw error;
   }
 }
+
+export interface RoteiroStreamHandlers<T> {
+  onDia: (dia: T) => void;
+  // Foto que chegou depois do dia (match em lote com o LLM, no fim do roteiro)
+  onFoto?: (indice: number, imagemDia: string) => void;
+  onFim?: (totalDias: number) => void;
+  onErro?: (detail: string) => void;
+}
+
+// Roteiro via Server-Sent Events: cada dia chega assim que é gerado; fotos que
+// dependem do LLM chegam depois, num evento "foto" com o índice do dia.
+// Devolve a função que fecha o stream.
+export function streamRoteiro<T>(
+  tripId: string,
+  { onDia, onFoto, onFim, onErro }: RoteiroStreamHandlers<T>
+): () => void {
+  const source = new EventSource(`${API_BASE_URL}/trips/${tripId}/roteiro/stream`);
+
+  source.addEventListener("dia", (event) => {
+    onDia(JSON.parse((event as MessageEvent).data));
+  });
+
+  source.addEventListener("foto", (event) => {
+    const { indice, imagem_dia } = JSON.parse((event as MessageEvent).data);
+    onFoto?.(indice, imagem_dia);
+  });
+
+  source.addEventListener("fim", (event) => {
+    onFim?.(JSON.parse((event as MessageEvent).data).dias);
+    source.close();
+  });
+
+  source.addEventListener("erro", (event) => {
+    onErro?.(JSON.parse((event as MessageEvent).data).detail);
+    source.close();
+  });
+
+  // Sem isso o EventSource reconecta sozinho e gera o roteiro de novo
+  source.onerror = () => {
+    if (source.readyState !== EventSource.CLOSED) {
+      onErro?.("Conexão com o roteiro interrompida");
+    }
+    source.close();
+  };
+
+  return () => source.close();
+}
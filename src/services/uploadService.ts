@@ -1,10 +1,17 @@
 const API_BASE_URL = import.meta.env.VITE_API_URL || "https://api.dsctravel.com.br";
 
+export interface UploadedFileInfo {
+    name: string;
+    sha256: string;
+    bytes: number;
+}
+
 export interface UploadResponse {
     trip_id: string;
     status: string;
     message: string;
     files: string[];
+    file_info: UploadedFileInfo[];
 }
 
 export async function uploadFiles(files: File[]): Promise<UploadResponse> {